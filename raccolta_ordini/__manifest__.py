@@ -73,12 +73,14 @@ Requisiti:
         # Data files
         'data/raccolta_config_data.xml',
         'data/sequence_data.xml',
+        'data/raccolta_cron_data.xml',
 
         # Views
         'views/raccolta_assets.xml',
         'views/raccolta_index.xml',
         'views/raccolta_config_view.xml',
         'views/raccolta_session_view.xml',
+        'views/raccolta_visit_view.xml',
         'views/res_users_view.xml',
         'views/sale_order_view.xml',
         'views/stock_picking_view.xml',
@@ -2,11 +2,13 @@
 
 import json
 import logging
+import struct
 from datetime import datetime, timedelta
 
-from odoo import http, _
-from odoo.http import request
+from odoo import api, http, registry, _
+from odoo.http import request, Response, Stream
 from odoo.exceptions import UserError
+from odoo.osv import expression
 
 _logger = logging.getLogger(__name__)
 
@@ -14,9 +16,26 @@ _logger = logging.getLogger(__name__)
 class RaccoltaDataLoader(http.Controller):
 	"""Controller per caricamento dati offline"""
 
+	# Dimensione pagina di default e massima per il caricamento a pagine
+	_page_size = 500
+	_max_page_size = 2000
+
+	# Cache immagini (contenuto indirizzato per checksum, quindi immutabile)
+	_image_max_age = 365 * 24 * 3600
+	_max_bundle_images = 1000
+
+	# Cache dati di riferimento richiesti con la versione corrente (URL versionato)
+	_reference_max_age = 365 * 24 * 3600
+
 	@http.route('/raccolta/load_data', type='json', auth='user')
-	def load_offline_data(self, config_id=None, force_reload=False):
-		"""Carica tutti i dati necessari per il funzionamento offline"""
+	def load_offline_data(self, config_id=None, force_reload=False, format='rows', delivery='inline'):
+		"""Carica tutti i dati necessari per il funzionamento offline
+
+		Con format='columnar' ogni dataset viene restituito per colonne, con le
+		stringhe ripetute codificate tramite dizionario (vedi _to_columnar).
+		Con delivery='url' il catalogo non viene incluso né costruito nella
+		richiesta: si restituisce l'URL di download dello snapshot (con Range).
+		"""
 		try:
 			# Verifica autorizzazioni
 			if not request.env.user.is_raccolta_agent:
@@ -46,8 +65,13 @@ class RaccoltaDataLoader(http.Controller):
 						'last_sync': last_sync.isoformat()
 					}
 
+			if delivery == 'url':
+				return self._get_snapshot_download_info(config)
+
 			# Carica dati completi
 			offline_data = self._load_complete_offline_data(config)
+			if format == 'columnar':
+				offline_data = self._encode_columnar(offline_data)
 
 			# Aggiorna timestamp
 			user.update_last_sync()
@@ -55,6 +79,7 @@ class RaccoltaDataLoader(http.Controller):
 			return {
 				'success': True,
 				'data': offline_data,
+				'format': format,
 				'loaded_at': datetime.now().isoformat(),
 				'expires_at': (datetime.now() + timedelta(days=config.max_offline_days)).isoformat()
 			}
@@ -63,9 +88,103 @@ class RaccoltaDataLoader(http.Controller):
 			_logger.error(f"Errore caricamento dati offline: {str(e)}")
 			return {'error': str(e)}
 
-	@http.route('/raccolta/load_partners', type='json', auth='user')
-	def load_partners(self, config_id=None, limit=None, search_term=None):
-		"""Carica clienti per uso offline"""
+	@http.route('/raccolta/snapshot', type='http', auth='user')
+	def download_snapshot(self, config_id=None, **kwargs):
+		"""Snapshot catalogo compresso gzip, con supporto ETag / If-None-Match"""
+		try:
+			if not request.env.user.is_raccolta_agent:
+				return request.make_json_response({'error': _('Utente non autorizzato')}, status=403)
+
+			config = self._get_config(int(config_id) if config_id else None)
+			snapshot = config._get_offline_snapshot()
+
+			headers = [
+				('ETag', f'"{snapshot.etag}"'),
+				('Cache-Control', 'private, no-cache'),
+			]
+
+			# Snapshot invariato: 304 senza corpo
+			if request.httprequest.if_none_match.contains(snapshot.etag):
+				return request.make_response(b'', headers=headers, status=304)
+
+			return request.make_response(snapshot._get_compressed_data(), headers=headers + [
+				('Content-Type', 'application/json; charset=utf-8'),
+				('Content-Encoding', 'gzip'),
+			])
+
+		except Exception as e:
+			_logger.error(f"Errore download snapshot offline: {str(e)}")
+			return request.make_json_response({'error': str(e)}, status=500)
+
+	@http.route('/raccolta/snapshot/download/<int:snapshot_id>/<string:etag>', type='http', auth='user')
+	def download_snapshot_file(self, snapshot_id, etag, **kwargs):
+		"""File gzip dello snapshot, riprendibile tramite richieste Range"""
+		try:
+			if not request.env.user.is_raccolta_agent:
+				return request.make_json_response({'error': _('Utente non autorizzato')}, status=403)
+
+			snapshot = request.env['raccolta.snapshot'].browse(snapshot_id).exists()
+			if snapshot:
+				snapshot.check_access_rights('read')
+				snapshot.check_access_rule('read')
+
+			# Versione sostituita: il client deve richiedere un nuovo URL
+			if not snapshot or snapshot.sudo().etag != etag:
+				return request.make_json_response({'error': _('Snapshot non più disponibile')}, status=410)
+
+			attachment = snapshot.sudo()._get_data_attachment()
+			if not attachment:
+				return request.make_json_response({'error': _('Snapshot non trovato')}, status=404)
+
+			stream = Stream.from_attachment(attachment)
+			stream.mimetype = 'application/gzip'
+			stream.download_name = f'raccolta_snapshot_{etag}.json.gz'
+			stream.etag = etag
+
+			# send_file condizionale: gestisce Range / If-Range con risposte 206
+			return stream.get_response(as_attachment=True, immutable=True)
+
+		except Exception as e:
+			_logger.error(f"Errore download file snapshot: {str(e)}")
+			return request.make_json_response({'error': str(e)}, status=500)
+
+	@http.route('/raccolta/reference_data', type='http', auth='user')
+	def reference_data(self, config_id=None, version=None, **kwargs):
+		"""Tasse, UoM e tabelle DDT in un unico pacchetto con cache HTTP a lunga durata
+
+		Con version uguale all'etag corrente la risposta è immutabile; senza
+		version il client la rivalida tramite ETag / If-None-Match.
+		"""
+		try:
+			if not request.env.user.is_raccolta_agent:
+				return request.make_json_response({'error': _('Utente non autorizzato')}, status=403)
+
+			config = self._get_config(int(config_id) if config_id else None)
+			etag, raw = config._get_reference_json(config.company_id.id)
+
+			if version == etag:
+				cache_control = f'private, max-age={self._reference_max_age}, immutable'
+			else:
+				cache_control = 'private, no-cache'
+			headers = [
+				('ETag', f'"{etag}"'),
+				('Cache-Control', cache_control),
+			]
+
+			if request.httprequest.if_none_match.contains(etag):
+				return request.make_response(b'', headers=headers, status=304)
+
+			return request.make_response(raw, headers=headers + [
+				('Content-Type', 'application/json; charset=utf-8'),
+			])
+
+		except Exception as e:
+			_logger.error(f"Errore caricamento dati di riferimento: {str(e)}")
+			return request.make_json_response({'error': str(e)}, status=500)
+
+	@http.route('/raccolta/load_delta', type='json', auth='user')
+	def load_delta(self, config_id=None, watermarks=None):
+		"""Carica solo i record variati dall'ultimo caricamento (per dataset)"""
 		try:
 			if not request.env.user.is_raccolta_agent:
 				return {'error': _('Utente non autorizzato')}
@@ -73,68 +192,58 @@ class RaccoltaDataLoader(http.Controller):
 			# Ottieni configurazione
 			config = self._get_config(config_id)
 
-			# Costruisci dominio di ricerca
-			domain = [('customer_rank', '>', 0)]
+			# Variazioni per dataset rispetto ai watermark del client
+			delta = config.get_offline_delta(watermarks or {})
 
-			# Filtra per categorie se configurato
-			if config.limit_partner_categories and config.available_partner_categ_ids:
-				domain.append(('category_id', 'in', config.available_partner_categ_ids.ids))
+			# Aggiorna timestamp
+			request.env.user.update_last_sync()
 
-			# Aggiungi filtro di ricerca
-			if search_term:
-				domain.extend(['|', '|', '|',
-							   ('name', 'ilike', search_term),
-							   ('email', 'ilike', search_term),
-							   ('phone', 'ilike', search_term),
-							   ('vat', 'ilike', search_term)
-							   ])
+			return {
+				'success': True,
+				'data': delta,
+				'loaded_at': datetime.now().isoformat(),
+				'expires_at': (datetime.now() + timedelta(days=config.max_offline_days)).isoformat()
+			}
 
-			# Limita risultati se richiesto
-			search_params = {'domain': domain, 'order': 'name'}
-			if limit:
-				search_params['limit'] = limit
+		except Exception as e:
+			_logger.error(f"Errore caricamento delta offline: {str(e)}")
+			return {'error': str(e)}
 
-			partners = request.env['res.partner'].search(**search_params)
+	@http.route('/raccolta/load_partners', type='json', auth='user')
+	def load_partners(self, config_id=None, limit=None, search_term=None, cursor=None):
+		"""Carica clienti per uso offline, a pagine ordinate per id (keyset)"""
+		try:
+			if not request.env.user.is_raccolta_agent:
+				return {'error': _('Utente non autorizzato')}
 
-			# Prepara dati per frontend
-			partners_data = []
-			for partner in partners:
-				partners_data.append({
-					'id': partner.id,
-					'name': partner.name,
-					'display_name': partner.display_name,
-					'street': partner.street or '',
-					'street2': partner.street2 or '',
-					'city': partner.city or '',
-					'zip': partner.zip or '',
-					'state': partner.state_id.name if partner.state_id else '',
-					'country_id': partner.country_id.name if partner.country_id else '',
-					'phone': partner.phone or '',
-					'mobile': partner.mobile or '',
-					'email': partner.email or '',
-					'vat': partner.vat or '',
-					'is_company': partner.is_company,
-					'customer_rank': partner.customer_rank,
-					'supplier_rank': partner.supplier_rank,
-					'category_names': [cat.name for cat in partner.category_id],
-					'active': partner.active,
-				})
+			# Ottieni configurazione
+			config = self._get_config(config_id)
 
-			return {
+			# Pagina successiva al cursore
+			domain = self._get_partners_domain(config, search_term)
+			partners, next_cursor = self._read_page(request.env['res.partner'], domain, cursor, limit)
+			partners_data = self._prepare_config_partners_data(partners, config)
+
+			result = {
 				'success': True,
 				'partners': partners_data,
 				'count': len(partners_data),
-				'total_available': request.env['res.partner'].search_count([('customer_rank', '>', 0)]),
+				'next_cursor': next_cursor,
 				'loaded_at': datetime.now().isoformat()
 			}
+			# Totale calcolato solo sulla prima pagina
+			if not cursor:
+				result['total_available'] = request.env['res.partner'].search_count(domain)
+
+			return result
 
 		except Exception as e:
 			_logger.error(f"Errore caricamento clienti: {str(e)}")
 			return {'error': str(e)}
 
 	@http.route('/raccolta/load_products', type='json', auth='user')
-	def load_products(self, config_id=None, limit=None, search_term=None, category_id=None):
-		"""Carica prodotti per uso offline"""
+	def load_products(self, config_id=None, limit=None, search_term=None, category_id=None, cursor=None):
+		"""Carica prodotti per uso offline, a pagine ordinate per id (keyset)"""
 		try:
 			if not request.env.user.is_raccolta_agent:
 				return {'error': _('Utente non autorizzato')}
@@ -142,85 +251,122 @@ class RaccoltaDataLoader(http.Controller):
 			# Ottieni configurazione
 			config = self._get_config(config_id)
 
-			# Costruisci dominio di ricerca
-			domain = [
-				('sale_ok', '=', True),
-				('type', 'in', ['product', 'consu']),
-				'|', ('company_id', '=', config.company_id.id), ('company_id', '=', False)
-			]
-
-			# Filtra per categorie se configurato
-			if config.limit_categories and config.available_categ_ids:
-				domain.append(('categ_id', 'child_of', config.available_categ_ids.ids))
-
-			# Filtra per categoria specifica
-			if category_id:
-				domain.append(('categ_id', '=', category_id))
-
-			# Aggiungi filtro di ricerca
-			if search_term:
-				domain.extend(['|', '|', '|',
-							   ('name', 'ilike', search_term),
-							   ('default_code', 'ilike', search_term),
-							   ('barcode', 'ilike', search_term),
-							   ('description_sale', 'ilike', search_term)
-							   ])
-
-			# Limita risultati se richiesto
-			search_params = {'domain': domain, 'order': 'name'}
-			if limit:
-				search_params['limit'] = limit
-
-			products = request.env['product.product'].search(**search_params)
+			# Pagina successiva al cursore
+			domain = self._get_products_domain(config, search_term, category_id)
+			products, next_cursor = self._read_page(request.env['product.product'], domain, cursor, limit)
+			products_data = self._prepare_products_data(products, config)
 
-			# Prepara dati per frontend
-			products_data = []
-			for product in products:
-				# Calcola stock disponibile
-				stock_qty = 0
-				if config.warehouse_id:
-					stock_quant = request.env['stock.quant'].search([
-						('product_id', '=', product.id),
-						('location_id', 'child_of', config.warehouse_id.lot_stock_id.id)
-					])
-					stock_qty = sum(stock_quant.mapped('available_quantity'))
-
-				products_data.append({
-					'id': product.id,
-					'name': product.name,
-					'display_name': product.display_name,
-					'default_code': product.default_code or '',
-					'barcode': product.barcode or '',
-					'list_price': product.list_price,
-					'standard_price': product.standard_price,
-					'uom_id': product.uom_id.id,
-					'uom_name': product.uom_id.name,
-					'categ_id': product.categ_id.id,
-					'categ_name': product.categ_id.name,
-					'categ_path': product.categ_id.complete_name,
-					'taxes_id': product.taxes_id.ids,
-					'type': product.type,
-					'tracking': product.tracking,
-					'description_sale': product.description_sale or '',
-					'weight': product.weight,
-					'volume': product.volume,
-					'stock_qty': stock_qty,
-					'active': product.active,
-					'image_small': product.image_128.decode() if product.image_128 else None,
-				})
-
-			return {
+			result = {
 				'success': True,
 				'products': products_data,
 				'count': len(products_data),
-				'total_available': request.env['product.product'].search_count([('sale_ok', '=', True)]),
+				'next_cursor': next_cursor,
 				'loaded_at': datetime.now().isoformat()
 			}
+			# Totale calcolato solo sulla prima pagina
+			if not cursor:
+				result['total_available'] = request.env['product.product'].search_count(domain)
+
+			return result
 
 		except Exception as e:
 			_logger.error(f"Errore caricamento prodotti: {str(e)}")
 			return {'error': str(e)}
 
+	@http.route(['/raccolta/stream/partners', '/raccolta/stream/products'], type='http', auth='user')
+	def stream_catalog(self, config_id=None, page_size=None, search_term=None, category_id=None, **kwargs):
+		"""Esporta clienti o prodotti in NDJSON: una riga JSON per pagina
+
+		Ogni riga contiene i record della pagina e il next_cursor; il client può
+		salvare le pagine in IndexedDB mentre le successive vengono prodotte.
+		"""
+		try:
+			if not request.env.user.is_raccolta_agent:
+				return request.make_json_response({'error': _('Utente non autorizzato')}, status=403)
+
+			config = self._get_config(int(config_id) if config_id else None)
+			dataset = 'partners' if request.httprequest.path.endswith('/partners') else 'products'
+
+			pages = self._stream_pages(
+				dataset, config.id, page_size,
+				search_term=search_term,
+				category_id=int(category_id) if category_id else None
+			)
+
+			return Response(pages, headers=[
+				('Content-Type', 'application/x-ndjson'),
+				('Cache-Control', 'no-store'),
+			], direct_passthrough=True)
+
+		except Exception as e:
+			_logger.error(f"Errore streaming catalogo: {str(e)}")
+			return request.make_json_response({'error': str(e)}, status=500)
+
+	@http.route('/raccolta/image/<string:checksum>', type='http', auth='user')
+	def product_image(self, checksum, **kwargs):
+		"""Miniatura prodotto per checksum: contenuto immutabile, cache di lunga durata"""
+		try:
+			if not request.env.user.is_raccolta_agent:
+				return request.make_json_response({'error': _('Utente non autorizzato')}, status=403)
+
+			attachment = request.env['raccolta.config']._get_product_image_attachments([checksum]).get(checksum)
+			if not attachment:
+				return request.not_found()
+
+			headers = [
+				('ETag', f'"{checksum}"'),
+				('Cache-Control', f'private, max-age={self._image_max_age}, immutable'),
+			]
+			if request.httprequest.if_none_match.contains(checksum):
+				return request.make_response(b'', headers=headers, status=304)
+
+			return request.make_response(attachment.raw, headers=headers + [
+				('Content-Type', attachment.mimetype or 'image/png'),
+			])
+
+		except Exception as e:
+			_logger.error(f"Errore immagine prodotto: {str(e)}")
+			return request.not_found()
+
+	@http.route('/raccolta/image_bundle', type='http', auth='user', methods=['GET', 'POST'], csrf=False)
+	def product_image_bundle(self, checksums='', **kwargs):
+		"""Pacchetto binario di miniature per il prefetch offline in una sola richiesta
+
+		Formato: 4 byte big-endian con la lunghezza N dell'indice, N byte di indice JSON
+		{checksum: [offset, lunghezza, mimetype]} e di seguito le immagini concatenate
+		(offset relativi alla fine dell'indice). I checksum non trovati sono omessi.
+		"""
+		try:
+			if not request.env.user.is_raccolta_agent:
+				return request.make_json_response({'error': _('Utente non autorizzato')}, status=403)
+
+			requested = [c for c in checksums.split(',') if c][:self._max_bundle_images]
+			attachments = request.env['raccolta.config']._get_product_image_attachments(requested)
+
+			index = {}
+			blobs = []
+			offset = 0
+			for checksum in requested:
+				attachment = attachments.get(checksum)
+				if not attachment or checksum in index:
+					continue
+				raw = attachment.raw or b''
+				index[checksum] = [offset, len(raw), attachment.mimetype or 'image/png']
+				blobs.append(raw)
+				offset += len(raw)
+
+			index_bytes = json.dumps(index, separators=(',', ':')).encode()
+			body = b''.join([struct.pack('>I', len(index_bytes)), index_bytes] + blobs)
+
+			return request.make_response(body, headers=[
+				('Content-Type', 'application/octet-stream'),
+				('Cache-Control', 'no-store'),
+			])
+
+		except Exception as e:
+			_logger.error(f"Errore pacchetto immagini: {str(e)}")
+			return request.make_json_response({'error': str(e)}, status=500)
+
 	@http.route('/raccolta/load_categories', type='json', auth='user')
 	def load_categories(self, config_id=None):
 		"""Carica categorie prodotti"""
@@ -231,18 +377,29 @@ class RaccoltaDataLoader(http.Controller):
 			# Ottieni configurazione
 			config = self._get_config(config_id)
 
-			# Carica categorie
+			# Carica categorie: sottoalbero completo tramite parent_path
 			domain = []
 			if config.limit_categories and config.available_categ_ids:
-				# Solo categorie configurate e loro figli
-				all_ids = []
-				for cat in config.available_categ_ids:
-					all_ids.extend(cat.child_id.ids)
-					all_ids.append(cat.id)
-				domain = [('id', 'in', all_ids)]
+				domain = expression.OR([
+					[('parent_path', '=like', f'{cat.parent_path}%')]
+					for cat in config.available_categ_ids
+				])
 
 			categories = request.env['product.category'].search(domain, order='complete_name')
 
+			# Conteggio prodotti per categoria in una sola query raggruppata
+			counts = request.env['product.product'].read_group([
+				('categ_id', 'in', categories.ids),
+				('sale_ok', '=', True)
+			], ['categ_id'], ['categ_id'])
+			product_counts = {group['categ_id'][0]: group['categ_id_count'] for group in counts}
+
+			# Figli ricavati dai genitori già caricati
+			child_ids = {}
+			for category in categories:
+				if category.parent_id:
+					child_ids.setdefault(category.parent_id.id, []).append(category.id)
+
 			categories_data = []
 			for category in categories:
 				categories_data.append({
@@ -251,11 +408,8 @@ class RaccoltaDataLoader(http.Controller):
 					'complete_name': category.complete_name,
 					'parent_id': category.parent_id.id if category.parent_id else False,
 					'parent_path': category.parent_path or '',
-					'child_ids': category.child_id.ids,
-					'product_count': request.env['product.product'].search_count([
-						('categ_id', '=', category.id),
-						('sale_ok', '=', True)
-					])
+					'child_ids': child_ids.get(category.id, []),
+					'product_count': product_counts.get(category.id, 0)
 				})
 
 			return {
@@ -279,41 +433,8 @@ class RaccoltaDataLoader(http.Controller):
 			# Ottieni configurazione
 			config = self._get_config(config_id)
 
-			# Carica configurazioni DDT
-			ddt_config = {
-				'transport_reasons': [{
-					'id': r.id,
-					'name': r.name,
-					'code': r.code or '',
-				} for r in request.env['stock.picking.transport.reason'].search([])],
-
-				'goods_appearances': [{
-					'id': a.id,
-					'name': a.name,
-					'code': a.code or '',
-				} for a in request.env['stock.picking.goods.appearance'].search([])],
-
-				'transport_conditions': [{
-					'id': c.id,
-					'name': c.name,
-					'code': c.code or '',
-				} for c in request.env['stock.picking.transport.condition'].search([])],
-
-				'transport_methods': [{
-					'id': m.id,
-					'name': m.name,
-					'code': m.code or '',
-				} for m in request.env['stock.picking.transport.method'].search([])],
-
-				'ddt_types': [{
-					'id': t.id,
-					'name': t.name,
-					'code': t.code,
-					'print_prices': t.print_prices,
-				} for t in request.env['stock.delivery.note.type'].search([
-					('company_id', '=', config.company_id.id)
-				])],
-
+			# Tabelle DDT dal pacchetto dati di riferimento
+			ddt_config = dict(config._get_reference_data(config.company_id.id)[1]['ddt'], **{
 				# Valori di default dalla configurazione
 				'defaults': {
 					'transport_reason_id': config.ddt_transport_reason_id.id if config.ddt_transport_reason_id else False,
@@ -321,7 +442,7 @@ class RaccoltaDataLoader(http.Controller):
 					'transport_condition_id': config.ddt_transport_condition_id.id if config.ddt_transport_condition_id else False,
 					'ddt_type_id': config.ddt_type_id.id if config.ddt_type_id else False,
 				}
-			}
+			})
 
 			return {
 				'success': True,
@@ -343,25 +464,8 @@ class RaccoltaDataLoader(http.Controller):
 			# Ottieni configurazione
 			config = self._get_config(config_id)
 
-			# Carica tasse di vendita
-			taxes = request.env['account.tax'].search([
-				('company_id', '=', config.company_id.id),
-				('type_tax_use', '=', 'sale'),
-				('active', '=', True)
-			], order='sequence, name')
-
-			taxes_data = []
-			for tax in taxes:
-				taxes_data.append({
-					'id': tax.id,
-					'name': tax.name,
-					'amount': tax.amount,
-					'amount_type': tax.amount_type,
-					'include_base_amount': tax.include_base_amount,
-					'sequence': tax.sequence,
-					'description': tax.description or '',
-					'active': tax.active,
-				})
+			# Tasse di vendita dal pacchetto dati di riferimento
+			taxes_data = config._get_taxes_data()
 
 			return {
 				'success': True,
@@ -374,6 +478,88 @@ class RaccoltaDataLoader(http.Controller):
 			_logger.error(f"Errore caricamento tasse: {str(e)}")
 			return {'error': str(e)}
 
+	@http.route('/raccolta/load_pricelists', type='json', auth='user')
+	def load_pricelists(self, config_id=None):
+		"""Carica matrice prezzi per listino"""
+		try:
+			if not request.env.user.is_raccolta_agent:
+				return {'error': _('Utente non autorizzato')}
+
+			config = self._get_config(config_id)
+
+			return {
+				'success': True,
+				'pricelists': config._get_pricelist_data(),
+				'loaded_at': datetime.now().isoformat()
+			}
+
+		except Exception as e:
+			_logger.error(f"Errore caricamento listini: {str(e)}")
+			return {'error': str(e)}
+
+	@http.route('/raccolta/load_route', type='json', auth='user')
+	def load_route(self, config_id=None):
+		"""Carica clienti del giro visite con dettaglio completo e storico ordini"""
+		try:
+			if not request.env.user.is_raccolta_agent:
+				return {'error': _('Utente non autorizzato')}
+
+			config = self._get_config(config_id)
+			route_data = config.get_route_data()
+
+			return {
+				'success': True,
+				'route': route_data,
+				'count': len(route_data['partners']),
+				'loaded_at': datetime.now().isoformat()
+			}
+
+		except Exception as e:
+			_logger.error(f"Errore caricamento giro visite: {str(e)}")
+			return {'error': str(e)}
+
+	@http.route('/raccolta/load_reorder_profiles', type='json', auth='user')
+	def load_reorder_profiles(self, config_id=None):
+		"""Carica prodotti abituali per cliente"""
+		try:
+			if not request.env.user.is_raccolta_agent:
+				return {'error': _('Utente non autorizzato')}
+
+			config = self._get_config(config_id)
+
+			return {
+				'success': True,
+				'reorder_profiles': config._get_reorder_profile_data(),
+				'loaded_at': datetime.now().isoformat()
+			}
+
+		except Exception as e:
+			_logger.error(f"Errore caricamento profili riordino: {str(e)}")
+			return {'error': str(e)}
+
+	@http.route('/raccolta/load_stock', type='json', auth='user')
+	def load_stock(self, config_id=None, since=None):
+		"""Carica giacenze disponibili [[product_id, qty]], solo variazioni con since"""
+		try:
+			if not request.env.user.is_raccolta_agent:
+				return {'error': _('Utente non autorizzato')}
+
+			config = self._get_config(config_id)
+			stock_data = config.get_stock_data(since)
+
+			return {
+				'success': True,
+				'warehouse_id': config.warehouse_id.id,
+				'full': stock_data['full'],
+				'stock': stock_data['stock'],
+				'token': stock_data['token'],
+				'loaded_at': datetime.now().isoformat()
+			}
+
+		except Exception as e:
+			_logger.error(f"Errore caricamento giacenze: {str(e)}")
+			return {'error': str(e)}
+
 	@http.route('/raccolta/load_uoms', type='json', auth='user')
 	def load_uoms(self, config_id=None):
 		"""Carica unità di misura"""
@@ -381,21 +567,8 @@ class RaccoltaDataLoader(http.Controller):
 			if not request.env.user.is_raccolta_agent:
 				return {'error': _('Utente non autorizzato')}
 
-			# Carica UoM attive
-			uoms = request.env['uom.uom'].search([('active', '=', True)], order='category_id, name')
-
-			uoms_data = []
-			for uom in uoms:
-				uoms_data.append({
-					'id': uom.id,
-					'name': uom.name,
-					'category_id': uom.category_id.id,
-					'category_name': uom.category_id.name,
-					'factor': uom.factor,
-					'factor_inv': uom.factor_inv,
-					'rounding': uom.rounding,
-					'uom_type': uom.uom_type,
-				})
+			# UoM attive dal pacchetto dati di riferimento
+			uoms_data = self._get_config(config_id)._get_uoms_data()
 
 			return {
 				'success': True,
@@ -426,18 +599,16 @@ class RaccoltaDataLoader(http.Controller):
 				('sale_ok', '=', True),
 				('active', '=', True),
 				'|', ('company_id', '=', config.company_id.id), ('company_id', '=', False),
-				'|', '|', '|',
-				('name', 'ilike', search_term),
-				('default_code', 'ilike', search_term),
-				('barcode', '=', search_term),
-				('description_sale', 'ilike', search_term)
 			]
 
 			# Filtra per categorie se configurato
 			if config.limit_categories and config.available_categ_ids:
 				domain.append(('categ_id', 'child_of', config.available_categ_ids.ids))
 
-			products = request.env['product.product'].search(domain, limit=limit, order='name')
+			# Nome, codice, barcode e descrizione tramite chiave normalizzata
+			products = request.env['raccolta.search']._search_ranked(
+				'product.product', domain, search_term, limit=limit
+			)
 
 			# Risultati leggeri per autocomplete
 			results = []
@@ -479,18 +650,16 @@ class RaccoltaDataLoader(http.Controller):
 			domain = [
 				('customer_rank', '>', 0),
 				('active', '=', True),
-				'|', '|', '|',
-				('name', 'ilike', search_term),
-				('email', 'ilike', search_term),
-				('phone', 'ilike', search_term),
-				('vat', 'ilike', search_term)
 			]
 
 			# Filtra per categorie se configurato
 			if config.limit_partner_categories and config.available_partner_categ_ids:
 				domain.append(('category_id', 'in', config.available_partner_categ_ids.ids))
 
-			partners = request.env['res.partner'].search(domain, limit=limit, order='name')
+			# Nome, email, telefono e partita IVA tramite chiave normalizzata
+			partners = request.env['raccolta.search']._search_ranked(
+				'res.partner', domain, search_term, limit=limit
+			)
 
 			# Risultati leggeri per autocomplete
 			results = []
@@ -529,52 +698,18 @@ class RaccoltaDataLoader(http.Controller):
 			# Ottieni configurazione
 			config = self._get_config(config_id)
 
-			# Cerca prodotto per barcode
-			domain = [
-				('barcode', '=', barcode),
-				('sale_ok', '=', True),
-				('active', '=', True),
-				'|', ('company_id', '=', config.company_id.id), ('company_id', '=', False)
-			]
-
-			# Filtra per categorie se configurato
-			if config.limit_categories and config.available_categ_ids:
-				domain.append(('categ_id', 'child_of', config.available_categ_ids.ids))
+			# Cerca prodotto per barcode (cache per worker)
+			product_id, product_data = config._get_barcode_product(barcode)
 
-			product = request.env['product.product'].search(domain, limit=1)
-
-			if not product:
+			if not product_id:
 				return {
 					'success': False,
 					'error': _('Prodotto non trovato per il barcode: %s') % barcode
 				}
 
-			# Calcola stock disponibile
-			stock_qty = 0
-			if config.warehouse_id:
-				stock_quant = request.env['stock.quant'].search([
-					('product_id', '=', product.id),
-					('location_id', 'child_of', config.warehouse_id.lot_stock_id.id)
-				])
-				stock_qty = sum(stock_quant.mapped('available_quantity'))
-
-			product_data = {
-				'id': product.id,
-				'name': product.name,
-				'default_code': product.default_code or '',
-				'barcode': product.barcode,
-				'list_price': product.list_price,
-				'standard_price': product.standard_price,
-				'uom_id': product.uom_id.id,
-				'uom_name': product.uom_id.name,
-				'categ_id': product.categ_id.id,
-				'categ_name': product.categ_id.name,
-				'taxes_id': product.taxes_id.ids,
-				'description_sale': product.description_sale or '',
-				'stock_qty': stock_qty,
-				'type': product.type,
-				'tracking': product.tracking,
-			}
+			# Calcola stock disponibile (mai in cache)
+			stock_qty = config._get_stock_quantities([product_id]).get(product_id, 0.0)
+			product_data['stock_qty'] = stock_qty
 
 			return {
 				'success': True,
@@ -587,8 +722,12 @@ class RaccoltaDataLoader(http.Controller):
 			return {'error': str(e)}
 
 	@http.route('/raccolta/check_data_freshness', type='json', auth='user')
-	def check_data_freshness(self, config_id=None):
-		"""Controlla se i dati offline sono ancora freschi"""
+	def check_data_freshness(self, config_id=None, versions=None):
+		"""Controlla se i dati offline sono ancora freschi
+
+		:param versions: dict {dataset: versione} posseduto dal client; la risposta
+			indica in stale_datasets i soli dataset da riscaricare
+		"""
 		try:
 			if not request.env.user.is_raccolta_agent:
 				return {'error': _('Utente non autorizzato')}
@@ -597,6 +736,21 @@ class RaccoltaDataLoader(http.Controller):
 			config = self._get_config(config_id)
 			user = request.env.user
 
+			# Versioni correnti dei dataset
+			if versions is not None:
+				current_versions = config._get_dataset_versions()
+				stale_datasets = [
+					dataset for dataset, version in current_versions.items()
+					if versions.get(dataset) != version
+				]
+				return {
+					'success': True,
+					'fresh': not stale_datasets,
+					'versions': current_versions,
+					'stale_datasets': stale_datasets,
+					'message': _('Dati ancora validi') if not stale_datasets else _('Alcuni dati sono cambiati'),
+				}
+
 			# Controlla ultimo sync
 			last_sync = user.last_sync_date
 			if not last_sync:
@@ -634,22 +788,277 @@ class RaccoltaDataLoader(http.Controller):
 			_logger.error(f"Errore controllo freschezza dati: {str(e)}")
 			return {'error': str(e)}
 
-	def _load_complete_offline_data(self, config):
-		"""Carica set completo di dati per uso offline"""
+	def _get_snapshot_download_info(self, config):
+		"""Risposta di load_data con URL dello snapshot invece del catalogo"""
+		snapshot = config._request_offline_snapshot()
+		if not snapshot:
+			return {
+				'success': True,
+				'status': 'building',
+				'retry_after': 10,
+			}
+
+		request.env.user.update_last_sync()
+
 		return {
+			'success': True,
+			'status': 'ready',
+			'stale': snapshot.state != 'ready',
+			'download_url': snapshot._get_download_url(),
+			'etag': snapshot.etag,
+			'size': snapshot.size,
+			'raw_size': snapshot.raw_size,
+			'build_date': snapshot.build_date.isoformat() if snapshot.build_date else False,
 			'config': config._get_config_data(),
 			'company': config._get_company_data(),
-			'partners': config._get_partners_data(),
-			'products': config._get_products_data(),
-			'categories': config._get_categories_data(),
-			'taxes': config._get_taxes_data(),
-			'uoms': config._get_uoms_data(),
-			'ddt_config': config._get_ddt_config_data(),
 			'counters': config._get_user_counters(),
 			'loaded_at': datetime.now().isoformat(),
+			'expires_at': (datetime.now() + timedelta(days=config.max_offline_days)).isoformat()
+		}
+
+	def _load_complete_offline_data(self, config):
+		"""Carica set completo di dati per uso offline"""
+		data = config.get_offline_data()
+		data.update({
+			'snapshot_etag': config._get_offline_snapshot().etag,
+			'loaded_at': datetime.now().isoformat(),
 			'version': '1.0.0'
+		})
+		return data
+
+	def _encode_columnar(self, data):
+		"""Converte in formato colonnare i dataset (liste di dizionari) del payload"""
+		encoded = {}
+		for key, value in data.items():
+			if self._is_row_list(value):
+				encoded[key] = self._to_columnar(value)
+			elif isinstance(value, dict):
+				encoded[key] = {
+					sub_key: self._to_columnar(sub_value) if self._is_row_list(sub_value) else sub_value
+					for sub_key, sub_value in value.items()
+				}
+			else:
+				encoded[key] = value
+		return encoded
+
+	def _is_row_list(self, value):
+		return isinstance(value, list) and bool(value) and all(isinstance(row, dict) for row in value)
+
+	def _to_columnar(self, rows):
+		"""Lista di dizionari -> colonne
+
+		Le colonne di sole stringhe con molte ripetizioni (almeno metà dei valori
+		duplicati) diventano indici interi in un dizionario di valori distinti.
+		"""
+		names = list(dict.fromkeys(name for row in rows for name in row))
+
+		columns = {}
+		dictionaries = {}
+		for name in names:
+			values = [row.get(name) for row in rows]
+			if all(isinstance(value, str) for value in values):
+				distinct = list(dict.fromkeys(values))
+				if len(distinct) * 2 <= len(values):
+					position = {value: index for index, value in enumerate(distinct)}
+					dictionaries[name] = distinct
+					values = [position[value] for value in values]
+			columns[name] = values
+
+		return {
+			'format': 'columnar',
+			'length': len(rows),
+			'columns': columns,
+			'dictionaries': dictionaries,
 		}
 
+	def _get_partners_domain(self, config, search_term=None):
+		"""Dominio clienti della configurazione (come snapshot e delta), con ricerca opzionale"""
+		domain = config._get_partners_domain()
+
+		# Aggiungi filtro di ricerca
+		if search_term:
+			domain = expression.AND([domain, ['|', '|', '|',
+											  ('name', 'ilike', search_term),
+											  ('email', 'ilike', search_term),
+											  ('phone', 'ilike', search_term),
+											  ('vat', 'ilike', search_term)]])
+
+		return domain
+
+	def _get_products_domain(self, config, search_term=None, category_id=None):
+		"""Dominio prodotti della configurazione (come snapshot e delta), con filtri opzionali"""
+		domain = config._get_products_domain()
+
+		# Filtra per categoria specifica
+		if category_id:
+			domain = expression.AND([domain, [('categ_id', '=', category_id)]])
+
+		# Aggiungi filtro di ricerca
+		if search_term:
+			domain = expression.AND([domain, ['|', '|', '|',
+											  ('name', 'ilike', search_term),
+											  ('default_code', 'ilike', search_term),
+											  ('barcode', 'ilike', search_term),
+											  ('description_sale', 'ilike', search_term)]])
+
+		return domain
+
+	def _read_page(self, model, domain, cursor=None, page_size=None):
+		"""Legge una pagina ordinata per id successiva al cursore (keyset pagination)
+
+		:return: (record della pagina, cursore della pagina successiva o False)
+		"""
+		page_size = max(1, min(int(page_size or self._page_size), self._max_page_size))
+		if cursor:
+			domain = expression.AND([domain, [('id', '>', int(cursor))]])
+
+		# Un record in più per sapere se esiste una pagina successiva
+		records = model.search(domain, order='id', limit=page_size + 1)
+		if len(records) > page_size:
+			records = records[:page_size]
+			return records, records[-1].id
+
+		return records, False
+
+	def _stream_pages(self, dataset, config_id, page_size=None, search_term=None, category_id=None):
+		"""Generatore NDJSON delle pagine di un dataset
+
+		Il generatore viene consumato dopo la chiusura della richiesta, per cui
+		usa un proprio cursore sul database.
+		"""
+		dbname = request.db
+		uid = request.env.uid
+		context = dict(request.env.context)
+
+		def generate():
+			with registry(dbname).cursor() as cr:
+				env = api.Environment(cr, uid, context)
+				config = env['raccolta.config'].browse(config_id)
+
+				if dataset == 'partners':
+					model = env['res.partner']
+					domain = self._get_partners_domain(config, search_term)
+				else:
+					model = env['product.product']
+					domain = self._get_products_domain(config, search_term, category_id)
+
+				# Clienti del giro visite letti una sola volta per tutte le pagine
+				route_partner_ids = self._get_route_partner_ids(config) if dataset == 'partners' else None
+
+				cursor = None
+				while True:
+					records, next_cursor = self._read_page(model, domain, cursor, page_size)
+					if dataset == 'partners':
+						rows = self._prepare_config_partners_data(records, config, route_partner_ids)
+					else:
+						rows = self._prepare_products_data(records, config)
+
+					yield (json.dumps({
+						'records': rows,
+						'count': len(rows),
+						'next_cursor': next_cursor,
+					}, default=str) + '\n').encode()
+
+					if not next_cursor:
+						break
+					cursor = next_cursor
+					# Libera la cache tra una pagina e l'altra
+					env.invalidate_all()
+
+		return generate()
+
+	def _get_route_partner_ids(self, config):
+		"""Clienti con dettaglio completo: tutti, salvo quelli fuori dal giro in modalità giro visite
+
+		:return: insieme di ID, oppure None se tutti i clienti hanno il dettaglio completo
+		"""
+		if config.partner_prefetch_mode != 'route':
+			return None
+		return set(config._get_route_visits().partner_id.ids)
+
+	def _prepare_config_partners_data(self, partners, config, route_partner_ids=False):
+		"""Clienti di una pagina secondo il prefetch della configurazione
+
+		In modalità giro visite solo i clienti del giro hanno il dettaglio
+		completo; per gli altri si restituisce l'indice minimo dello snapshot.
+		"""
+		if route_partner_ids is False:
+			route_partner_ids = self._get_route_partner_ids(config)
+		if route_partner_ids is None:
+			return self._prepare_partners_data(partners)
+
+		route_partners = partners.filtered(lambda partner: partner.id in route_partner_ids)
+		index_partners = partners - route_partners
+		rows = {row['id']: row for row in self._prepare_partners_data(route_partners)}
+		if index_partners:
+			rows.update({
+				row['id']: row for row in partners.env['raccolta.serializer']._serialize_partner_index(
+					[('id', 'in', index_partners.ids)]
+				)
+			})
+		return [rows[partner.id] for partner in partners]
+
+	def _prepare_partners_data(self, partners):
+		"""Prepara dati clienti per frontend"""
+		partners_data = []
+		for partner in partners:
+			partners_data.append({
+				'id': partner.id,
+				'name': partner.name,
+				'display_name': partner.display_name,
+				'street': partner.street or '',
+				'street2': partner.street2 or '',
+				'city': partner.city or '',
+				'zip': partner.zip or '',
+				'state': partner.state_id.name if partner.state_id else '',
+				'country_id': partner.country_id.name if partner.country_id else '',
+				'phone': partner.phone or '',
+				'mobile': partner.mobile or '',
+				'email': partner.email or '',
+				'vat': partner.vat or '',
+				'is_company': partner.is_company,
+				'customer_rank': partner.customer_rank,
+				'supplier_rank': partner.supplier_rank,
+				'category_names': [cat.name for cat in partner.category_id],
+				'active': partner.active,
+			})
+		return partners_data
+
+	def _prepare_products_data(self, products, config):
+		"""Prepara dati prodotti per frontend, con stock della configurazione"""
+		# Stock disponibile e checksum immagini per tutta la pagina
+		stock_by_product = config._get_stock_quantities(products.ids)
+		image_checksums = config._get_product_image_checksums(products)
+
+		products_data = []
+		for product in products:
+			stock_qty = stock_by_product.get(product.id, 0.0)
+
+			products_data.append({
+				'id': product.id,
+				'name': product.name,
+				'display_name': product.display_name,
+				'default_code': product.default_code or '',
+				'barcode': product.barcode or '',
+				'list_price': product.list_price,
+				'standard_price': product.standard_price,
+				'uom_id': product.uom_id.id,
+				'uom_name': product.uom_id.name,
+				'categ_id': product.categ_id.id,
+				'categ_name': product.categ_id.name,
+				'categ_path': product.categ_id.complete_name,
+				'taxes_id': product.taxes_id.ids,
+				'type': product.type,
+				'tracking': product.tracking,
+				'description_sale': product.description_sale or '',
+				'weight': product.weight,
+				'volume': product.volume,
+				'stock_qty': stock_qty,
+				'active': product.active,
+				'image_checksum': image_checksums.get(product.id),
+			})
+		return products_data
+
 	def _get_config(self, config_id=None):
 		"""Ottiene configurazione o default"""
 		if config_id:
@@ -70,12 +70,12 @@ class RaccoltaController(http.Controller):
 			# Prepara dati per frontend
 			session_info = self._prepare_session_info(session)
 
-			# Carica dati offline iniziali
-			offline_data = config.get_offline_data()
+			# Solo le versioni dei dataset: il client scarica quelli cambiati
+			dataset_versions = config._get_dataset_versions()
 
 			return request.render('raccolta_ordini.index', {
 				'session_info': json.dumps(session_info),
-				'offline_data': json.dumps(offline_data),
+				'dataset_versions': json.dumps(dataset_versions),
 				'config_id': config.id,
 				'session_id': session.id,
 				'debug': request.session.debug,
@@ -297,6 +297,7 @@ class RaccoltaController(http.Controller):
 					'configs_available': len(configs) > 0,
 					'l10n_it_delivery_note': 'l10n_it_delivery_note' in request.env.registry._init_modules
 				},
+				'barcode_cache': request.env['raccolta.config'].get_barcode_cache_stats(),
 				'timestamp': datetime.now().isoformat(),
 				'user': request.env.user.name,
 				'company': request.env.company.name
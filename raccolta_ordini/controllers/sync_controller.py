@@ -72,20 +72,28 @@ class RaccoltaSyncController(http.Controller):
 			if not session.exists() or session.user_id != request.env.user:
 				return {'error': _('Sessione non valida')}
 
-			results = {'synced': 0, 'errors': [], 'order_ids': []}
+			results = {'synced': 0, 'already_synced': 0, 'errors': [], 'order_ids': []}
 
 			for order_data in orders:
 				try:
-					order = self._sync_single_order(order_data, session)
-					if order:
+					result = session._sync_order_batch([order_data])[session._get_order_key(order_data)]
+					if not result['success']:
+						raise UserError(result['error'])
+					results['order_ids'].append(result['odoo_id'])
+					if result['already_synced']:
+						results['already_synced'] += 1
+					else:
 						results['synced'] += 1
-						results['order_ids'].append(order.id)
 
 				except Exception as e:
 					error_msg = f"Errore ordine {order_data.get('name', 'Unknown')}: {str(e)}"
 					results['errors'].append(error_msg)
 					_logger.error(error_msg)
 
+			# Profili riordino aggiornati in background dal cron
+			if results['order_ids']:
+				request.env['raccolta.reorder.profile']._trigger_refresh()
+
 			return {
 				'success': True,
 				'results': results,
@@ -96,6 +104,50 @@ class RaccoltaSyncController(http.Controller):
 			_logger.error(f"Errore sincronizzazione ordini: {str(e)}")
 			return {'error': str(e)}
 
+	@http.route('/raccolta/sync/orders_batch', type='json', auth='user')
+	def sync_orders_batch(self, session_id, orders):
+		"""Sincronizza un blocco di ordini con una sola create multipla
+
+		Il blocco non può superare sync_batch_size della configurazione; il
+		risultato è indicizzato per local_id dell'ordine offline.
+		"""
+		try:
+			if not request.env.user.is_raccolta_agent:
+				return {'error': _('Utente non autorizzato')}
+
+			session = request.env['raccolta.session'].browse(session_id)
+			if not session.exists() or session.user_id != request.env.user:
+				return {'error': _('Sessione non valida')}
+
+			batch_size = session.config_id.sync_batch_size
+			if len(orders) > batch_size:
+				return {
+					'error': _('Troppi ordini nel blocco (massimo %s)') % batch_size,
+					'max_batch_size': batch_size,
+				}
+
+			results = session._sync_order_batch(orders)
+
+			# Profili riordino aggiornati in background dal cron
+			order_ids = [result['odoo_id'] for result in results.values() if result['success']]
+			if order_ids:
+				request.env['raccolta.reorder.profile']._trigger_refresh()
+
+			already_synced = sum(1 for result in results.values() if result.get('already_synced'))
+			return {
+				'success': True,
+				'results': results,
+				'synced': len(order_ids) - already_synced,
+				'already_synced': already_synced,
+				'errors': len(results) - len(order_ids),
+				'max_batch_size': batch_size,
+				'synced_at': datetime.now().isoformat()
+			}
+
+		except Exception as e:
+			_logger.error(f"Errore sincronizzazione blocco ordini: {str(e)}")
+			return {'error': str(e)}
+
 	@http.route('/raccolta/sync/check_conflicts', type='json', auth='user')
 	def check_sync_conflicts(self, orders=None, pickings=None, ddts=None):
 		"""Controlla conflitti prima della sincronizzazione"""
@@ -103,60 +155,7 @@ class RaccoltaSyncController(http.Controller):
 			if not request.env.user.is_raccolta_agent:
 				return {'error': _('Utente non autorizzato')}
 
-			conflicts = {
-				'orders': [],
-				'pickings': [],
-				'ddts': [],
-				'has_conflicts': False
-			}
-
-			# Controlla conflitti ordini
-			if orders:
-				for order_data in orders:
-					existing = request.env['sale.order'].search([
-						('name', '=', order_data.get('name'))
-					], limit=1)
-
-					if existing:
-						conflicts['orders'].append({
-							'name': order_data.get('name'),
-							'existing_id': existing.id,
-							'conflict_type': 'duplicate_name',
-							'message': _('Ordine con questo nome già esistente')
-						})
-						conflicts['has_conflicts'] = True
-
-			# Controlla conflitti picking
-			if pickings:
-				for picking_data in pickings:
-					existing = request.env['stock.picking'].search([
-						('name', '=', picking_data.get('name'))
-					], limit=1)
-
-					if existing:
-						conflicts['pickings'].append({
-							'name': picking_data.get('name'),
-							'existing_id': existing.id,
-							'conflict_type': 'duplicate_name',
-							'message': _('Picking con questo nome già esistente')
-						})
-						conflicts['has_conflicts'] = True
-
-			# Controlla conflitti DDT
-			if ddts:
-				for ddt_data in ddts:
-					existing = request.env['stock.delivery.note'].search([
-						('name', '=', ddt_data.get('name'))
-					], limit=1)
-
-					if existing:
-						conflicts['ddts'].append({
-							'name': ddt_data.get('name'),
-							'existing_id': existing.id,
-							'conflict_type': 'duplicate_name',
-							'message': _('DDT con questo nome già esistente')
-						})
-						conflicts['has_conflicts'] = True
+			conflicts = request.env['raccolta.session']._get_sync_conflicts(orders, pickings, ddts)
 
 			return {
 				'success': True,
@@ -326,89 +325,6 @@ class RaccoltaSyncController(http.Controller):
 			_logger.error(f"Errore upload ricevuta: {str(e)}")
 			return json.dumps({'error': str(e)})
 
-	def _sync_single_order(self, order_data, session):
-		"""Sincronizza un singolo ordine"""
-		# Cerca ordine esistente
-		existing_order = request.env['sale.order'].search([
-			('name', '=', order_data.get('name')),
-			('raccolta_session_id', '=', session.id)
-		], limit=1)
-
-		if existing_order:
-			# Aggiorna ordine esistente
-			order_vals = self._prepare_order_values(order_data, session)
-			existing_order.write(order_vals)
-			self._sync_order_lines(existing_order, order_data.get('order_lines', []))
-			return existing_order
-		else:
-			# Crea nuovo ordine
-			order_vals = self._prepare_order_values(order_data, session)
-			order = request.env['sale.order'].create(order_vals)
-			self._sync_order_lines(order, order_data.get('order_lines', []))
-
-			# Marca come sincronizzato
-			order.write({
-				'synced_to_odoo': True,
-				'sync_date': datetime.now()
-			})
-
-			return order
-
-	def _prepare_order_values(self, order_data, session):
-		"""Prepara valori ordine per creazione/aggiornamento"""
-		partner_id = order_data.get('partner_id')
-		if isinstance(partner_id, list):
-			partner_id = partner_id[0]
-
-		return {
-			'partner_id': partner_id,
-			'date_order': order_data.get('date_order', datetime.now()),
-			'note': order_data.get('note', ''),
-			'client_order_ref': order_data.get('client_order_ref', ''),
-			'raccolta_session_id': session.id,
-			'user_id': session.user_id.id,
-			'company_id': session.company_id.id,
-			'warehouse_id': session.warehouse_id.id if session.warehouse_id else False,
-			'pricelist_id': order_data.get('pricelist_id', session.company_id.property_product_pricelist.id),
-			'payment_term_id': order_data.get('payment_term_id', False),
-			'state': 'draft',
-			'offline_order': True,
-			'offline_created_at': order_data.get('created_at'),
-			'offline_local_id': order_data.get('local_id'),
-		}
-
-	def _sync_order_lines(self, order, order_lines_data):
-		"""Sincronizza righe ordine"""
-		# Rimuovi righe esistenti se aggiornamento
-		order.order_line.unlink()
-
-		for line_data in order_lines_data:
-			product_id = line_data.get('product_id')
-			if isinstance(product_id, list):
-				product_id = product_id[0]
-
-			product = request.env['product.product'].browse(product_id)
-			if not product.exists():
-				continue
-
-			# Calcola prezzo
-			price_unit = line_data.get('price_unit', 0.0)
-			if not price_unit:
-				price_unit = product.list_price
-
-			line_vals = {
-				'order_id': order.id,
-				'product_id': product.id,
-				'name': line_data.get('name', product.name),
-				'product_uom_qty': line_data.get('product_uom_qty', 1.0),
-				'price_unit': price_unit,
-				'product_uom': product.uom_id.id,
-				'discount': line_data.get('discount', 0.0),
-				'sequence': line_data.get('sequence', 10),
-			}
-
-			request.env['sale.order.line'].create(line_vals)
-
 	def _retry_order_sync(self, order):
 		"""Riprova sincronizzazione ordine fallito"""
 		try:
@@ -432,7 +348,7 @@ class RaccoltaSyncController(http.Controller):
 			# Marca come sincronizzato
 			order.write({
 				'synced_to_odoo': True,
-				'sync_date': datetime.now()
+				'sync_at': datetime.now()
 			})
 
 		except Exception as e:
@@ -440,7 +356,11 @@ class RaccoltaSyncController(http.Controller):
 			raise
 
 	def _update_user_counters(self, user, sync_results):
-		"""Aggiorna contatori utente dopo sincronizzazione"""
+		"""Aggiorna contatori utente dopo sincronizzazione
+
+		I conteggi *_synced escludono i documenti già sincronizzati in un invio
+		precedente, così un nuovo tentativo non incrementa di nuovo i contatori.
+		"""
 		try:
 			counters = request.env['raccolta.counter'].search([
 				('user_id', '=', user.id)
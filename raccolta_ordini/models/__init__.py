@@ -7,6 +7,17 @@ from . import raccolta_counter
 from . import res_users
 from . import sale_order
 from . import stock_picking
+from . import raccolta_snapshot
+from . import raccolta_search
+from . import raccolta_serializer
+from . import raccolta_tombstone
+from . import raccolta_visit
+from . import raccolta_reorder_profile
+from . import res_partner
+from . import product
+from . import product_pricelist
+from . import account_tax
+from . import uom_uom
 
 # ✅ CONDIZIONALE: Import DDT solo se modulo installato
 try:
@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+
+from odoo import models, api
+
+
+class AccountTax(models.Model):
+	"""Estensione imposte per mantenere aggiornati i dati offline"""
+	_inherit = 'account.tax'
+
+	# Campi che alimentano gli snapshot offline
+	_raccolta_snapshot_fields = {
+		'name', 'amount', 'amount_type', 'include_base_amount', 'sequence',
+		'description', 'type_tax_use', 'company_id', 'active',
+	}
+
+	# Campi del filtro offline (imposte di vendita dell'azienda)
+	_raccolta_scope_fields = {'type_tax_use', 'company_id'}
+
+	def _invalidate_raccolta_caches(self):
+		"""Invalida snapshot offline e pacchetto dati di riferimento dei worker"""
+		self.env['raccolta.snapshot'].sudo()._invalidate_snapshots()
+		self.env['raccolta.config'].clear_caches()
+
+	@api.model_create_multi
+	def create(self, vals_list):
+		"""Invalida gli snapshot alla creazione di nuove imposte"""
+		taxes = super(AccountTax, self).create(vals_list)
+		self._invalidate_raccolta_caches()
+		return taxes
+
+	def write(self, vals):
+		"""Invalida gli snapshot se cambiano campi usati offline"""
+		result = super(AccountTax, self).write(vals)
+
+		if self._raccolta_snapshot_fields.intersection(vals):
+			if 'active' in vals and not vals['active']:
+				self.env['raccolta.tombstone']._record(self._name, self.ids, 'archive')
+			elif self._raccolta_scope_fields.intersection(vals):
+				self.env['raccolta.tombstone']._record(self._name, self.ids, 'scope')
+			self._invalidate_raccolta_caches()
+
+		return result
+
+	def unlink(self):
+		"""Invalida gli snapshot e registra i tombstone alla cancellazione"""
+		self.env['raccolta.tombstone']._record(self._name, self.ids, 'unlink')
+		result = super(AccountTax, self).unlink()
+		self._invalidate_raccolta_caches()
+		return result
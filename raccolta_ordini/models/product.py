@@ -0,0 +1,159 @@
+# -*- coding: utf-8 -*-
+
+from odoo import models, fields, api
+
+
+class ProductTemplate(models.Model):
+	"""Estensione template prodotto per mantenere aggiornati i dati offline"""
+	_inherit = 'product.template'
+
+	# Campi che alimentano gli snapshot offline
+	_raccolta_snapshot_fields = {
+		'name', 'default_code', 'barcode', 'list_price',
+		'uom_id', 'categ_id', 'taxes_id', 'type', 'tracking', 'sale_ok',
+		'company_id', 'active',
+	}
+
+	# Campi che possono far uscire un prodotto dai filtri offline
+	_raccolta_scope_fields = {'categ_id', 'sale_ok', 'type', 'company_id'}
+
+	# Campi che determinano il prodotto trovato per barcode
+	_raccolta_barcode_fields = {'barcode', 'categ_id', 'sale_ok', 'company_id', 'active'}
+
+	def _invalidate_raccolta_caches(self, barcode=True):
+		"""Invalida snapshot offline e, se richiesto, cache barcode dei worker"""
+		self.env['raccolta.snapshot'].sudo()._invalidate_snapshots()
+		if barcode:
+			self.env['raccolta.config'].clear_caches()
+
+	@api.model_create_multi
+	def create(self, vals_list):
+		"""Invalida gli snapshot alla creazione di nuovi prodotti"""
+		templates = super(ProductTemplate, self).create(vals_list)
+		self._invalidate_raccolta_caches(barcode=any(vals.get('barcode') for vals in vals_list))
+		return templates
+
+	def write(self, vals):
+		"""Invalida gli snapshot se cambiano campi usati offline"""
+		result = super(ProductTemplate, self).write(vals)
+
+		if self._raccolta_snapshot_fields.intersection(vals):
+			# L'archiviazione si propaga alle varianti, che registrano i propri tombstone
+			if self._raccolta_scope_fields.intersection(vals):
+				variant_ids = self.with_context(active_test=False).product_variant_ids.ids
+				self.env['raccolta.tombstone']._record('product.product', variant_ids, 'scope')
+			self._invalidate_raccolta_caches(barcode=bool(self._raccolta_barcode_fields.intersection(vals)))
+
+		return result
+
+	def unlink(self):
+		"""Invalida gli snapshot e registra i tombstone delle varianti alla cancellazione"""
+		variant_ids = self.with_context(active_test=False).product_variant_ids.ids
+		self.env['raccolta.tombstone']._record('product.product', variant_ids, 'unlink')
+		result = super(ProductTemplate, self).unlink()
+		self._invalidate_raccolta_caches()
+		return result
+
+
+class ProductProduct(models.Model):
+	"""Estensione varianti prodotto per mantenere aggiornati i dati offline"""
+	_inherit = 'product.product'
+
+	# Campi che alimentano gli snapshot offline
+	_raccolta_snapshot_fields = {
+		'default_code', 'barcode', 'product_tmpl_id', 'active',
+	}
+
+	# Campi che determinano il prodotto trovato per barcode
+	_raccolta_barcode_fields = {'barcode', 'product_tmpl_id', 'active'}
+
+	# === RICERCA RAPIDA ===
+	raccolta_search_key = fields.Char(
+		string='Chiave Ricerca Raccolta',
+		compute='_compute_raccolta_search_key',
+		store=True,
+		index='trigram',
+		unaccent=False,
+		help='Nome, codice, barcode e descrizione normalizzati per la ricerca rapida'
+	)
+
+	@api.depends('name', 'default_code', 'barcode', 'description_sale')
+	def _compute_raccolta_search_key(self):
+		"""Calcola chiave di ricerca normalizzata"""
+		search = self.env['raccolta.search']
+		for product in self:
+			product.raccolta_search_key = search._normalize(
+				product.name, product.default_code, product.barcode,
+				(product.description_sale or '')[:200]
+			)
+
+	def _invalidate_raccolta_caches(self, barcode=True):
+		"""Invalida snapshot offline e, se richiesto, cache barcode dei worker"""
+		self.env['raccolta.snapshot'].sudo()._invalidate_snapshots()
+		if barcode:
+			self.env['raccolta.config'].clear_caches()
+
+	@api.model_create_multi
+	def create(self, vals_list):
+		"""Invalida gli snapshot alla creazione di nuove varianti"""
+		products = super(ProductProduct, self).create(vals_list)
+		self._invalidate_raccolta_caches(barcode=any(vals.get('barcode') for vals in vals_list))
+		return products
+
+	def write(self, vals):
+		"""Invalida gli snapshot se cambiano campi usati offline"""
+		result = super(ProductProduct, self).write(vals)
+
+		if self._raccolta_snapshot_fields.intersection(vals):
+			if 'active' in vals and not vals['active']:
+				self.env['raccolta.tombstone']._record(self._name, self.ids, 'archive')
+			elif 'product_tmpl_id' in vals:
+				self.env['raccolta.tombstone']._record(self._name, self.ids, 'scope')
+			self._invalidate_raccolta_caches(barcode=bool(self._raccolta_barcode_fields.intersection(vals)))
+
+		return result
+
+	def unlink(self):
+		"""Invalida gli snapshot e registra i tombstone alla cancellazione"""
+		self.env['raccolta.tombstone']._record(self._name, self.ids, 'unlink')
+		result = super(ProductProduct, self).unlink()
+		self._invalidate_raccolta_caches()
+		return result
+
+
+class ProductCategory(models.Model):
+	"""Estensione categorie prodotto per mantenere aggiornati i dati offline"""
+	_inherit = 'product.category'
+
+	# Campi che alimentano gli snapshot offline
+	_raccolta_snapshot_fields = {'name', 'parent_id'}
+
+	def _invalidate_raccolta_caches(self, barcode=True):
+		"""Invalida snapshot offline e, se richiesto, cache barcode dei worker"""
+		self.env['raccolta.snapshot'].sudo()._invalidate_snapshots()
+		if barcode:
+			self.env['raccolta.config'].clear_caches()
+
+	@api.model_create_multi
+	def create(self, vals_list):
+		"""Invalida gli snapshot alla creazione di nuove categorie"""
+		categories = super(ProductCategory, self).create(vals_list)
+		self._invalidate_raccolta_caches(barcode=False)
+		return categories
+
+	def write(self, vals):
+		"""Invalida gli snapshot se cambiano campi usati offline"""
+		result = super(ProductCategory, self).write(vals)
+
+		if self._raccolta_snapshot_fields.intersection(vals):
+			# Il filtro categorie della ricerca barcode dipende solo dalla gerarchia
+			self._invalidate_raccolta_caches(barcode='parent_id' in vals)
+
+		return result
+
+	def unlink(self):
+		"""Invalida gli snapshot e registra i tombstone alla cancellazione"""
+		self.env['raccolta.tombstone']._record(self._name, self.ids, 'unlink')
+		result = super(ProductCategory, self).unlink()
+		self._invalidate_raccolta_caches()
+		return result
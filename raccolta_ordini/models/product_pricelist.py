@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+
+from odoo import models, api
+
+
+class ProductPricelist(models.Model):
+	"""Estensione listini per mantenere aggiornata la matrice prezzi offline"""
+	_inherit = 'product.pricelist'
+
+	# Campi che alimentano la matrice prezzi degli snapshot offline
+	_raccolta_snapshot_fields = {
+		'name', 'currency_id', 'company_id', 'active', 'sequence', 'discount_policy',
+		'country_group_ids', 'item_ids',
+	}
+
+	@api.model_create_multi
+	def create(self, vals_list):
+		"""Invalida gli snapshot alla creazione di nuovi listini"""
+		pricelists = super(ProductPricelist, self).create(vals_list)
+		self.env['raccolta.snapshot'].sudo()._invalidate_snapshots()
+		return pricelists
+
+	def write(self, vals):
+		"""Invalida gli snapshot se cambiano campi usati offline"""
+		result = super(ProductPricelist, self).write(vals)
+
+		if self._raccolta_snapshot_fields.intersection(vals):
+			self.env['raccolta.snapshot'].sudo()._invalidate_snapshots()
+
+		return result
+
+	def unlink(self):
+		"""Invalida gli snapshot alla cancellazione"""
+		result = super(ProductPricelist, self).unlink()
+		self.env['raccolta.snapshot'].sudo()._invalidate_snapshots()
+		return result
+
+
+class ProductPricelistItem(models.Model):
+	"""Estensione regole di listino: ogni modifica cambia i prezzi offline"""
+	_inherit = 'product.pricelist.item'
+
+	@api.model_create_multi
+	def create(self, vals_list):
+		"""Invalida gli snapshot alla creazione di nuove regole"""
+		items = super(ProductPricelistItem, self).create(vals_list)
+		self.env['raccolta.snapshot'].sudo()._invalidate_snapshots()
+		return items
+
+	def write(self, vals):
+		"""Invalida gli snapshot alla modifica delle regole"""
+		result = super(ProductPricelistItem, self).write(vals)
+		self.env['raccolta.snapshot'].sudo()._invalidate_snapshots()
+		return result
+
+	def unlink(self):
+		"""Invalida gli snapshot alla cancellazione"""
+		result = super(ProductPricelistItem, self).unlink()
+		self.env['raccolta.snapshot'].sudo()._invalidate_snapshots()
+		return result
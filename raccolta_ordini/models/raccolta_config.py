@@ -1,7 +1,16 @@
 # -*- coding: utf-8 -*-
 
-from odoo import models, fields, api, _
+import hashlib
+import json
+from datetime import timedelta
+
+from odoo import models, fields, api, tools, _
 from odoo.exceptions import ValidationError, UserError
+from odoo.osv import expression
+from odoo.tools.cache import STAT
+
+# Margine sul token giacenze: quant scritti da transazioni ancora aperte alla lettura del token
+STOCK_DELTA_OVERLAP = timedelta(minutes=5)
 
 
 class RaccoltaConfig(models.Model):
@@ -148,6 +157,31 @@ class RaccoltaConfig(models.Model):
 		string='Categorie Clienti Disponibili',
 		help='Categorie di clienti disponibili offline'
 	)
+	filter_key = fields.Char(
+		string='Chiave Filtri Offline',
+		compute='_compute_filter_key',
+		store=True,
+		index=True,
+		help='Hash dei filtri clienti/prodotti: configurazioni con filtri uguali condividono lo snapshot'
+	)
+
+	# === PREFETCH GIRO VISITE ===
+	partner_prefetch_mode = fields.Selection([
+		('all', 'Tutti i Clienti'),
+		('route', 'Giro Visite'),
+	], string='Prefetch Clienti', default='all', required=True,
+		help='Giro Visite: dettaglio completo e storico ordini solo per i clienti in visita '
+			 'nei prossimi giorni, indice minimo (nome, P.IVA, città) per gli altri')
+	route_prefetch_days = fields.Integer(
+		string='Giorni Giro Visite',
+		default=3,
+		help='Giorni di visite pianificate per cui precaricare i clienti'
+	)
+	route_history_limit = fields.Integer(
+		string='Ordini Storico per Cliente',
+		default=5,
+		help='Numero di ordini recenti inviati per ogni cliente del giro visite'
+	)
 
 	# === CONFIGURAZIONE SCANNER ===
 	barcode_scanner = fields.Boolean(
@@ -185,6 +219,20 @@ class RaccoltaConfig(models.Model):
 		string='Tutte le Sessioni'
 	)
 
+	# === COMPUTE METHODS ===
+	@api.depends('company_id', 'limit_categories', 'available_categ_ids',
+				 'limit_partner_categories', 'available_partner_categ_ids', 'partner_prefetch_mode')
+	def _compute_filter_key(self):
+		"""Hash dei filtri effettivi (magazzino escluso: le giacenze non sono nello snapshot)"""
+		for config in self:
+			effective_filter = [
+				config.company_id.id,
+				sorted(config.available_categ_ids.ids) if config.limit_categories else [],
+				sorted(config.available_partner_categ_ids.ids) if config.limit_partner_categories else [],
+				config.partner_prefetch_mode,
+			]
+			config.filter_key = hashlib.sha1(json.dumps(effective_filter).encode()).hexdigest()
+
 	# === CONSTRAINTS ===
 	@api.constrains('max_offline_days')
 	def _check_max_offline_days(self):
@@ -198,12 +246,59 @@ class RaccoltaConfig(models.Model):
 			if record.sync_batch_size <= 0:
 				raise ValidationError(_('La dimensione del batch deve essere maggiore di zero'))
 
+	@api.constrains('route_prefetch_days', 'route_history_limit')
+	def _check_route_prefetch(self):
+		for record in self:
+			if record.route_prefetch_days <= 0 or record.route_history_limit < 0:
+				raise ValidationError(_('I giorni del giro visite devono essere maggiori di zero '
+										'e gli ordini di storico per cliente non possono essere negativi'))
+
 	@api.constrains('limit_categories', 'available_categ_ids')
 	def _check_categories_consistency(self):
 		for record in self:
 			if record.limit_categories and not record.available_categ_ids:
 				raise ValidationError(_('Se si limitano le categorie, è necessario selezionarne almeno una'))
 
+	# === LIFECYCLE METHODS ===
+	def write(self, vals):
+		"""Registra i tombstone e prepara lo snapshot quando cambiano i filtri"""
+		# Record visibili prima del cambio filtri, per i tombstone di uscita
+		scope_before = {}
+		if set(vals) & set(self._get_scope_fields()):
+			scope_before = {config: config._get_scope_ids() for config in self}
+
+		result = super(RaccoltaConfig, self).write(vals)
+
+		for config, ids_before in scope_before.items():
+			ids_after = config._get_scope_ids()
+			for model_name, ids in ids_before.items():
+				removed_ids = sorted(ids - ids_after[model_name])
+				self.env['raccolta.tombstone']._record(model_name, removed_ids, 'scope', config)
+
+		if scope_before or 'partner_prefetch_mode' in vals:
+			# Nuova chiave filtri: lo snapshot condiviso viene creato dal cron se manca
+			self.env['raccolta.snapshot']._trigger_build()
+
+		return result
+
+	def _get_scope_fields(self):
+		"""Campi della configurazione che filtrano clienti e prodotti offline"""
+		return [
+			'company_id',
+			'limit_categories',
+			'available_categ_ids',
+			'limit_partner_categories',
+			'available_partner_categ_ids',
+		]
+
+	def _get_scope_ids(self):
+		"""ID di clienti e prodotti visibili offline con i filtri correnti"""
+		self.ensure_one()
+		return {
+			'res.partner': set(self.env['res.partner'].search(self._get_partners_domain()).ids),
+			'product.product': set(self.env['product.product'].search(self._get_products_domain()).ids),
+		}
+
 	# === ONCHANGE ===
 	@api.onchange('warehouse_id')
 	def _onchange_warehouse_id(self):
@@ -281,20 +376,340 @@ class RaccoltaConfig(models.Model):
 		"""Restituisce tutti i dati necessari per il funzionamento offline"""
 		self.ensure_one()
 
-		data = {
+		# Dati catalogo dallo snapshot precalcolato (condiviso tra configurazioni)
+		data = self._get_offline_snapshot()._get_payload()
+		data['ddt_config'].update(self._get_ddt_defaults())
+
+		# Profili riordino fuori dallo snapshot: cambiano a ogni ordine, con una versione propria
+		data['reorder_profiles'] = self._get_reorder_profile_data(
+			[p['id'] for p in data['partners']], [p['id'] for p in data['products']]
+		)
+
+		data.update({
 			'config': self._get_config_data(),
 			'company': self._get_company_data(),
-			'partners': self._get_partners_data(),
-			'products': self._get_products_data(),
+			'counters': self._get_user_counters(),
+		})
+
+		return data
+
+	def _get_snapshot_payload(self):
+		"""Dati catalogo: dipendono solo dai filtri, non dalle altre impostazioni"""
+		self.ensure_one()
+
+		partners = self._get_partners_data()
+		products = self._get_products_data()
+
+		return {
+			'partners': partners,
+			'products': products,
+			'pricelists': self._get_pricelist_data(
+				[p['id'] for p in partners], [p['id'] for p in products]
+			),
 			'categories': self._get_categories_data(),
 			'taxes': self._get_taxes_data(),
 			'uoms': self._get_uoms_data(),
-			'ddt_config': self._get_ddt_config_data(),
-			'counters': self._get_user_counters(),
+			'ddt_config': self._get_reference_data(self.company_id.id)[1]['ddt'],
+		}
+
+	def _get_dataset_version_models(self):
+		"""Modelli sorgente di ciascun dataset offline"""
+		ddt_models = [
+			'stock.picking.transport.reason',
+			'stock.picking.goods.appearance',
+			'stock.picking.transport.condition',
+			'stock.picking.transport.method',
+			'stock.delivery.note.type',
+		]
+		return {
+			'partners': ['res.partner'],
+			'products': ['product.product', 'product.template'],
+			'pricelists': [
+				'product.pricelist', 'product.pricelist.item', 'ir.property',
+				'product.product', 'product.template',
+			],
+			'categories': ['product.category'],
+			'reorder_profiles': ['raccolta.reorder.profile'],
+			'taxes': ['account.tax'],
+			'uoms': ['uom.uom'],
+			'ddt_config': [name for name in ddt_models if name in self.env],
+		}
+
+	def init(self):
+		"""Indici su write_date delle tabelle sorgente dei dataset offline"""
+		tables = {
+			self.env[model_name]._table
+			for model_names in self._get_dataset_version_models().values()
+			for model_name in model_names
+		}
+		tables.add('stock_quant')
+		for table in sorted(tables):
+			# Tabelle di modelli inizializzati dopo la configurazione: indice creato dal modello
+			if not tools.table_exists(self._cr, table):
+				continue
+			tools.create_index(self._cr, f'{table}_raccolta_write_date_index', table, ['write_date'])
+
+	def _get_dataset_version_sources(self):
+		"""Record sorgente di ciascun dataset offline: {dataset: [(modello, dominio)]}
+
+		Stessi domini usati per serializzare i dati, così le modifiche a record
+		esclusi dai filtri della configurazione non cambiano le versioni.
+		"""
+		self.ensure_one()
+		company_domain = ['|', ('company_id', '=', self.company_id.id), ('company_id', '=', False)]
+		products_domain = self._get_products_domain()
+		version_models = self._get_dataset_version_models()
+
+		return {
+			'partners': [('res.partner', self._get_partners_domain())],
+			# Campi del dominio prodotti presenti anche sul template (prezzo, nome, ...)
+			'products': [('product.product', products_domain), ('product.template', products_domain)],
+			'pricelists': [
+				('product.pricelist', company_domain),
+				('product.pricelist.item', company_domain),
+				('ir.property', expression.AND([
+					[('name', '=', 'property_product_pricelist')], company_domain
+				])),
+				('product.product', products_domain),
+				('product.template', products_domain),
+			],
+			'categories': [('product.category', self._get_categories_domain())],
+			'reorder_profiles': [('raccolta.reorder.profile', [('company_id', '=', self.company_id.id)])],
+			'taxes': [('account.tax', self._get_taxes_domain())],
+			'uoms': [('uom.uom', self._get_uoms_domain())],
+			'ddt_config': [
+				(model_name, [('company_id', '=', self.company_id.id)]
+				 if model_name == 'stock.delivery.note.type' else [])
+				for model_name in version_models['ddt_config']
+			],
+		}
+
+	def _get_dataset_version_inputs(self):
+		"""Impostazioni della configurazione che cambiano il contenuto dei dataset"""
+		self.ensure_one()
+		return {
+			'partners': [self.partner_prefetch_mode],
+			'ddt_config': [
+				self.ddt_transport_reason_id.id,
+				self.ddt_goods_appearance_id.id,
+				self.ddt_transport_condition_id.id,
+			],
+		}
+
+	def _get_dataset_versions(self):
+		"""Versione di ciascun dataset offline, senza serializzare i dati
+
+		La versione combina l'hash dei domini del dataset (filtri della
+		configurazione) con numero di righe e ultimo write_date dei soli record
+		che li soddisfano: una cancellazione, un'archiviazione o un'uscita dal
+		filtro cambiano il numero di righe. Una query per tutti i dataset e una
+		per le giacenze del magazzino.
+		"""
+		self.ensure_one()
+		sources = self._get_dataset_version_sources()
+		inputs = self._get_dataset_version_inputs()
+
+		queries = []
+		params = []
+		for dataset, dataset_sources in sources.items():
+			for index, (model_name, domain) in enumerate(dataset_sources):
+				model = self.env[model_name].sudo()
+				query_str, query_params = model._where_calc(domain).select(
+					'count(*)', f'max("{model._table}".write_date)'
+				)
+				queries.append(f'SELECT %s, %s, sub.* FROM ({query_str}) AS sub')
+				params += [dataset, index] + list(query_params)
+
+		tokens = {}
+		self.env.cr.execute(' UNION ALL '.join(queries), params)
+		for dataset, index, count, last_write in self.env.cr.fetchall():
+			tokens[(dataset, index)] = self._format_version_token(count, last_write)
+
+		versions = {}
+		for dataset, dataset_sources in sources.items():
+			scope = json.dumps([dataset_sources, inputs.get(dataset, [])], default=str)
+			parts = [hashlib.sha1(scope.encode()).hexdigest()[:8]]
+			parts += [tokens[(dataset, index)] for index in range(len(dataset_sources))]
+			versions[dataset] = '-'.join(parts)
+
+		versions['stock'] = self._get_stock_version()
+		if self.partner_prefetch_mode == 'route':
+			versions['route'] = self._get_route_version()
+		return versions
+
+	def _get_stock_version(self):
+		"""Versione delle giacenze nell'albero di ubicazioni del magazzino"""
+		self.ensure_one()
+		if not self.warehouse_id:
+			return '0'
+
+		self.env.cr.execute("""
+			SELECT count(*), max(q.write_date)
+			FROM stock_quant q
+			JOIN stock_location l ON l.id = q.location_id
+			WHERE l.parent_path LIKE %s
+		""", [f'{self.warehouse_id.lot_stock_id.parent_path}%'])
+		count, last_write = self.env.cr.fetchone()
+		return f'{self.warehouse_id.id}-{self._format_version_token(count, last_write)}'
+
+	@api.model
+	def _format_version_token(self, count, last_write):
+		"""Token compatto numero righe / ultimo write_date"""
+		return f"{count}.{int(last_write.timestamp()) if last_write else 0}"
+
+	def _get_offline_snapshot(self):
+		"""Snapshot pronto della configurazione, costruito al volo se mancante o scaduto
+
+		La riga non viene bloccata durante la serializzazione, che bloccherebbe
+		anche le scritture sul catalogo: due richieste concorrenti possono
+		costruire lo stesso snapshot e la seconda a salvarlo ottiene un errore
+		di serializzazione, ritentato da Odoo, che trova lo snapshot pronto.
+		"""
+		self.ensure_one()
+
+		snapshot = self._get_or_create_snapshot()
+		if snapshot.state != 'ready':
+			snapshot._build()
+
+		return snapshot
+
+	def _request_offline_snapshot(self):
+		"""Snapshot da scaricare senza costruirlo nella richiesta
+
+		Uno snapshot scaduto ma già costruito viene servito comunque mentre il
+		cron lo ricostruisce; se non è mai stato costruito restituisce False.
+		"""
+		self.ensure_one()
+
+		snapshot = self._get_or_create_snapshot()
+		if snapshot.state != 'ready':
+			snapshot._trigger_build()
+
+		return snapshot if snapshot.etag else False
+
+	def _get_or_create_snapshot(self):
+		"""Snapshot condiviso dalle configurazioni con gli stessi filtri
+
+		Due richieste concorrenti possono creare lo stesso snapshot: l'INSERT
+		con ON CONFLICT DO NOTHING non viola il vincolo univoco. Se la riga
+		dell'altra transazione non è visibile nello snapshot della transazione,
+		PostgreSQL solleva un errore di serializzazione e Odoo ritenta la
+		richiesta, che trova lo snapshot creato.
+		"""
+		self.ensure_one()
+
+		snapshot_model = self.env['raccolta.snapshot'].sudo()
+		snapshot = snapshot_model.search([('filter_key', '=', self.filter_key)], limit=1)
+		if snapshot:
+			return snapshot
+
+		self.env.cr.execute("""
+			INSERT INTO raccolta_snapshot (
+				filter_key, company_id, state, generation,
+				create_uid, create_date, write_uid, write_date
+			)
+			VALUES (%(key)s, %(company)s, 'stale', 0,
+					%(uid)s, now() at time zone 'UTC', %(uid)s, now() at time zone 'UTC')
+			ON CONFLICT (filter_key) DO NOTHING
+		""", {'key': self.filter_key, 'company': self.company_id.id, 'uid': self.env.uid})
+		return snapshot_model.search([('filter_key', '=', self.filter_key)], limit=1)
+
+	def _get_delta_datasets(self):
+		"""Dataset sincronizzabili in modalità delta: chiave -> (modello, dominio, serializzatore)"""
+		return {
+			'partners': ('res.partner', self._get_partners_domain(), self._serialize_partners),
+			'products': ('product.product', self._get_products_domain(), self._serialize_products),
+			'categories': ('product.category', self._get_categories_domain(), self._serialize_categories),
+			'taxes': ('account.tax', self._get_taxes_domain(), self._serialize_taxes),
+			'uoms': ('uom.uom', self._get_uoms_domain(), self._serialize_uoms),
 		}
 
+	def get_offline_delta(self, watermarks=None):
+		"""Restituisce solo le variazioni dei dati offline rispetto ai watermark del client
+
+		:param watermarks: dict {dataset: write_date} ricevuto nell'ultimo caricamento;
+			un dataset senza watermark viene restituito completo
+		"""
+		self.ensure_one()
+		watermarks = watermarks or {}
+
+		data = {}
+		for key, (model_name, domain, serializer) in self._get_delta_datasets().items():
+			data[key] = self._get_dataset_delta(model_name, domain, serializer, watermarks.get(key))
+
+		data['counters'] = self._get_user_counters()
 		return data
 
+	def _get_dataset_delta(self, model_name, domain, serializer, watermark=False):
+		"""Calcola record variati e tombstone di un dataset a partire da un watermark"""
+		model = self.env[model_name]
+		tombstone_model = self.env['raccolta.tombstone']
+
+		# Il nuovo watermark va letto prima dei record: eventuali modifiche
+		# concorrenti verranno reinviate al caricamento successivo
+		new_watermark = self._get_dataset_watermark(model_name) or watermark or False
+
+		# Watermark più vecchio della conservazione tombstone: cancellazioni non più note
+		full_reload_required = bool(watermark) and (
+			fields.Datetime.to_datetime(watermark) < tombstone_model._get_retention_limit()
+		)
+
+		if not watermark or full_reload_required:
+			return {
+				'full': True,
+				'full_reload_required': full_reload_required,
+				'records': serializer(model.search(domain)),
+				'removed_ids': [],
+				'watermark': new_watermark,
+			}
+
+		# Record creati, modificati o archiviati dopo il watermark, anche tramite
+		# i record collegati (template dei prodotti). Si usa >= perché più
+		# transazioni possono condividere lo stesso write_date: i duplicati sono
+		# innocui lato client (upsert per id)
+		since = fields.Datetime.to_datetime(watermark)
+		changed = model.with_context(active_test=False).search(expression.OR([
+			[(f'{path}write_date', '>=', since)]
+			for path in [''] + [f'{field_name}.' for field_name in self._get_delta_related_fields(model_name)]
+		]))
+		records = model.search(expression.AND([domain, [('id', 'in', changed.ids)]]))
+
+		# Variati ma non più visibili offline (archiviati o fuori filtro) e record
+		# con tombstone (cancellati o esclusi dai filtri) non di nuovo visibili
+		tombstone_ids = tombstone_model._get_removed_ids(model_name, watermark, self)
+		candidate_ids = set(changed.ids) | tombstone_ids
+		visible_ids = set(records.ids) | set(model.search(
+			expression.AND([domain, [('id', 'in', list(tombstone_ids))]])
+		).ids)
+		removed_ids = sorted(candidate_ids - visible_ids)
+
+		return {
+			'full': False,
+			'full_reload_required': False,
+			'records': serializer(records),
+			'removed_ids': removed_ids,
+			'watermark': new_watermark,
+		}
+
+	def _get_delta_related_fields(self, model_name):
+		"""Campi many2one i cui record alimentano il dataset: una loro modifica lo varia"""
+		return {
+			'product.product': ['product_tmpl_id'],
+		}.get(model_name, [])
+
+	def _get_dataset_watermark(self, model_name):
+		"""Ultimo write_date del modello e dei record collegati (archiviati inclusi) come stringa"""
+		model = self.env[model_name]
+		model_names = [model_name] + [
+			model._fields[field_name].comodel_name for field_name in self._get_delta_related_fields(model_name)
+		]
+		write_dates = []
+		for name in model_names:
+			last = self.env[name].with_context(active_test=False).search([], order='write_date desc', limit=1)
+			if last:
+				write_dates.append(last.write_date)
+		return fields.Datetime.to_string(max(write_dates)) if write_dates else False
+
 	def _get_config_data(self):
 		"""Dati della configurazione per offline"""
 		return {
@@ -311,6 +726,9 @@ class RaccoltaConfig(models.Model):
 			'signature_required': self.signature_required,
 			'receipt_header': self.receipt_header or '',
 			'receipt_footer': self.receipt_footer or '',
+			'partner_prefetch_mode': self.partner_prefetch_mode,
+			'route_prefetch_days': self.route_prefetch_days,
+			'sync_batch_size': self.sync_batch_size,
 		}
 
 	def _get_company_data(self):
@@ -331,16 +749,111 @@ class RaccoltaConfig(models.Model):
 			'website': company.website or '',
 		}
 
-	def _get_partners_data(self):
-		"""Carica clienti per uso offline"""
-		domain = [('customer_rank', '>', 0)]
+	def _get_partners_domain(self):
+		"""Dominio clienti caricabili offline"""
+		domain = [
+			('customer_rank', '>', 0),
+			'|', ('company_id', '=', self.company_id.id), ('company_id', '=', False)
+		]
 
 		# Filtra per categorie se configurato
 		if self.limit_partner_categories and self.available_partner_categ_ids:
 			domain.append(('category_id', 'in', self.available_partner_categ_ids.ids))
 
-		partners = self.env['res.partner'].search(domain)
+		return domain
+
+	def _get_partners_data(self):
+		"""Carica clienti per uso offline (solo indice minimo in modalità giro visite)"""
+		serializer = self.env['raccolta.serializer']
+		if self.partner_prefetch_mode == 'route':
+			return serializer._serialize_partner_index(self._get_partners_domain())
+		return serializer._serialize_partners(self._get_partners_domain())
+
+	# === GIRO VISITE ===
+	def get_route_data(self, user=None):
+		"""Clienti del giro visite dell'agente con dettaglio completo e storico ordini"""
+		self.ensure_one()
+		visits = self._get_route_visits(user)
+		partner_domain = expression.AND([
+			self._get_partners_domain(), [('id', 'in', visits.partner_id.ids)]
+		])
+		partners = self.env['raccolta.serializer']._serialize_partners(partner_domain)
+		partner_ids = [partner['id'] for partner in partners]
+
+		return {
+			'visits': [{
+				'id': visit.id,
+				'partner_id': visit.partner_id.id,
+				'visit_date': fields.Date.to_string(visit.visit_date),
+				'sequence': visit.sequence,
+				'note': visit.note or '',
+			} for visit in visits if visit.partner_id.id in partner_ids],
+			'partners': partners,
+			'order_history': self._get_route_order_history(partner_ids),
+		}
+
+	def _get_route_visits(self, user=None):
+		"""Visite pianificate dell'agente nei giorni del giro"""
+		self.ensure_one()
+		return self.env['raccolta.visit'].search(
+			self.env['raccolta.visit']._get_route_domain(user or self.env.user, self.route_prefetch_days)
+		)
+
+	def _get_route_order_history(self, partner_ids):
+		"""Ultimi ordini confermati per cliente, con righe: {partner_id: [ordini]}"""
+		self.ensure_one()
+		if not partner_ids or not self.route_history_limit:
+			return {}
+
+		# Ultimi N ordini per cliente in una sola query (finestra per cliente)
+		self.env.cr.execute("""
+			SELECT id FROM (
+				SELECT so.id,
+					   row_number() OVER (PARTITION BY so.partner_id ORDER BY so.date_order DESC, so.id DESC) AS rank
+				FROM sale_order so
+				WHERE so.partner_id IN %s
+				  AND so.company_id = %s
+				  AND so.state IN ('sale', 'done')
+			) ranked
+			WHERE rank <= %s
+		""", [tuple(partner_ids), self.company_id.id, self.route_history_limit])
+		orders = self.env['sale.order'].browse([row[0] for row in self.env.cr.fetchall()])
+
+		lines_by_order = {}
+		for line in self.env['sale.order.line'].search_read([
+			('order_id', 'in', orders.ids),
+			('display_type', '=', False),
+		], ['order_id', 'product_id', 'product_uom_qty', 'price_unit', 'discount']):
+			lines_by_order.setdefault(line['order_id'][0], []).append({
+				'product_id': line['product_id'][0] if line['product_id'] else False,
+				'quantity': line['product_uom_qty'],
+				'price_unit': line['price_unit'],
+				'discount': line['discount'],
+			})
+
+		history = {}
+		for order in orders.sorted(lambda o: o.date_order, reverse=True):
+			history.setdefault(order.partner_id.id, []).append({
+				'id': order.id,
+				'name': order.name,
+				'date_order': fields.Datetime.to_string(order.date_order),
+				'amount_total': order.amount_total,
+				'lines': lines_by_order.get(order.id, []),
+			})
+		return history
+
+	def _get_route_version(self):
+		"""Versione del giro visite dell'agente corrente"""
+		self.ensure_one()
+		visits = self.env['raccolta.visit'].search(
+			self.env['raccolta.visit']._get_route_domain(self.env.user, self.route_prefetch_days),
+			order='write_date desc'
+		)
+		last_write = visits[:1].write_date
+		return f"{fields.Date.context_today(self)}-{self._format_version_token(len(visits), last_write)}"
 
+	def _serialize_partners(self, partners):
+		"""Serializza clienti nel formato offline"""
 		return [{
 			'id': p.id,
 			'name': p.name,
@@ -357,10 +870,11 @@ class RaccoltaConfig(models.Model):
 			'is_company': p.is_company,
 			'customer_rank': p.customer_rank,
 			'supplier_rank': p.supplier_rank,
+			'category_ids': p.category_id.ids,
 		} for p in partners]
 
-	def _get_products_data(self):
-		"""Carica prodotti per uso offline"""
+	def _get_products_domain(self):
+		"""Dominio prodotti caricabili offline"""
 		domain = [
 			('sale_ok', '=', True),
 			('type', 'in', ['product', 'consu']),
@@ -371,8 +885,14 @@ class RaccoltaConfig(models.Model):
 		if self.limit_categories and self.available_categ_ids:
 			domain.append(('categ_id', 'child_of', self.available_categ_ids.ids))
 
-		products = self.env['product.product'].search(domain)
+		return domain
 
+	def _get_products_data(self):
+		"""Carica prodotti per uso offline"""
+		return self.env['raccolta.serializer']._serialize_products(self._get_products_domain())
+
+	def _serialize_products(self, products):
+		"""Serializza prodotti nel formato offline"""
 		return [{
 			'id': p.id,
 			'name': p.name,
@@ -384,14 +904,269 @@ class RaccoltaConfig(models.Model):
 			'uom_name': p.uom_id.name,
 			'categ_id': p.categ_id.id,
 			'categ_name': p.categ_id.name,
-			'taxes_id': p.taxes_id.ids,
+			'taxes_id': p.taxes_id.filtered(lambda t: t.company_id == self.company_id).ids,
 			'type': p.type,
 			'tracking': p.tracking,
 		} for p in products]
 
+	def _get_pricelist_data(self, partner_ids=None, product_ids=None):
+		"""Matrice prezzi dei listini usati dai clienti offline
+
+		Le regole di ciascun listino sono valutate una sola volta su tutti i
+		prodotti. I prezzi sono allineati a product_ids; il listino più diffuso
+		è quello di default e partner_pricelists riporta solo le eccezioni.
+		"""
+		self.ensure_one()
+		if partner_ids is None:
+			partner_ids = self.env['res.partner'].search(self._get_partners_domain()).ids
+		if product_ids is None:
+			product_ids = self.env['product.product'].search(self._get_products_domain()).ids
+
+		partner_pricelists = self.env['product.pricelist']._get_partner_pricelist_multi(partner_ids)
+		usage = {}
+		for pricelist in partner_pricelists.values():
+			usage[pricelist.id] = usage.get(pricelist.id, 0) + 1
+		default_pricelist_id = max(usage, key=usage.get) if usage else False
+
+		products = self.env['product.product'].browse(product_ids)
+		precision = self.env['decimal.precision'].precision_get('Product Price')
+
+		pricelists = []
+		for pricelist in self.env['product.pricelist'].browse(sorted(usage)):
+			prices = pricelist._get_products_price(products, 1.0)
+			pricelists.append({
+				'id': pricelist.id,
+				'name': pricelist.name,
+				'currency_id': pricelist.currency_id.id,
+				'prices': [round(prices.get(pid, 0.0), precision) for pid in product_ids],
+			})
+
+		return {
+			'product_ids': list(product_ids),
+			'default_pricelist_id': default_pricelist_id,
+			'pricelists': pricelists,
+			'partner_pricelists': {
+				partner_id: pricelist.id
+				for partner_id, pricelist in partner_pricelists.items()
+				if pricelist.id != default_pricelist_id
+			},
+		}
+
+	def _get_reorder_profile_data(self, partner_ids=None, product_ids=None):
+		"""Prodotti abituali per cliente, limitati ai prodotti offline"""
+		self.ensure_one()
+		if partner_ids is None:
+			partner_ids = self.env['res.partner'].search(self._get_partners_domain()).ids
+		if product_ids is None:
+			product_ids = self.env['product.product'].search(self._get_products_domain()).ids
+
+		return {
+			'fields': ['product_id', 'order_count', 'last_qty', 'last_price', 'last_date'],
+			'profiles': self.env['raccolta.reorder.profile']._get_profiles(
+				self.company_id.id, partner_ids, product_ids
+			),
+		}
+
+	def _get_stock_quantities(self, product_ids=None):
+		"""Quantità disponibile per prodotto nel magazzino della configurazione
+
+		Una sola query raggruppata sui quant dell'albero di ubicazioni del magazzino
+		(tutti i prodotti se product_ids è None); i prodotti senza quant non
+		compaiono nel risultato.
+		"""
+		self.ensure_one()
+		if (product_ids is not None and not product_ids) or not self.warehouse_id:
+			return {}
+
+		stock_location = self.warehouse_id.lot_stock_id
+		domain = [('location_id.parent_path', '=like', f'{stock_location.parent_path}%')]
+		if product_ids is not None:
+			domain.append(('product_id', 'in', list(product_ids)))
+		groups = self.env['stock.quant'].read_group(
+			domain, ['quantity:sum', 'reserved_quantity:sum'], ['product_id'], lazy=False
+		)
+
+		return {
+			group['product_id'][0]: group['quantity'] - group['reserved_quantity']
+			for group in groups
+		}
+
+	def get_stock_data(self, since=None):
+		"""Giacenze disponibili del magazzino come [[product_id, qty]]
+
+		:param since: token restituito dalla chiamata precedente; se valido
+			vengono restituiti solo i prodotti con quant modificati da poco prima
+			di esso (STOCK_DELTA_OVERLAP): i prodotti ripetuti sono innocui lato
+			client, che aggiorna per id. Il token contiene anche il numero di
+			quant: se nel frattempo ne sono stati eliminati (pulizia dei quant a
+			zero) il delta non li vedrebbe e viene restituito l'insieme completo
+		"""
+		self.ensure_one()
+		if not self.warehouse_id:
+			return {'full': True, 'stock': [], 'token': False}
+
+		stock_location = self.warehouse_id.lot_stock_id
+		location_domain = [('location_id.parent_path', '=like', f'{stock_location.parent_path}%')]
+		Quant = self.env['stock.quant']
+
+		# Token letto prima dei quant: le variazioni concorrenti tornano al giro successivo
+		last_quant = Quant.search(location_domain, order='write_date desc', limit=1)
+		quant_count = Quant.search_count(location_domain)
+		token = (
+			f"{self.warehouse_id.id}@{quant_count}@{fields.Datetime.to_string(last_quant.write_date)}"
+			if last_quant else False
+		)
+
+		if self._is_stock_delta_valid(since, location_domain, quant_count):
+			watermark = since.split('@')[2]
+			since_date = fields.Datetime.to_datetime(watermark) - STOCK_DELTA_OVERLAP
+			changed = Quant.read_group(
+				expression.AND([location_domain, [('write_date', '>=', since_date)]]),
+				['product_id'], ['product_id'], lazy=False
+			)
+			product_ids = [group['product_id'][0] for group in changed]
+			quantities = self._get_stock_quantities(product_ids)
+			# Prodotti con quant variati ma senza più giacenza
+			stock = [[product_id, quantities.get(product_id, 0.0)] for product_id in product_ids]
+			return {'full': False, 'stock': stock, 'token': token or since}
+
+		quantities = self._get_stock_quantities()
+		return {
+			'full': True,
+			'stock': [[product_id, qty] for product_id, qty in quantities.items()],
+			'token': token,
+		}
+
+	def _is_stock_delta_valid(self, since, location_domain, quant_count):
+		"""Il token consente un delta: stesso magazzino e nessun quant eliminato dopo di esso
+
+		I quant attuali, tolti quelli creati dopo il token, devono essere almeno
+		quanti erano alla lettura del token.
+		"""
+		parts = (since or '').split('@')
+		if len(parts) != 3 or parts[0] != str(self.warehouse_id.id) or not parts[1].isdigit() or not parts[2]:
+			return False
+
+		created = self.env['stock.quant'].search_count(expression.AND([
+			location_domain, [('create_date', '>', fields.Datetime.to_datetime(parts[2]))]
+		]))
+		return quant_count - created >= int(parts[1])
+
+	def _get_barcode_product(self, barcode):
+		"""Prodotto della configurazione per barcode
+
+		:return: (id prodotto, dati serializzati senza stock) oppure (False, None)
+		"""
+		self.ensure_one()
+		product_id = self._lookup_barcode_product(barcode)
+		if not product_id:
+			return False, None
+
+		# Dati letti a ogni richiesta: la cache contiene solo l'esito della ricerca
+		product = self.env['product.product'].browse(product_id)
+		return product.id, {
+			'id': product.id,
+			'name': product.name,
+			'default_code': product.default_code or '',
+			'barcode': product.barcode,
+			'list_price': product.list_price,
+			'uom_id': product.uom_id.id,
+			'uom_name': product.uom_id.name,
+			'categ_id': product.categ_id.id,
+			'categ_name': product.categ_id.name,
+			'taxes_id': product.taxes_id.ids,
+			'description_sale': product.description_sale or '',
+			'type': product.type,
+			'tracking': product.tracking,
+		}
+
+	@tools.ormcache('self.filter_key', 'barcode')
+	def _lookup_barcode_product(self, barcode):
+		"""ID del prodotto per barcode, nella cache LRU del registry (per worker)
+
+		Chiave per filtri: le configurazioni con filtri uguali condividono le voci.
+		La cache viene svuotata da clear_caches() solo quando cambiano i campi
+		del dominio di ricerca (barcode, vendibilità, attivo, azienda, categoria).
+		"""
+		domain = [
+			('barcode', '=', barcode),
+			('sale_ok', '=', True),
+			('active', '=', True),
+			'|', ('company_id', '=', self.company_id.id), ('company_id', '=', False)
+		]
+
+		# Filtra per categorie se configurato
+		if self.limit_categories and self.available_categ_ids:
+			domain.append(('categ_id', 'child_of', self.available_categ_ids.ids))
+
+		return self.env['product.product'].search(domain, limit=1).id
+
+	@api.model
+	def get_barcode_cache_stats(self):
+		"""Contatori hit/miss della cache barcode nel worker corrente"""
+		method = type(self)._lookup_barcode_product
+		counter = STAT[(self.pool.db_name, self._name, getattr(method, '__wrapped__', method))]
+		return {
+			'hit': counter.hit,
+			'miss': counter.miss,
+			'ratio': round(counter.ratio, 2),
+		}
+
+	def _get_product_image_checksums(self, products):
+		"""Checksum dell'immagine 128px per prodotto (variante, altrimenti template)"""
+		if not products:
+			return {}
+
+		attachments = self.env['ir.attachment'].sudo().search_read([
+			'|',
+			'&', '&',
+			('res_model', '=', 'product.product'),
+			('res_field', '=', 'image_variant_128'),
+			('res_id', 'in', products.ids),
+			'&', '&',
+			('res_model', '=', 'product.template'),
+			('res_field', '=', 'image_128'),
+			('res_id', 'in', products.product_tmpl_id.ids),
+		], ['res_model', 'res_id', 'checksum'])
+
+		variant_checksums = {}
+		template_checksums = {}
+		for attachment in attachments:
+			if attachment['res_model'] == 'product.product':
+				variant_checksums[attachment['res_id']] = attachment['checksum']
+			else:
+				template_checksums[attachment['res_id']] = attachment['checksum']
+
+		return {
+			product.id: variant_checksums.get(product.id) or template_checksums.get(product.product_tmpl_id.id)
+			for product in products
+		}
+
+	@api.model
+	def _get_product_image_attachments(self, checksums):
+		"""Allegati immagine prodotto per checksum (uno per checksum)"""
+		attachments = self.env['ir.attachment'].sudo().search([
+			('checksum', 'in', list(checksums)),
+			('res_model', 'in', ['product.product', 'product.template']),
+			('res_field', 'in', ['image_variant_128', 'image_128']),
+		])
+
+		by_checksum = {}
+		for attachment in attachments:
+			by_checksum.setdefault(attachment.checksum, attachment)
+		return by_checksum
+
+	def _get_categories_domain(self):
+		"""Dominio categorie prodotti"""
+		return []
+
 	def _get_categories_data(self):
 		"""Carica categorie prodotti"""
-		categories = self.env['product.category'].search([])
+		categories = self.env['product.category'].search(self._get_categories_domain())
+		return self._serialize_categories(categories)
+
+	def _serialize_categories(self, categories):
+		"""Serializza categorie nel formato offline"""
 		return [{
 			'id': c.id,
 			'name': c.name,
@@ -399,12 +1174,19 @@ class RaccoltaConfig(models.Model):
 			'parent_path': c.parent_path or '',
 		} for c in categories]
 
-	def _get_taxes_data(self):
-		"""Carica tasse per calcoli"""
-		taxes = self.env['account.tax'].search([
+	def _get_taxes_domain(self):
+		"""Dominio tasse di vendita dell'azienda"""
+		return [
 			('company_id', '=', self.company_id.id),
 			('type_tax_use', '=', 'sale')
-		])
+		]
+
+	def _get_taxes_data(self):
+		"""Carica tasse per calcoli (dal pacchetto dati di riferimento)"""
+		return self._get_reference_data(self.company_id.id)[1]['taxes']
+
+	def _serialize_taxes(self, taxes):
+		"""Serializza tasse nel formato offline"""
 		return [{
 			'id': t.id,
 			'name': t.name,
@@ -412,21 +1194,82 @@ class RaccoltaConfig(models.Model):
 			'amount_type': t.amount_type,
 			'include_base_amount': t.include_base_amount,
 			'sequence': t.sequence,
+			'description': t.description or '',
+			'active': t.active,
 		} for t in taxes]
 
+	def _get_uoms_domain(self):
+		"""Dominio unità di misura"""
+		return []
+
 	def _get_uoms_data(self):
-		"""Carica unità di misura"""
-		uoms = self.env['uom.uom'].search([])
+		"""Carica unità di misura (dal pacchetto dati di riferimento)"""
+		return self._get_reference_data(self.company_id.id)[1]['uoms']
+
+	def _serialize_uoms(self, uoms):
+		"""Serializza unità di misura nel formato offline"""
 		return [{
 			'id': u.id,
 			'name': u.name,
 			'category_id': u.category_id.id,
+			'category_name': u.category_id.name,
 			'factor': u.factor,
+			'factor_inv': u.factor_inv,
 			'rounding': u.rounding,
+			'uom_type': u.uom_type,
 		} for u in uoms]
 
 	def _get_ddt_config_data(self):
-		"""Carica configurazioni DDT"""
+		"""Carica configurazioni DDT: tabelle dal pacchetto di riferimento più i default"""
+		data = self._get_reference_data(self.company_id.id)[1]['ddt']
+		data.update(self._get_ddt_defaults())
+		return data
+
+	def _get_ddt_defaults(self):
+		"""Valori DDT di default della configurazione"""
+		return {
+			'default_transport_reason_id': self.ddt_transport_reason_id.id if self.ddt_transport_reason_id else False,
+			'default_goods_appearance_id': self.ddt_goods_appearance_id.id if self.ddt_goods_appearance_id else False,
+			'default_transport_condition_id': self.ddt_transport_condition_id.id if self.ddt_transport_condition_id else False,
+		}
+
+	# === DATI DI RIFERIMENTO ===
+	@api.model
+	def _get_reference_data(self, company_id):
+		"""Pacchetto dati di riferimento dell'azienda (tasse, UoM, tabelle DDT)
+
+		:return: (etag, dati) - i dati sono una copia modificabile
+		"""
+		etag, raw = self._build_reference_data(company_id)
+		return etag, json.loads(raw)
+
+	@api.model
+	def _get_reference_json(self, company_id):
+		"""Pacchetto dati di riferimento già serializzato: (etag, json)"""
+		return self._build_reference_data(company_id)
+
+	@api.model
+	@tools.ormcache('company_id', 'self.env.lang')
+	def _build_reference_data(self, company_id):
+		"""Serializza i dati di riferimento, in cache per worker
+
+		Invalidata da clear_caches() alla modifica di tasse, UoM e tabelle DDT.
+		"""
+		config = self.sudo().with_company(company_id)
+		data = {
+			'taxes': config._serialize_taxes(config.env['account.tax'].search([
+				('company_id', '=', company_id),
+				('type_tax_use', '=', 'sale'),
+			], order='sequence, name')),
+			'uoms': config._serialize_uoms(config.env['uom.uom'].search([], order='category_id, name')),
+			'ddt': config._get_ddt_lookup_data(company_id),
+		}
+		raw = json.dumps(data, separators=(',', ':'), default=str)
+		return hashlib.sha1(raw.encode()).hexdigest(), raw
+
+	@api.model
+	def _get_ddt_lookup_data(self, company_id):
+		"""Tabelle DDT (causali, aspetto beni, porto, trasporto, tipi)"""
 		return {
 			'transport_reasons': [{
 				'id': r.id,
@@ -458,12 +1301,8 @@ class RaccoltaConfig(models.Model):
 				'code': t.code,
 				'print_prices': t.print_prices,
 			} for t in self.env['stock.delivery.note.type'].search([
-				('company_id', '=', self.company_id.id)
+				('company_id', '=', company_id)
 			])],
-
-			'default_transport_reason_id': self.ddt_transport_reason_id.id if self.ddt_transport_reason_id else False,
-			'default_goods_appearance_id': self.ddt_goods_appearance_id.id if self.ddt_goods_appearance_id else False,
-			'default_transport_condition_id': self.ddt_transport_condition_id.id if self.ddt_transport_condition_id else False,
 		}
 
 	def _get_user_counters(self):
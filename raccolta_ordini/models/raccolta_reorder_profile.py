@@ -0,0 +1,217 @@
+# -*- coding: utf-8 -*-
+
+import logging
+from datetime import timedelta
+
+import psycopg2
+
+from odoo import models, fields, api, tools
+
+_logger = logging.getLogger(__name__)
+
+# Prodotti conservati per cliente e clienti ricalcolati per blocco
+DEFAULT_PROFILE_SIZE = 20
+REFRESH_CHUNK_SIZE = 1000
+
+# Margine sul watermark: ordini di transazioni ancora aperte alla lettura del watermark
+REFRESH_OVERLAP = timedelta(minutes=10)
+
+
+class RaccoltaReorderProfile(models.Model):
+	"""Prodotti abituali per cliente (frequenza, ultima quantità e prezzo), precalcolati"""
+	_name = 'raccolta.reorder.profile'
+	_description = 'Profilo Riordino Cliente Raccolta'
+	_order = 'partner_id, rank'
+	_rec_name = 'product_id'
+
+	partner_id = fields.Many2one(
+		'res.partner',
+		string='Cliente',
+		required=True,
+		index=True,
+		ondelete='cascade'
+	)
+	product_id = fields.Many2one(
+		'product.product',
+		string='Prodotto',
+		required=True,
+		ondelete='cascade'
+	)
+	company_id = fields.Many2one(
+		'res.company',
+		string='Azienda',
+		required=True,
+		ondelete='cascade'
+	)
+	order_count = fields.Integer(
+		string='Numero Ordini'
+	)
+	total_qty = fields.Float(
+		string='Quantità Totale'
+	)
+	last_qty = fields.Float(
+		string='Ultima Quantità'
+	)
+	last_price = fields.Float(
+		string='Ultimo Prezzo'
+	)
+	last_date = fields.Datetime(
+		string='Ultimo Ordine'
+	)
+	rank = fields.Integer(
+		string='Posizione',
+		help='1 = prodotto più ordinato dal cliente'
+	)
+
+	_sql_constraints = [
+		('partner_product_company_uniq', 'unique(partner_id, product_id, company_id)',
+		 'Profilo riordino già presente per questo cliente e prodotto'),
+	]
+
+	def init(self):
+		"""Indici per gli ordini modificati dopo il watermark e per la versione dataset"""
+		tools.create_index(self._cr, 'sale_order_raccolta_write_date_index', 'sale_order', ['write_date'])
+		tools.create_index(
+			self._cr, 'raccolta_reorder_profile_raccolta_write_date_index', self._table, ['write_date']
+		)
+
+	# === AGGIORNAMENTO ===
+	@api.model
+	def _get_profile_size(self):
+		"""Prodotti per cliente (parametro raccolta_ordini.reorder_profile_size)"""
+		return int(self.env['ir.config_parameter'].sudo().get_param(
+			'raccolta_ordini.reorder_profile_size', DEFAULT_PROFILE_SIZE
+		))
+
+	@api.model
+	def _refresh_partners(self, partner_ids):
+		"""Ricalcola i profili dei clienti indicati con query di insieme
+
+		Legge solo lo storico dei clienti interessati; contano gli ordini
+		confermati e gli ordini offline non annullati. Ogni blocco è nel proprio
+		savepoint: un blocco in conflitto con un aggiornamento concorrente viene
+		saltato.
+
+		:return: ID dei clienti dei blocchi saltati, da riprendere
+		"""
+		partner_ids = sorted(set(partner_ids))
+		failed_ids = []
+		for start in range(0, len(partner_ids), REFRESH_CHUNK_SIZE):
+			chunk = tuple(partner_ids[start:start + REFRESH_CHUNK_SIZE])
+			try:
+				with self.env.cr.savepoint():
+					self._refresh_chunk(chunk)
+			except psycopg2.IntegrityError as e:
+				_logger.warning(f"Profili riordino di {len(chunk)} clienti aggiornati in parallelo, blocco saltato: {str(e)}")
+				failed_ids.extend(chunk)
+
+		if partner_ids:
+			self.invalidate_model()
+		return failed_ids
+
+	@api.model
+	def _refresh_chunk(self, chunk):
+		"""Sostituisce i profili di un blocco di clienti con un DELETE e un INSERT"""
+		self.env.cr.execute(
+			"DELETE FROM raccolta_reorder_profile WHERE partner_id IN %s", [chunk]
+		)
+		self.env.cr.execute("""
+			INSERT INTO raccolta_reorder_profile (
+				partner_id, product_id, company_id, order_count, total_qty,
+				last_qty, last_price, last_date, rank,
+				create_uid, create_date, write_uid, write_date
+			)
+			SELECT partner_id, product_id, company_id, order_count, total_qty,
+				   last_qty, last_price, last_date, rank,
+				   %(uid)s, now() at time zone 'UTC', %(uid)s, now() at time zone 'UTC'
+			FROM (
+				SELECT stats.*,
+					   row_number() OVER (
+						   PARTITION BY stats.partner_id, stats.company_id
+						   ORDER BY stats.order_count DESC, stats.last_date DESC, stats.product_id
+					   ) AS rank
+				FROM (
+					SELECT so.partner_id, sol.product_id, so.company_id,
+						   count(DISTINCT so.id) AS order_count,
+						   sum(sol.product_uom_qty) AS total_qty,
+						   (array_agg(sol.product_uom_qty ORDER BY so.date_order DESC, sol.id DESC))[1] AS last_qty,
+						   (array_agg(sol.price_unit ORDER BY so.date_order DESC, sol.id DESC))[1] AS last_price,
+						   max(so.date_order) AS last_date
+					FROM sale_order_line sol
+					JOIN sale_order so ON so.id = sol.order_id
+					WHERE so.partner_id IN %(partners)s
+					  AND sol.product_id IS NOT NULL
+					  AND sol.display_type IS NULL
+					  AND (so.state IN ('sale', 'done')
+						   OR (so.is_offline_order AND so.state != 'cancel'))
+					GROUP BY so.partner_id, sol.product_id, so.company_id
+				) stats
+			) ranked
+			WHERE rank <= %(size)s
+		""", {'uid': self.env.uid, 'partners': chunk, 'size': self._get_profile_size()})
+
+	@api.model
+	def _trigger_refresh(self):
+		"""Richiede al cron l'aggiornamento dei profili dei clienti con ordini nuovi o modificati"""
+		cron = self.env.ref('raccolta_ordini.ir_cron_refresh_reorder_profiles', raise_if_not_found=False)
+		if cron:
+			cron.sudo()._trigger()
+
+	@api.model
+	def _cron_refresh_profiles(self):
+		"""Aggiorna i profili dei clienti con ordini modificati dopo l'ultimo watermark
+
+		I clienti dei blocchi saltati restano in raccolta_ordini.reorder_profile_retry
+		e sono ricalcolati al giro successivo, anche se il watermark è avanzato.
+		"""
+		params = self.env['ir.config_parameter'].sudo()
+		watermark = params.get_param('raccolta_ordini.reorder_profile_watermark')
+		retry_param = params.get_param('raccolta_ordini.reorder_profile_retry') or ''
+		retry_ids = {int(partner_id) for partner_id in retry_param.split(',') if partner_id}
+
+		# Watermark letto prima: gli ordini modificati nel frattempo restano per il giro successivo
+		self.env.cr.execute("SELECT max(write_date) FROM sale_order")
+		new_watermark = self.env.cr.fetchone()[0]
+
+		if watermark:
+			since = fields.Datetime.to_datetime(watermark) - REFRESH_OVERLAP
+			self.env.cr.execute(
+				"SELECT DISTINCT partner_id FROM sale_order WHERE write_date >= %s", [since]
+			)
+		else:
+			self.env.cr.execute("SELECT DISTINCT partner_id FROM sale_order")
+		partner_ids = list({row[0] for row in self.env.cr.fetchall()} | retry_ids)
+
+		failed_ids = self._refresh_partners(partner_ids)
+		# Parametro rimosso se non ci sono blocchi da riprendere
+		params.set_param(
+			'raccolta_ordini.reorder_profile_retry', ','.join(str(partner_id) for partner_id in failed_ids) or False
+		)
+		if new_watermark:
+			params.set_param('raccolta_ordini.reorder_profile_watermark', fields.Datetime.to_string(new_watermark))
+
+		_logger.info(f"Profili riordino aggiornati per {len(partner_ids) - len(failed_ids)} clienti, "
+					 f"{len(failed_ids)} da riprendere")
+
+	# === LETTURA ===
+	@api.model
+	def _get_profiles(self, company_id, partner_ids, product_ids):
+		"""Profili compatti per i dati offline: {partner_id: [[prodotto, ordini, qtà, prezzo, data]]}"""
+		if not partner_ids or not product_ids:
+			return {}
+
+		self.env.cr.execute("""
+			SELECT partner_id, product_id, order_count, last_qty, last_price, last_date
+			FROM raccolta_reorder_profile
+			WHERE company_id = %s
+			  AND partner_id = ANY(%s)
+			  AND product_id = ANY(%s)
+			ORDER BY partner_id, rank
+		""", [company_id, list(partner_ids), list(product_ids)])
+
+		profiles = {}
+		for partner_id, product_id, order_count, last_qty, last_price, last_date in self.env.cr.fetchall():
+			profiles.setdefault(partner_id, []).append([
+				product_id, order_count, last_qty, last_price, fields.Datetime.to_string(last_date),
+			])
+		return profiles
@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+
+import unicodedata
+
+from odoo import models, api
+from odoo.osv import expression
+
+# Lunghezza massima della chiave di ricerca (resta indicizzabile anche senza pg_trgm)
+SEARCH_KEY_MAX_LENGTH = 512
+
+
+class RaccoltaSearch(models.AbstractModel):
+	"""Ricerca rapida per autocomplete su chiave normalizzata e indice trigram"""
+	_name = 'raccolta.search'
+	_description = 'Ricerca Rapida Raccolta Ordini'
+
+	@api.model
+	def _normalize(self, *values):
+		"""Chiave di ricerca: valori concatenati, minuscoli e senza accenti"""
+		text = ' '.join(value for value in values if value)
+		text = unicodedata.normalize('NFKD', text).encode('ascii', 'ignore').decode()
+		return ' '.join(text.lower().split())[:SEARCH_KEY_MAX_LENGTH]
+
+	@api.model
+	def _search_ranked(self, model_name, domain, search_term, limit=20, order='name'):
+		"""Cerca sulla chiave normalizzata ordinando per similarità
+
+		Con pg_trgm disponibile il filtro usa l'indice GIN trigram e i risultati
+		sono ordinati per word_similarity; altrimenti ricade su un ilike con
+		l'ordinamento indicato.
+		"""
+		model = self.env[model_name]
+		term = self._normalize(search_term)
+		if not term:
+			return model.browse()
+
+		domain = expression.AND([domain, [('raccolta_search_key', 'ilike', term)]])
+
+		if not self.env.registry.has_trigram:
+			return model.search(domain, limit=limit, order=order)
+
+		# Sottoquery con regole di accesso applicate, poi ordinamento per similarità
+		subquery, params = model._search(domain).subselect()
+		self.env.cr.execute(f"""
+			SELECT t.id
+			FROM "{model._table}" t
+			WHERE t.id IN ({subquery})
+			ORDER BY word_similarity(%s, t.raccolta_search_key) DESC, t.id
+			LIMIT %s
+		""", params + [term, limit])
+
+		return model.browse([row[0] for row in self.env.cr.fetchall()])
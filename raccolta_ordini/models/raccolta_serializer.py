@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+
+from odoo import models, api
+
+
+class RaccoltaSerializer(models.AbstractModel):
+	"""Serializzazione SQL dei dataset offline voluminosi (clienti e prodotti)
+
+	Produce gli stessi dizionari dei serializzatori ORM di raccolta.config con
+	una sola query per dataset: i record sono selezionati tramite _search, così
+	regole di accesso e filtri aziendali restano quelli del dominio ORM.
+	"""
+	_name = 'raccolta.serializer'
+	_description = 'Serializzatore Dati Offline Raccolta'
+
+	@api.model
+	def _get_lang(self):
+		"""Lingua per i campi tradotti (jsonb)"""
+		return self.env.lang or 'en_US'
+
+	@api.model
+	def _serialize_partners(self, domain):
+		"""Clienti del dominio nel formato offline"""
+		subquery, params = self.env['res.partner']._search(domain).subselect()
+
+		self.env.cr.execute(f"""
+			SELECT p.id,
+				   p.name,
+				   COALESCE(p.street, '') AS street,
+				   COALESCE(p.street2, '') AS street2,
+				   COALESCE(p.city, '') AS city,
+				   COALESCE(p.zip, '') AS zip,
+				   COALESCE(s.name, '') AS state,
+				   COALESCE(c.name->>%s, c.name->>'en_US', '') AS country_id,
+				   COALESCE(p.phone, '') AS phone,
+				   COALESCE(p.mobile, '') AS mobile,
+				   COALESCE(p.email, '') AS email,
+				   COALESCE(p.vat, '') AS vat,
+				   COALESCE(p.is_company, false) AS is_company,
+				   COALESCE(p.customer_rank, 0) AS customer_rank,
+				   COALESCE(p.supplier_rank, 0) AS supplier_rank,
+				   COALESCE(tags.ids, '{{}}') AS category_ids
+			FROM res_partner p
+			LEFT JOIN res_country_state s ON s.id = p.state_id
+			LEFT JOIN res_country c ON c.id = p.country_id
+			LEFT JOIN LATERAL (
+				SELECT array_agg(rel.category_id ORDER BY rel.category_id) AS ids
+				FROM res_partner_res_partner_category_rel rel
+				JOIN res_partner_category pc ON pc.id = rel.category_id AND pc.active
+				WHERE rel.partner_id = p.id
+			) tags ON true
+			WHERE p.id IN ({subquery})
+			ORDER BY p.complete_name, p.id DESC
+		""", [self._get_lang()] + params)
+
+		return self.env.cr.dictfetchall()
+
+	@api.model
+	def _serialize_partner_index(self, domain):
+		"""Indice minimo dei clienti (ricerca e selezione offline)"""
+		subquery, params = self.env['res.partner']._search(domain).subselect()
+
+		self.env.cr.execute(f"""
+			SELECT p.id,
+				   p.name,
+				   COALESCE(p.vat, '') AS vat,
+				   COALESCE(p.city, '') AS city
+			FROM res_partner p
+			WHERE p.id IN ({subquery})
+			ORDER BY p.complete_name, p.id DESC
+		""", params)
+
+		return self.env.cr.dictfetchall()
+
+	@api.model
+	def _serialize_products(self, domain):
+		"""Prodotti del dominio nel formato offline
+
+		Le tasse sono limitate a quelle attive dell'azienda corrente; il costo
+		(campo company_dependent) è letto in blocco da ir.property.
+		"""
+		lang = self._get_lang()
+		subquery, params = self.env['product.product']._search(domain).subselect()
+
+		self.env.cr.execute(f"""
+			SELECT pp.id,
+				   COALESCE(pt.name->>%s, pt.name->>'en_US') AS name,
+				   COALESCE(pp.default_code, '') AS default_code,
+				   COALESCE(pp.barcode, '') AS barcode,
+				   COALESCE(pt.list_price, 0)::float8 AS list_price,
+				   pt.uom_id,
+				   COALESCE(u.name->>%s, u.name->>'en_US') AS uom_name,
+				   pt.categ_id,
+				   pc.name AS categ_name,
+				   COALESCE(taxes.ids, '{{}}') AS taxes_id,
+				   pt.type,
+				   pt.tracking
+			FROM product_product pp
+			JOIN product_template pt ON pt.id = pp.product_tmpl_id
+			LEFT JOIN uom_uom u ON u.id = pt.uom_id
+			LEFT JOIN product_category pc ON pc.id = pt.categ_id
+			LEFT JOIN LATERAL (
+				SELECT array_agg(rel.tax_id ORDER BY t.sequence, t.id) AS ids
+				FROM product_taxes_rel rel
+				JOIN account_tax t ON t.id = rel.tax_id AND t.active AND t.company_id = %s
+				WHERE rel.prod_id = pt.id
+			) taxes ON true
+			WHERE pp.id IN ({subquery})
+			ORDER BY pp.default_code, pp.id
+		""", [lang, lang, self.env.company.id] + params)
+		rows = self.env.cr.dictfetchall()
+
+		standard_prices = self.env['ir.property']._get_multi(
+			'standard_price', 'product.product', [row['id'] for row in rows]
+		)
+		for row in rows:
+			row['standard_price'] = standard_prices.get(row['id']) or 0.0
+
+		return rows
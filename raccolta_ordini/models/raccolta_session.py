@@ -1,8 +1,22 @@
 # -*- coding: utf-8 -*-
 
+import logging
+import time
+
+from psycopg2 import errorcodes
+
 from odoo import models, fields, api, _
+from odoo.tools import float_compare
 from odoo.exceptions import UserError, ValidationError
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
+
+_logger = logging.getLogger(__name__)
+
+# Fasi della sincronizzazione documenti offline, nell'ordine di esecuzione
+SYNC_STAGES = ('validate', 'resolve', 'orders', 'pickings', 'ddts')
+
+# Campi riga da cui Odoo ricalcola prezzo e sconto dal listino
+LINE_PRICE_DEPENDENCIES = {'product_id', 'product_uom', 'product_uom_qty'}
 
 
 class RaccoltaSession(models.Model):
@@ -138,6 +152,27 @@ class RaccoltaSession(models.Model):
 	   compute='_compute_sync_status',
 	   help='Stato di sincronizzazione della sessione')
 
+	# === SINCRONIZZAZIONE ===
+	last_sync_at = fields.Datetime(
+		string='Ultima Sincronizzazione',
+		help='Data e ora dell\'ultima sincronizzazione documenti'
+	)
+
+	sync_count = fields.Integer(
+		string='Numero Sincronizzazioni',
+		default=0
+	)
+
+	sync_error_count = fields.Integer(
+		string='Errori Sincronizzazione',
+		default=0,
+		help='Documenti non sincronizzati per errore, cumulativo'
+	)
+
+	last_sync_error = fields.Text(
+		string='Ultimo Errore Sincronizzazione'
+	)
+
 	# === COMPUTED FIELDS ===
 	@api.depends('name', 'user_id.name', 'start_at')
 	def _compute_display_name(self):
@@ -420,4 +455,734 @@ class RaccoltaSession(models.Model):
 		action['domain'] = [('raccolta_session_id', '=', self.id)]
 		action['context'] = {'default_raccolta_session_id': self.id}
 		
-		return action
\ No newline at end of file
+		return action
+	# === SINCRONIZZAZIONE DOCUMENTI OFFLINE ===
+	def sync_session_data(self, sync_data):
+		"""Sincronizza ordini, picking e DDT offline della sessione a fasi
+
+		Fasi: validazione, risoluzione riferimenti, ordini, picking, DDT. Ogni
+		documento è elaborato nel proprio savepoint, così un documento non
+		valido finisce negli errori senza annullare gli altri.
+		"""
+		self.ensure_one()
+
+		results = {
+			'orders_synced': 0,
+			'pickings_synced': 0,
+			'ddts_synced': 0,
+			'errors': [],
+			'timings': {},
+			'orders': {},
+			'pickings': {},
+			'ddts': {},
+		}
+		# Documenti validi e riferimenti risolti, passati da una fase all'altra
+		pipeline = {
+			'orders': list(sync_data.get('orders') or []),
+			'pickings': list(sync_data.get('pickings') or []),
+			'ddts': list(sync_data.get('ddts') or []),
+		}
+
+		for stage in SYNC_STAGES:
+			started = time.perf_counter()
+			getattr(self, f'_sync_stage_{stage}')(pipeline, results)
+			results['timings'][stage] = round((time.perf_counter() - started) * 1000, 1)
+
+		# Documenti già sincronizzati in un invio precedente: esclusi dai conteggi
+		for doc_type in ('orders', 'pickings', 'ddts'):
+			doc_results = [result for result in results[doc_type].values() if result['success']]
+			results[f'{doc_type}_already_synced'] = sum(1 for result in doc_results if result.get('already_synced'))
+			results[f'{doc_type}_synced'] = len(doc_results) - results[f'{doc_type}_already_synced']
+
+		self._record_sync_results(results)
+
+		_logger.info(f"Sincronizzazione sessione {self.name} - tempi fasi (ms): {results['timings']}")
+		return results
+
+	def get_session_summary(self):
+		"""Riepilogo della sessione dopo la sincronizzazione"""
+		self.ensure_one()
+
+		return {
+			'id': self.id,
+			'name': self.name,
+			'state': self.state,
+			'order_count': self.order_count,
+			'synced_order_count': self.synced_order_count,
+			'pending_order_count': self.pending_order_count,
+			'total_amount': self.total_amount,
+			'sync_status': self.sync_status,
+			'last_sync_at': self.last_sync_at.isoformat() if self.last_sync_at else None,
+			'sync_count': self.sync_count,
+			'sync_error_count': self.sync_error_count,
+			'last_sync_error': self.last_sync_error or '',
+		}
+
+	def _sync_stage_validate(self, pipeline, results):
+		"""Scarta i documenti privi dei dati minimi"""
+		checks = {
+			'orders': lambda data: (
+				(not data.get('partner_id') and _('Partner mancante'))
+				or (not data.get('order_lines') and _('Nessuna riga ordine'))
+			),
+			'pickings': lambda data: (
+				not data.get('order_local_id') and not data.get('move_lines')
+				and _('Picking senza ordine né movimenti')
+			),
+			'ddts': lambda data: (
+				not data.get('picking_local_id') and _('Picking di riferimento mancante')
+			),
+		}
+
+		for doc_type, check in checks.items():
+			valid = []
+			for doc_data in pipeline[doc_type]:
+				error = _('Identificativo locale mancante') if not doc_data.get('local_id') else check(doc_data)
+				if error:
+					self._add_sync_error(results, doc_type, doc_data, error)
+				else:
+					valid.append(doc_data)
+			pipeline[doc_type] = valid
+
+	def _sync_stage_resolve(self, pipeline, results):
+		"""Risolve in blocco clienti, prodotti e ordini già sincronizzati"""
+		partner_ids = {
+			self._get_record_id(doc_data.get('partner_id'))
+			for doc_type in ('orders', 'pickings', 'ddts')
+			for doc_data in pipeline[doc_type]
+		}
+		partner_ids.discard(False)
+		partners = self.env['res.partner'].browse(partner_ids).exists()
+
+		valid_orders = []
+		for order_data in pipeline['orders']:
+			if self._get_record_id(order_data.get('partner_id')) in partners.ids:
+				valid_orders.append(order_data)
+			else:
+				self._add_sync_error(results, 'orders', order_data, _('Partner non esistente'))
+		pipeline['orders'] = valid_orders
+
+		pipeline['products'] = self._get_payload_products(
+			[line for order_data in pipeline['orders'] for line in order_data.get('order_lines', [])]
+			+ [move for picking_data in pipeline['pickings'] for move in picking_data.get('move_lines', [])]
+		)
+
+		# Ordini sincronizzati in passato, citati dai picking tramite ID locale
+		payload_order_ids = {order_data['local_id'] for order_data in pipeline['orders']}
+		pipeline['known_orders'] = self._get_orders_by_local_id([
+			picking_data['order_local_id'] for picking_data in pipeline['pickings']
+			if picking_data.get('order_local_id') and picking_data['order_local_id'] not in payload_order_ids
+		])
+
+		# Picking già sincronizzati, per ID locale: un nuovo invio non li duplica
+		pipeline['known_pickings'] = self._get_pickings_by_local_id([
+			picking_data['local_id'] for picking_data in pipeline['pickings']
+		])
+
+		pipeline['order_map'] = {}
+		pipeline['picking_map'] = {}
+
+	def _sync_stage_orders(self, pipeline, results):
+		"""Crea o aggiorna gli ordini a blocchi di sync_batch_size"""
+		batch_size = max(self.config_id.sync_batch_size, 1)
+		orders_data = pipeline['orders']
+
+		for start in range(0, len(orders_data), batch_size):
+			batch = orders_data[start:start + batch_size]
+			batch_results = self._sync_order_batch(batch, pipeline['products'])
+
+			for order_data in batch:
+				result = batch_results[self._get_order_key(order_data)]
+				if result['success']:
+					results['orders'][order_data['local_id']] = result
+					pipeline['order_map'][order_data['local_id']] = self.env['sale.order'].browse(result['odoo_id'])
+				else:
+					self._add_sync_error(
+						results, 'orders', order_data, result['error'], retryable=result.get('retryable', False)
+					)
+
+		# Profili riordino aggiornati in background dal cron
+		if pipeline['order_map']:
+			self.env['raccolta.reorder.profile']._trigger_refresh()
+
+	def _sync_stage_pickings(self, pipeline, results):
+		"""Collega o crea i picking offline, un savepoint per picking"""
+		for picking_data in pipeline['pickings']:
+			picking = pipeline['known_pickings'].get(picking_data['local_id'])
+			already_synced = bool(picking)
+			try:
+				if not picking:
+					with self.env.cr.savepoint():
+						picking = self._sync_offline_picking(picking_data, pipeline)
+				pipeline['picking_map'][picking_data['local_id']] = picking
+				results['pickings'][picking_data['local_id']] = {
+					'success': True,
+					'odoo_id': picking.id,
+					'name': picking.name,
+					'already_synced': already_synced,
+				}
+			except Exception as e:
+				self._add_sync_error(
+					results, 'pickings', picking_data, str(e), retryable=self._is_concurrent_sync_error(e)
+				)
+
+	def _sync_stage_ddts(self, pipeline, results):
+		"""Crea i DDT offline sui picking sincronizzati, un savepoint per DDT"""
+		for ddt_data in pipeline['ddts']:
+			picking = pipeline['picking_map'].get(ddt_data.get('picking_local_id'))
+			already_synced = bool(picking and picking.delivery_note_id)
+			try:
+				with self.env.cr.savepoint():
+					ddt = self._sync_offline_ddt(ddt_data, pipeline)
+				results['ddts'][ddt_data['local_id']] = {
+					'success': True,
+					'odoo_id': ddt.id,
+					'name': ddt.name,
+					'already_synced': already_synced,
+				}
+			except Exception as e:
+				self._add_sync_error(results, 'ddts', ddt_data, str(e))
+
+	def _add_sync_error(self, results, doc_type, doc_data, error, retryable=False):
+		"""Registra l'errore di un documento nei risultati"""
+		error = str(error)
+		key = doc_data.get('local_id') or doc_data.get('name')
+		if key:
+			results[doc_type][key] = {'success': False, 'error': error, 'retryable': retryable}
+		results['errors'].append({
+			'type': doc_type,
+			'local_id': doc_data.get('local_id'),
+			'name': doc_data.get('name', ''),
+			'error': error,
+			'retryable': retryable,
+		})
+		_logger.error(f"Errore sincronizzazione {doc_type} {doc_data.get('name', 'Unknown')}: {error}")
+
+	def _record_sync_results(self, results):
+		"""Aggiorna statistiche di sincronizzazione della sessione"""
+		now = fields.Datetime.now()
+		vals = {
+			'last_sync_at': now,
+			'sync_count': self.sync_count + 1,
+			'is_online': True,
+			'last_online': now,
+		}
+		if results['errors']:
+			vals.update({
+				'sync_error_count': self.sync_error_count + len(results['errors']),
+				'last_sync_error': results['errors'][-1]['error'],
+			})
+		self.write(vals)
+
+	# === CONFLITTI ===
+	@api.model
+	def _get_sync_conflicts(self, orders=None, pickings=None, ddts=None):
+		"""Documenti offline già presenti in Odoo, con una query per modello
+
+		Gli ordini sono confrontati per ID locale dell'agente corrente e per
+		nome; picking e DDT per nome.
+		"""
+		conflicts = {
+			'orders': [],
+			'pickings': [],
+			'ddts': [],
+			'has_conflicts': False
+		}
+
+		# Conflitti ordini: ID locale (già sincronizzato) e nome
+		if orders:
+			existing_local_ids = self._get_existing_local_ids(orders)
+			existing_names = self._get_existing_names('sale.order', orders)
+
+			for order_data in orders:
+				local_match = existing_local_ids.get(order_data.get('local_id'))
+				if local_match:
+					conflicts['orders'].append({
+						'name': order_data.get('name'),
+						'local_id': order_data.get('local_id'),
+						'existing_id': local_match,
+						'conflict_type': 'duplicate_local_id',
+						'message': _('Ordine con questo ID locale già sincronizzato')
+					})
+
+				# Stesso ordine già segnalato per ID locale: nessun conflitto di nome
+				name_match = existing_names.get(order_data.get('name'))
+				if name_match and name_match != local_match:
+					conflicts['orders'].append({
+						'name': order_data.get('name'),
+						'existing_id': name_match,
+						'conflict_type': 'duplicate_name',
+						'message': _('Ordine con questo nome già esistente')
+					})
+
+		# Conflitti picking e DDT: nome
+		for doc_type, model_name, docs_data, message in (
+			('pickings', 'stock.picking', pickings, _('Picking con questo nome già esistente')),
+			('ddts', 'stock.delivery.note', ddts, _('DDT con questo nome già esistente')),
+		):
+			if not docs_data:
+				continue
+			existing_names = self._get_existing_names(model_name, docs_data)
+
+			for doc_data in docs_data:
+				if doc_data.get('name') in existing_names:
+					conflicts[doc_type].append({
+						'name': doc_data.get('name'),
+						'existing_id': existing_names[doc_data.get('name')],
+						'conflict_type': 'duplicate_name',
+						'message': message
+					})
+
+		conflicts['has_conflicts'] = bool(conflicts['orders'] or conflicts['pickings'] or conflicts['ddts'])
+		return conflicts
+
+	@api.model
+	def _get_existing_names(self, model_name, docs_data):
+		"""Record esistenti con i nomi dei documenti, con una sola query: {nome: id}"""
+		names = list({doc_data['name'] for doc_data in docs_data if doc_data.get('name')})
+		if not names:
+			return {}
+
+		records = self.env[model_name].search_read([('name', 'in', names)], ['name'])
+		return {record['name']: record['id'] for record in records}
+
+	@api.model
+	def _get_existing_local_ids(self, orders_data):
+		"""Ordini dell'agente corrente già sincronizzati con gli ID locali indicati: {local_id: id}"""
+		local_ids = list({order_data['local_id'] for order_data in orders_data if order_data.get('local_id')})
+		if not local_ids:
+			return {}
+
+		orders = self.env['sale.order'].sudo().search_read([
+			('offline_user_id', '=', self.env.user.id),
+			('offline_local_id', 'in', local_ids),
+		], ['offline_local_id'])
+		return {order['offline_local_id']: order['id'] for order in orders}
+
+	# === ORDINI ===
+	def _sync_order_batch(self, orders_data, products=None):
+		"""Sincronizza un blocco di ordini: {local_id: esito}
+
+		L'ID locale è la chiave di idempotenza: gli ordini già presenti sono
+		risolti con una sola query, un nuovo invio non li duplica e il loro
+		esito è marcato already_synced. Gli ordini nuovi sono creati con una
+		sola create (righe come comandi one2many); se la create multipla
+		fallisce si ripiega su una create per ordine, ognuna nel proprio
+		savepoint, per isolare l'ordine non valido.
+
+		Un invio concorrente dello stesso ordine viola l'indice univoco, ma la
+		sua riga non è visibile nello snapshot di questa transazione: l'ordine
+		torna un errore retryable e il nuovo tentativo lo trova già sincronizzato.
+		"""
+		self.ensure_one()
+		SaleOrder = self.env['sale.order']
+		if products is None:
+			products = self._get_payload_products(
+				[line for order_data in orders_data for line in order_data.get('order_lines', [])]
+			)
+		results = {}
+
+		# Ordini già trasmessi in precedenza: aggiornati solo se ancora in bozza
+		existing_orders = self._get_orders_by_local_id([
+			order_data['local_id'] for order_data in orders_data if order_data.get('local_id')
+		])
+
+		new_orders_data = []
+		for order_data in orders_data:
+			order = existing_orders.get(order_data.get('local_id'))
+			if not order:
+				new_orders_data.append(order_data)
+				continue
+
+			# Ordine confermato o riassegnato in ufficio: non più modificato dal client
+			if order.sudo().state not in ('draft', 'sent') or order.sudo().user_id != self.user_id:
+				results[self._get_order_key(order_data)] = self._get_order_result(order.sudo(), already_synced=True)
+				continue
+
+			try:
+				with self.env.cr.savepoint():
+					order.write(self._prepare_order_values(order_data))
+					self._sync_order_lines(order, order_data.get('order_lines', []), products)
+				results[self._get_order_key(order_data)] = self._get_order_result(order, already_synced=True)
+			except Exception as e:
+				results[self._get_order_key(order_data)] = self._get_order_error(order_data, e)
+
+		if not new_orders_data:
+			return results
+
+		try:
+			with self.env.cr.savepoint():
+				orders = SaleOrder.create([
+					self._prepare_order_create_values(order_data, products)
+					for order_data in new_orders_data
+				])
+			for order_data, order in zip(new_orders_data, orders):
+				results[self._get_order_key(order_data)] = self._get_order_result(order)
+
+		except Exception as e:
+			_logger.warning(f"Creazione multipla ordini fallita, ripiego per singolo ordine: {str(e)}")
+			for order_data in new_orders_data:
+				try:
+					with self.env.cr.savepoint():
+						order = SaleOrder.create(self._prepare_order_create_values(order_data, products))
+					results[self._get_order_key(order_data)] = self._get_order_result(order)
+				except Exception as order_error:
+					# Ordine creato nel frattempo da un invio concorrente: da ritentare
+					retryable = self._is_concurrent_sync_error(order_error)
+					results[self._get_order_key(order_data)] = self._get_order_error(
+						order_data, order_error, retryable=retryable
+					)
+
+		return results
+
+	def _get_orders_by_local_id(self, local_ids):
+		"""Ordini dell'agente già sincronizzati, per ID locale, con una sola query
+
+		La ricerca ignora le regole di accesso: un ordine riassegnato a un altro
+		venditore non è più visibile all'agente, ma resta suo per l'idempotenza.
+		"""
+		self.ensure_one()
+		local_ids = [local_id for local_id in set(local_ids) if local_id]
+		if not local_ids:
+			return {}
+
+		orders = self.env['sale.order'].sudo().search([
+			('offline_user_id', '=', self.user_id.id),
+			('offline_local_id', 'in', local_ids),
+		])
+		return {order.offline_local_id: order.with_env(self.env) for order in orders}
+
+	def _get_pickings_by_local_id(self, local_ids):
+		"""Picking dell'agente già sincronizzati, per ID locale, con una sola query"""
+		self.ensure_one()
+		local_ids = [local_id for local_id in set(local_ids) if local_id]
+		if not local_ids:
+			return {}
+
+		pickings = self.env['stock.picking'].search([
+			('offline_user_id', '=', self.user_id.id),
+			('offline_local_id', 'in', local_ids),
+		])
+		return {picking.offline_local_id: picking for picking in pickings}
+
+	def _sync_single_order(self, order_data):
+		"""Sincronizza un singolo ordine"""
+		self.ensure_one()
+		result = self._sync_order_batch([order_data])[self._get_order_key(order_data)]
+		if not result['success']:
+			raise UserError(result['error'])
+		return self.env['sale.order'].browse(result['odoo_id'])
+
+	def _get_order_key(self, order_data):
+		"""Chiave dell'ordine nella mappa dei risultati"""
+		return order_data.get('local_id') or order_data.get('name')
+
+	def _get_order_result(self, order, already_synced=False):
+		"""Esito positivo della sincronizzazione di un ordine"""
+		return {
+			'success': True,
+			'odoo_id': order.id,
+			'name': order.name,
+			'already_synced': already_synced,
+		}
+
+	def _get_order_error(self, order_data, error, retryable=False):
+		"""Esito negativo della sincronizzazione di un ordine"""
+		_logger.error(f"Errore ordine {order_data.get('name', 'Unknown')}: {str(error)}")
+		return {
+			'success': False,
+			'error': str(error),
+			'retryable': retryable,
+		}
+
+	@api.model
+	def _is_concurrent_sync_error(self, error):
+		"""Violazione di un indice univoco (agente, ID locale) da parte di un invio concorrente"""
+		diag = getattr(error, 'diag', None)
+		return (
+			getattr(error, 'pgcode', None) == errorcodes.UNIQUE_VIOLATION
+			and diag is not None
+			and diag.constraint_name in ('sale_order_offline_user_local_id_uniq', 'stock_picking_offline_local_id_uniq')
+		)
+
+	@api.model
+	def _get_record_id(self, value):
+		"""ID da un valore many2one offline (intero o coppia [id, nome])"""
+		if isinstance(value, (list, tuple)):
+			value = value[0] if value else False
+		return value or False
+
+	@api.model
+	def _parse_offline_datetime(self, value):
+		"""Datetime UTC naive da un valore offline (ISO 8601 o formato Odoo)"""
+		if not value or isinstance(value, datetime):
+			return value or False
+		try:
+			parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+		except ValueError:
+			return fields.Datetime.to_datetime(value)
+		if parsed.tzinfo:
+			parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+		return parsed
+
+	@api.model
+	def _get_payload_products(self, lines_data):
+		"""Prodotti esistenti delle righe indicate, letti con una sola query"""
+		product_ids = {self._get_record_id(line_data.get('product_id')) for line_data in lines_data}
+		product_ids.discard(False)
+
+		products = self.env['product.product'].browse(product_ids).exists()
+		return {product.id: product for product in products}
+
+	def _prepare_order_values(self, order_data):
+		"""Prepara valori ordine per creazione/aggiornamento"""
+		self.ensure_one()
+		partner = self.env['res.partner'].browse(self._get_record_id(order_data.get('partner_id')))
+		return {
+			'partner_id': partner.id,
+			'date_order': self._parse_offline_datetime(order_data.get('date_order')) or fields.Datetime.now(),
+			'note': order_data.get('note', ''),
+			'client_order_ref': order_data.get('client_order_ref', ''),
+			'raccolta_session_id': self.id,
+			'company_id': self.company_id.id,
+			'warehouse_id': self.config_id.warehouse_id.id,
+			'pricelist_id': (self._get_record_id(order_data.get('pricelist_id'))
+							 or partner.property_product_pricelist.id),
+			'payment_term_id': order_data.get('payment_term_id', False),
+			'state': 'draft',
+			'is_offline_order': True,
+			'offline_created_at': self._parse_offline_datetime(order_data.get('created_at')),
+			'offline_local_id': order_data.get('local_id'),
+		}
+
+	def _prepare_order_create_values(self, order_data, products):
+		"""Valori di creazione ordine con le righe come comandi one2many
+
+		Venditore e agente offline sono impostati solo alla creazione: un nuovo
+		invio non annulla la riassegnazione dell'ordine fatta in ufficio.
+		"""
+		vals = self._prepare_order_values(order_data)
+		vals.update({
+			'user_id': self.user_id.id,
+			'offline_user_id': self.user_id.id,
+			'order_line': self._prepare_order_line_commands(order_data.get('order_lines', []), products),
+			'synced_to_odoo': True,
+			'sync_at': fields.Datetime.now(),
+		})
+		return vals
+
+	@api.model
+	def _prepare_order_line_values(self, line_data, product):
+		"""Valori riga ordine da dati offline"""
+		return {
+			'product_id': product.id,
+			'name': line_data.get('name', product.name),
+			'product_uom_qty': line_data.get('product_uom_qty', 1.0),
+			'price_unit': line_data.get('price_unit') or product.list_price,
+			'product_uom': product.uom_id.id,
+			'discount': line_data.get('discount', 0.0),
+			'sequence': line_data.get('sequence', 10),
+			'offline_line_key': line_data.get('local_id') or False,
+		}
+
+	@api.model
+	def _prepare_order_line_commands(self, order_lines_data, products):
+		"""Comandi di creazione righe ordine; le righe con prodotto inesistente sono ignorate"""
+		commands = []
+		for line_data in order_lines_data:
+			product = products.get(self._get_record_id(line_data.get('product_id')))
+			if product:
+				commands.append((0, 0, self._prepare_order_line_values(line_data, product)))
+		return commands
+
+	@api.model
+	def _sync_order_lines(self, order, order_lines_data, products):
+		"""Allinea le righe ordine ai dati offline tramite la chave di riga offline
+
+		Aggiorna solo le righe cambiate, crea le nuove con una sola create e
+		cancella in blocco le righe non più presenti nei dati offline. Se
+		cambiano prodotto, unità di misura o quantità, prezzo e sconto offline
+		sono riscritti nella stessa write, altrimenti il ricalcolo dal listino
+		li sovrascriverebbe.
+		"""
+		existing_lines = {
+			line.offline_line_key: line
+			for line in order.order_line
+			if line.offline_line_key and not line.display_type
+		}
+		kept_line_ids = set()
+		new_lines_vals = []
+
+		for line_data in order_lines_data:
+			product = products.get(self._get_record_id(line_data.get('product_id')))
+			if not product:
+				continue
+
+			vals = self._prepare_order_line_values(line_data, product)
+			line = existing_lines.get(vals['offline_line_key'])
+			if not line or line.id in kept_line_ids:
+				vals['order_id'] = order.id
+				new_lines_vals.append(vals)
+				continue
+
+			kept_line_ids.add(line.id)
+			changed_vals = self._get_changed_line_values(line, vals)
+			if LINE_PRICE_DEPENDENCIES.intersection(changed_vals):
+				changed_vals.update({
+					'price_unit': vals['price_unit'],
+					'discount': vals['discount'],
+				})
+			if changed_vals:
+				line.write(changed_vals)
+
+		removed_lines = order.order_line.filtered(
+			lambda line: not line.display_type and line.id not in kept_line_ids
+		)
+		if removed_lines:
+			removed_lines.unlink()
+		if new_lines_vals:
+			self.env['sale.order.line'].create(new_lines_vals)
+
+	@api.model
+	def _get_changed_line_values(self, line, vals):
+		"""Valori della riga che differiscono da quelli offline"""
+		changed_vals = {}
+		for field_name, value in vals.items():
+			field = line._fields[field_name]
+			current = line[field_name]
+			if field.type == 'many2one':
+				current = current.id
+			if field.type == 'float':
+				if float_compare(current, value or 0.0, precision_digits=6):
+					changed_vals[field_name] = value
+			elif current != value:
+				changed_vals[field_name] = value
+		return changed_vals
+
+	# === PICKING E DDT ===
+	def _sync_offline_picking(self, picking_data, pipeline):
+		"""Collega il picking offline a quello dell'ordine o lo crea se l'ordine manca
+
+		Il picking riceve l'ID locale offline, chiave dei nuovi invii.
+		"""
+		self.ensure_one()
+		vals = {
+			'raccolta_session_id': self.id,
+			'offline_local_id': picking_data['local_id'],
+			'offline_user_id': self.user_id.id,
+			'is_offline_picking': True,
+			'synced_to_odoo': True,
+			'offline_created_at': self._parse_offline_datetime(picking_data.get('created_at')),
+			'sync_at': fields.Datetime.now(),
+		}
+
+		order = (pipeline['order_map'].get(picking_data.get('order_local_id'))
+				 or pipeline['known_orders'].get(picking_data.get('order_local_id')))
+		if order:
+			# Il picking nasce dalla conferma dell'ordine
+			if order.state in ('draft', 'sent'):
+				order.action_confirm()
+			picking = order.picking_ids.filtered(lambda p: p.state not in ('done', 'cancel'))[:1]
+			if not picking:
+				picking = order.picking_ids.filtered(lambda p: p.is_offline_picking)[:1]
+			if not picking:
+				raise UserError(_('Nessun picking da collegare per l\'ordine %s') % order.name)
+			picking.write(vals)
+			return picking
+
+		vals.update(self._prepare_picking_values(picking_data, pipeline['products']))
+		return self.env['stock.picking'].create(vals)
+
+	def _prepare_picking_values(self, picking_data, products):
+		"""Valori di un picking offline senza ordine, con i movimenti come comandi"""
+		self.ensure_one()
+		picking_type = self.config_id.warehouse_id.out_type_id
+		if not picking_type:
+			raise UserError(_('Magazzino della configurazione senza tipo operazione di consegna'))
+
+		location_id = picking_type.default_location_src_id.id
+		location_dest_id = (picking_type.default_location_dest_id.id
+							or self.env.ref('stock.stock_location_customers').id)
+
+		moves = []
+		for move_data in picking_data.get('move_lines', []):
+			product = products.get(self._get_record_id(move_data.get('product_id')))
+			if not product:
+				continue
+			moves.append((0, 0, {
+				'name': move_data.get('name') or product.display_name,
+				'product_id': product.id,
+				'product_uom_qty': move_data.get('product_uom_qty', 1.0),
+				'product_uom': product.uom_id.id,
+				'location_id': location_id,
+				'location_dest_id': location_dest_id,
+			}))
+		if not moves:
+			raise UserError(_('Nessun movimento valido nel picking offline'))
+
+		return {
+			'picking_type_id': picking_type.id,
+			'partner_id': self._get_record_id(picking_data.get('partner_id')),
+			'origin': picking_data.get('origin', ''),
+			'scheduled_date': self._parse_offline_datetime(picking_data.get('scheduled_date')) or fields.Datetime.now(),
+			'location_id': location_id,
+			'location_dest_id': location_dest_id,
+			'move_ids': moves,
+		}
+
+	def _sync_offline_ddt(self, ddt_data, pipeline):
+		"""Crea il DDT offline e lo collega al picking sincronizzato"""
+		self.ensure_one()
+		picking = pipeline['picking_map'].get(ddt_data.get('picking_local_id'))
+		if not picking:
+			raise UserError(_('Picking di riferimento non sincronizzato'))
+
+		# DDT già creato in una sincronizzazione precedente
+		if picking.delivery_note_id:
+			return picking.delivery_note_id
+
+		DeliveryNote = self.env['stock.delivery.note']
+		vals = DeliveryNote._validate_offline_ddt_data(self._prepare_ddt_data(ddt_data, picking))
+		vals.update({
+			'synced_to_odoo': True,
+			'sync_at': fields.Datetime.now(),
+		})
+		vals.update(self._prepare_ddt_shipping_values(ddt_data))
+
+		ddt = DeliveryNote.create(vals)
+		picking.write({
+			'delivery_note_id': ddt.id,
+			'ddt_created': True,
+		})
+		return ddt
+
+	def _prepare_ddt_data(self, ddt_data, picking):
+		"""Dati DDT offline completati con i default della configurazione"""
+		self.ensure_one()
+		config = self.config_id
+		data = dict(ddt_data)
+		data.update({
+			'partner_id': self._get_record_id(ddt_data.get('partner_id')) or picking.partner_id.id,
+			'partner_sender_id': self._get_record_id(ddt_data.get('partner_sender_id')) or self.company_id.partner_id.id,
+			'type_id': ddt_data.get('type_id') or config.ddt_type_id.id,
+			'transport_reason_id': ddt_data.get('transport_reason_id') or config.ddt_transport_reason_id.id,
+			'goods_appearance_id': ddt_data.get('goods_appearance_id') or config.ddt_goods_appearance_id.id,
+			'transport_condition_id': ddt_data.get('transport_condition_id') or config.ddt_transport_condition_id.id,
+			'agent_code': self.user_id.agent_code or '',
+			'raccolta_session_id': self.id,
+			'created_at': self._parse_offline_datetime(ddt_data.get('created_at')) or fields.Datetime.now(),
+		})
+		return data
+
+	@api.model
+	def _prepare_ddt_shipping_values(self, ddt_data):
+		"""Colli, pesi e metodo di trasporto del DDT offline, se indicati"""
+		vals = {}
+		if ddt_data.get('transport_method_id'):
+			vals['transport_method_id'] = ddt_data['transport_method_id']
+		if ddt_data.get('packages'):
+			vals['packages'] = int(ddt_data['packages'])
+		for field_name in ('gross_weight', 'net_weight'):
+			if ddt_data.get(field_name):
+				vals[field_name] = float(ddt_data[field_name])
+		return vals
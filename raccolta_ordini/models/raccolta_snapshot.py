@@ -0,0 +1,256 @@
+# -*- coding: utf-8 -*-
+
+import base64
+import gzip
+import hashlib
+import json
+import logging
+import time
+
+from odoo import models, fields, api
+
+_logger = logging.getLogger(__name__)
+
+# Sequenza delle invalidazioni: una costruzione è valida solo se non è avanzata
+GENERATION_SEQUENCE = 'raccolta_snapshot_generation_seq'
+
+
+class RaccoltaSnapshot(models.Model):
+	"""Snapshot compresso dei dati offline, condiviso dalle configurazioni con gli stessi filtri"""
+	_name = 'raccolta.snapshot'
+	_description = 'Snapshot Dati Offline Raccolta'
+	_order = 'build_date desc'
+	_rec_name = 'filter_key'
+
+	# === INFORMAZIONI BASE ===
+	filter_key = fields.Char(
+		string='Chiave Filtri',
+		index=True,
+		help='Hash dei filtri clienti/prodotti delle configurazioni servite (vedi raccolta.config)'
+	)
+	company_id = fields.Many2one(
+		'res.company',
+		string='Azienda',
+		required=True,
+		ondelete='cascade'
+	)
+
+	# === STATO ===
+	state = fields.Selection([
+		('stale', 'Da Ricostruire'),
+		('ready', 'Pronto'),
+	], string='Stato', default='stale', required=True, index=True,
+		help='Uno snapshot diventa da ricostruire quando cambiano i dati che lo alimentano')
+	generation = fields.Integer(
+		string='Generazione',
+		default=0,
+		readonly=True,
+		help='Valore della sequenza delle invalidazioni letto all\'avvio dell\'ultima costruzione: '
+			 'la costruzione diventa pronta solo se nessuna invalidazione è arrivata mentre leggeva i dati'
+	)
+
+	# === CONTENUTO ===
+	data = fields.Binary(
+		string='Dati Compressi',
+		attachment=True,
+		help='Payload JSON compresso gzip'
+	)
+	etag = fields.Char(
+		string='ETag',
+		help='Hash SHA-1 del payload non compresso'
+	)
+	size = fields.Integer(
+		string='Dimensione Compressa (byte)'
+	)
+	raw_size = fields.Integer(
+		string='Dimensione Originale (byte)'
+	)
+
+	# === STATISTICHE ===
+	build_date = fields.Datetime(
+		string='Data Costruzione'
+	)
+	build_duration = fields.Float(
+		string='Durata Costruzione (s)'
+	)
+
+	_sql_constraints = [
+		('filter_key_uniq', 'unique(filter_key)', 'Esiste già uno snapshot per questi filtri'),
+	]
+
+	def init(self):
+		"""Sequenza delle invalidazioni, avanzata senza bloccare righe"""
+		self._cr.execute(f"CREATE SEQUENCE IF NOT EXISTS {GENERATION_SEQUENCE}")
+		# Primo valore già emesso: last_value cambia a ogni nextval successivo
+		self._cr.execute(f"SELECT is_called FROM {GENERATION_SEQUENCE}")
+		if not self._cr.fetchone()[0]:
+			self._cr.execute(f"SELECT nextval('{GENERATION_SEQUENCE}')")
+
+	# === COSTRUZIONE ===
+	def _build(self):
+		"""Serializza, comprime e salva il payload offline
+
+		I dati sono serializzati nella lingua dell'azienda, qualunque sia
+		l'utente che avvia la costruzione. Lo snapshot diventa pronto solo se
+		la sequenza delle invalidazioni non è avanzata dall'avvio; altrimenti
+		resta da ricostruire e viene richiesta una nuova costruzione.
+		"""
+		for snapshot in self:
+			start = time.time()
+			generation = self._get_current_generation()
+			config = snapshot._get_configs()[:1].with_company(snapshot.company_id)
+			if not config:
+				continue
+
+			lang = snapshot.company_id.partner_id.lang or 'en_US'
+			payload = config.with_context(lang=lang)._get_snapshot_payload()
+			raw = json.dumps(payload, separators=(',', ':'), default=str).encode()
+			etag = hashlib.sha1(raw).hexdigest()
+
+			vals = {
+				'build_date': fields.Datetime.now(),
+				'build_duration': time.time() - start,
+			}
+			# Payload invariato: nessuna riscrittura del file
+			if etag != snapshot.etag or not snapshot.data:
+				compressed = gzip.compress(raw)
+				vals.update({
+					'data': base64.b64encode(compressed),
+					'etag': etag,
+					'size': len(compressed),
+					'raw_size': len(raw),
+				})
+			snapshot.write(vals)
+
+			# La sequenza è letta fuori dalla transazione: vede anche le invalidazioni concorrenti
+			self.env.cr.execute(f"""
+				UPDATE raccolta_snapshot SET state = 'ready', generation = %s
+				WHERE id = %s AND (SELECT last_value FROM {GENERATION_SEQUENCE}) = %s
+			""", [generation, snapshot.id, generation])
+			ready = bool(self.env.cr.rowcount)
+			snapshot.invalidate_recordset(['state', 'generation'])
+			if not ready:
+				_logger.info(f"Snapshot offline {snapshot.filter_key[:8]} invalidato durante la costruzione")
+				self._trigger_build()
+				continue
+
+			_logger.info(f"Snapshot offline {snapshot.filter_key[:8]} ({config.name}) costruito in "
+						 f"{vals['build_duration']:.2f}s ({snapshot.size} byte)")
+
+	def _get_configs(self):
+		"""Configurazioni attive servite dallo snapshot"""
+		self.ensure_one()
+		return self.env['raccolta.config'].search([('filter_key', '=', self.filter_key)])
+
+	def _get_compressed_data(self):
+		"""Payload gzip così come salvato"""
+		self.ensure_one()
+		return base64.b64decode(self.with_context(bin_size=False).data or b'')
+
+	def _get_data_attachment(self):
+		"""Allegato del filestore che contiene il payload compresso"""
+		self.ensure_one()
+		return self.env['ir.attachment'].sudo().search([
+			('res_model', '=', self._name),
+			('res_field', '=', 'data'),
+			('res_id', '=', self.id),
+		], limit=1)
+
+	def _get_download_url(self):
+		"""URL di download della versione corrente (l'etag identifica il file)"""
+		self.ensure_one()
+		return f'/raccolta/snapshot/download/{self.id}/{self.etag}'
+
+	def _get_payload(self):
+		"""Payload decompresso come dizionario"""
+		self.ensure_one()
+		return json.loads(gzip.decompress(self._get_compressed_data()))
+
+	# === INVALIDAZIONE ===
+	@api.model
+	def _invalidate_snapshots(self, configs=None):
+		"""Marca da ricostruire gli snapshot (tutti o delle configurazioni indicate)
+
+		L'invalidazione è raccolta e applicata una sola volta, al commit della
+		transazione (vedi _apply_invalidations): le scritture sul catalogo non
+		aggiornano né bloccano le righe degli snapshot a ogni modifica.
+		"""
+		if configs is not None and not configs:
+			return
+
+		pending = self.env.cr.precommit.data.get('raccolta.snapshot.invalidate')
+		if pending is None:
+			pending = self.env.cr.precommit.data['raccolta.snapshot.invalidate'] = {
+				'all': False,
+				'filter_keys': set(),
+			}
+			self.env.cr.precommit.add(self._apply_invalidations)
+
+		if configs is None:
+			pending['all'] = True
+		else:
+			pending['filter_keys'].update(configs.mapped('filter_key'))
+
+	@api.model
+	def _apply_invalidations(self):
+		"""Applica le invalidazioni della transazione, appena prima del commit
+
+		Solo gli snapshot pronti sono aggiornati: quelli già da ricostruire non
+		vengono toccati. Le costruzioni in corso sono escluse dall'avanzamento
+		della sequenza, eseguito dopo il commit: una costruzione avviata prima
+		che le modifiche fossero visibili non può più marcare lo snapshot pronto.
+		"""
+		pending = self.env.cr.precommit.data.pop('raccolta.snapshot.invalidate', None)
+		if not pending:
+			return
+
+		query = "UPDATE raccolta_snapshot SET state = 'stale' WHERE state = 'ready'"
+		params = []
+		if not pending['all']:
+			query += " AND filter_key IN %s"
+			params.append(tuple(pending['filter_keys']))
+
+		self.env.cr.execute(query, params)
+		if self.env.cr.rowcount:
+			self.invalidate_model(['state'])
+			self._trigger_build()
+
+		self.env.cr.postcommit.add(self._advance_generation)
+
+	@api.model
+	def _advance_generation(self):
+		"""Avanza la sequenza delle invalidazioni dopo il commit, su un cursore dedicato"""
+		with self.pool.cursor() as cr:
+			cr.execute(f"SELECT nextval('{GENERATION_SEQUENCE}')")
+
+	@api.model
+	def _get_current_generation(self):
+		"""Valore corrente della sequenza delle invalidazioni"""
+		self.env.cr.execute(f"SELECT last_value FROM {GENERATION_SEQUENCE}")
+		return self.env.cr.fetchone()[0]
+
+	@api.model
+	def _trigger_build(self):
+		"""Richiede la ricostruzione in background degli snapshot da ricostruire"""
+		cron = self.env.ref('raccolta_ordini.ir_cron_build_offline_snapshots', raise_if_not_found=False)
+		if cron:
+			cron.sudo()._trigger()
+
+	@api.model
+	def _cron_build_stale_snapshots(self):
+		"""Ricostruisce uno snapshot per ogni insieme distinto di filtri attivi"""
+		configs = self.env['raccolta.config'].search([])
+
+		# Snapshot di filtri non più usati da alcuna configurazione
+		self.search([('filter_key', 'not in', configs.mapped('filter_key'))]).unlink()
+
+		for config in {c.filter_key: c for c in configs}.values():
+			snapshot = config._get_or_create_snapshot()
+			if snapshot.state == 'ready':
+				continue
+			try:
+				snapshot._build()
+				self.env.cr.commit()
+			except Exception as e:
+				self.env.cr.rollback()
+				_logger.error(f"Errore costruzione snapshot {config.name}: {str(e)}")
@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+
+import logging
+from datetime import timedelta
+
+from odoo import models, fields, api, tools
+
+_logger = logging.getLogger(__name__)
+
+# Giorni di conservazione di default dei tombstone
+DEFAULT_RETENTION_DAYS = 30
+
+
+class RaccoltaTombstone(models.Model):
+	"""Registro dei record usciti dai dati offline (cancellati, archiviati o fuori filtro)"""
+	_name = 'raccolta.tombstone'
+	_description = 'Tombstone Dati Offline Raccolta'
+	_order = 'create_date desc, id desc'
+
+	res_model = fields.Char(
+		string='Modello',
+		required=True,
+		help='Modello del record rimosso'
+	)
+	res_id = fields.Integer(
+		string='ID Record',
+		required=True
+	)
+	config_id = fields.Many2one(
+		'raccolta.config',
+		string='Configurazione',
+		ondelete='cascade',
+		help='Configurazione interessata; vuoto se vale per tutte'
+	)
+	reason = fields.Selection([
+		('unlink', 'Cancellato'),
+		('archive', 'Archiviato'),
+		('scope', 'Fuori Filtro'),
+	], string='Motivo', required=True)
+
+	def init(self):
+		"""Indice per la lettura dei tombstone successivi a un watermark"""
+		tools.create_index(
+			self._cr, 'raccolta_tombstone_model_date_index',
+			self._table, ['res_model', 'create_date']
+		)
+		tools.create_index(
+			self._cr, 'raccolta_tombstone_create_date_index',
+			self._table, ['create_date']
+		)
+
+	# === REGISTRAZIONE ===
+	@api.model
+	def _record(self, model_name, res_ids, reason, config=None):
+		"""Registra i tombstone di un insieme di record"""
+		if not res_ids:
+			return self.browse()
+
+		return self.sudo().create([{
+			'res_model': model_name,
+			'res_id': res_id,
+			'reason': reason,
+			'config_id': config.id if config else False,
+		} for res_id in res_ids])
+
+	# === LETTURA ===
+	@api.model
+	def _get_removed_ids(self, model_name, since, config):
+		"""ID dei record del modello rimossi dopo il watermark per la configurazione"""
+		tombstones = self.sudo().search_read([
+			('res_model', '=', model_name),
+			('create_date', '>=', since),
+			('config_id', 'in', [config.id, False]),
+		], ['res_id'])
+		return {tombstone['res_id'] for tombstone in tombstones}
+
+	@api.model
+	def _get_retention_days(self):
+		"""Giorni di conservazione (parametro raccolta_ordini.tombstone_retention_days)"""
+		value = self.env['ir.config_parameter'].sudo().get_param(
+			'raccolta_ordini.tombstone_retention_days', DEFAULT_RETENTION_DAYS
+		)
+		return int(value)
+
+	@api.model
+	def _get_retention_limit(self):
+		"""Data più vecchia per cui i tombstone sono ancora completi"""
+		return fields.Datetime.now() - timedelta(days=self._get_retention_days())
+
+	# === PULIZIA ===
+	@api.model
+	def _cron_purge_tombstones(self):
+		"""Elimina i tombstone oltre il periodo di conservazione"""
+		self.env.cr.execute(
+			"DELETE FROM raccolta_tombstone WHERE create_date < %s",
+			[self._get_retention_limit()]
+		)
+		_logger.info(f"Tombstone offline eliminati: {self.env.cr.rowcount}")
@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+
+from datetime import timedelta
+
+from odoo import models, fields, api
+
+
+class RaccoltaVisit(models.Model):
+	"""Visite pianificate degli agenti presso i clienti (giro visite)"""
+	_name = 'raccolta.visit'
+	_description = 'Visita Pianificata Raccolta'
+	_order = 'visit_date, sequence, id'
+
+	# === INFORMAZIONI BASE ===
+	user_id = fields.Many2one(
+		'res.users',
+		string='Agente',
+		required=True,
+		index=True,
+		default=lambda self: self.env.user,
+		domain=[('is_raccolta_agent', '=', True)],
+		help='Agente che effettua la visita'
+	)
+	partner_id = fields.Many2one(
+		'res.partner',
+		string='Cliente',
+		required=True,
+		index=True,
+		ondelete='cascade'
+	)
+	visit_date = fields.Date(
+		string='Data Visita',
+		required=True,
+		index=True,
+		default=fields.Date.context_today
+	)
+	sequence = fields.Integer(
+		string='Sequenza',
+		default=10,
+		help='Ordine di visita nella giornata'
+	)
+	company_id = fields.Many2one(
+		'res.company',
+		string='Azienda',
+		required=True,
+		default=lambda self: self.env.company
+	)
+
+	# === STATO ===
+	state = fields.Selection([
+		('planned', 'Pianificata'),
+		('done', 'Effettuata'),
+		('cancelled', 'Annullata'),
+	], string='Stato', default='planned', required=True)
+	note = fields.Text(
+		string='Note'
+	)
+
+	# === BUSINESS METHODS ===
+	def action_done(self):
+		self.write({'state': 'done'})
+
+	def action_cancel(self):
+		self.write({'state': 'cancelled'})
+
+	@api.model
+	def _get_route_domain(self, user, days):
+		"""Visite pianificate dell'agente da oggi per i prossimi giorni"""
+		today = fields.Date.context_today(self)
+		return [
+			('user_id', '=', user.id),
+			('state', '=', 'planned'),
+			('visit_date', '>=', today),
+			('visit_date', '<', today + timedelta(days=max(days, 1))),
+		]
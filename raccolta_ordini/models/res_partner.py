@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+
+from odoo import models, fields, api
+
+
+class ResPartner(models.Model):
+	"""Estensione clienti per mantenere aggiornati i dati offline"""
+	_inherit = 'res.partner'
+
+	# Campi che alimentano gli snapshot offline
+	_raccolta_snapshot_fields = {
+		'name', 'street', 'street2', 'city', 'zip', 'state_id', 'country_id',
+		'phone', 'mobile', 'email', 'vat', 'is_company', 'customer_rank',
+		'supplier_rank', 'category_id', 'company_id', 'active',
+		'property_product_pricelist',
+	}
+
+	# Campi che possono far uscire un cliente dai filtri offline
+	_raccolta_scope_fields = {'category_id', 'company_id'}
+
+	# === RICERCA RAPIDA ===
+	raccolta_search_key = fields.Char(
+		string='Chiave Ricerca Raccolta',
+		compute='_compute_raccolta_search_key',
+		store=True,
+		index='trigram',
+		unaccent=False,
+		help='Nome, email, telefono e partita IVA normalizzati per la ricerca rapida'
+	)
+
+	@api.depends('name', 'email', 'phone', 'vat')
+	def _compute_raccolta_search_key(self):
+		"""Calcola chiave di ricerca normalizzata"""
+		search = self.env['raccolta.search']
+		for partner in self:
+			# Telefono anche in sole cifre, per ricerche senza spazi o separatori
+			phone_digits = ''.join(c for c in partner.phone or '' if c.isdigit())
+			partner.raccolta_search_key = search._normalize(
+				partner.name, partner.email, partner.phone, phone_digits, partner.vat
+			)
+
+	@api.model_create_multi
+	def create(self, vals_list):
+		"""Invalida gli snapshot se vengono creati nuovi clienti"""
+		partners = super(ResPartner, self).create(vals_list)
+
+		if any(partner.customer_rank for partner in partners):
+			self.env['raccolta.snapshot'].sudo()._invalidate_snapshots()
+
+		return partners
+
+	def write(self, vals):
+		"""Invalida gli snapshot se cambiano campi usati offline di clienti (prima o dopo la scrittura)"""
+		offline_fields = self._raccolta_snapshot_fields.intersection(vals)
+		was_customer = offline_fields and any(partner.customer_rank for partner in self)
+
+		result = super(ResPartner, self).write(vals)
+
+		if offline_fields and (was_customer or any(partner.customer_rank for partner in self)):
+			self._record_raccolta_tombstones(vals)
+			self.env['raccolta.snapshot'].sudo()._invalidate_snapshots()
+
+		return result
+
+	def unlink(self):
+		"""Invalida gli snapshot e registra i tombstone alla cancellazione di clienti"""
+		customers = self.filtered('customer_rank')
+		self.env['raccolta.tombstone']._record(self._name, customers.ids, 'unlink')
+		result = super(ResPartner, self).unlink()
+		if customers:
+			self.env['raccolta.snapshot'].sudo()._invalidate_snapshots()
+		return result
+
+	def _record_raccolta_tombstones(self, vals):
+		"""Tombstone per clienti archiviati o spostati fuori dai filtri offline"""
+		if 'active' in vals and not vals['active']:
+			self.env['raccolta.tombstone']._record(self._name, self.ids, 'archive')
+		elif self._raccolta_scope_fields.intersection(vals):
+			self.env['raccolta.tombstone']._record(self._name, self.ids, 'scope')
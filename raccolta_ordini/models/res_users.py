@@ -317,6 +317,15 @@ class ResUsers(models.Model):
 			'last_sync_date': self.last_sync_date.isoformat() if self.last_sync_date else None,
 		}
 
+	def update_last_sync(self):
+		"""Registra data e ora dell'ultimo caricamento dati offline"""
+		now = fields.Datetime.now()
+		self.sudo().write({
+			'last_sync_date': now,
+			'last_activity_date': now,
+		})
+		return True
+
 	def reserve_offline_numbers(self, order_count=0, ddt_count=0, picking_count=0):
 		"""Riserva numeri per uso offline e restituisce range"""
 		self.ensure_one()
@@ -1,6 +1,6 @@
 # -*- coding: utf-8 -*-
 
-from odoo import models, fields, api, _
+from odoo import models, fields, api, tools, _
 from odoo.exceptions import UserError
 import json
 import base64
@@ -46,6 +46,40 @@ class SaleOrder(models.Model):
         help='Data e ora di sincronizzazione'
     )
 
+    offline_local_id = fields.Char(
+        string='ID Locale Offline',
+        copy=False,
+        readonly=True,
+        help='Identificativo assegnato dal client offline, univoco per agente'
+    )
+
+    offline_user_id = fields.Many2one(
+        'res.users',
+        string='Agente Offline',
+        copy=False,
+        readonly=True,
+        help='Agente che ha sincronizzato l\'ordine offline; a differenza del venditore non cambia'
+    )
+
+    def init(self):
+        """Indice univoco (agente offline, ID locale) per la sincronizzazione idempotente
+
+        Sostituisce l'indice su (venditore, ID locale): il venditore è modificabile
+        e un ordine riassegnato non veniva più trovato dai nuovi invii.
+        """
+        super(SaleOrder, self).init()
+        if not tools.index_exists(self._cr, 'sale_order_offline_user_local_id_uniq'):
+            self._cr.execute("""
+                UPDATE sale_order SET offline_user_id = user_id
+                WHERE offline_local_id IS NOT NULL AND offline_user_id IS NULL
+            """)
+            self._cr.execute("DROP INDEX IF EXISTS sale_order_offline_local_id_uniq")
+            self._cr.execute("""
+                CREATE UNIQUE INDEX sale_order_offline_user_local_id_uniq
+                ON sale_order (offline_user_id, offline_local_id)
+                WHERE offline_local_id IS NOT NULL
+            """)
+
     # === CAMPI DDT E PICKING ===
     auto_create_picking = fields.Boolean(
         string='Crea Picking Automatico',
@@ -289,4 +323,16 @@ class SaleOrder(models.Model):
             return {
                 'success': False,
                 'error': str(e)
-            }
\ No newline at end of file
+            }
+
+
+class SaleOrderLine(models.Model):
+    """Estensione righe ordine per sincronizzazione offline"""
+    _inherit = 'sale.order.line'
+
+    offline_line_key = fields.Char(
+        string='Chiave Riga Offline',
+        copy=False,
+        readonly=True,
+        help='Identificativo locale della riga, usato per allineare le righe ai dati offline'
+    )
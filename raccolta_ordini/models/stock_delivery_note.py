@@ -252,4 +252,56 @@ class StockDeliveryNoteLine(models.Model):
         string='Scansionato da Barcode',
         default=False,
         help='Indica se il prodotto è stato aggiunto tramite scanner'
-    )
\ No newline at end of file
+    )
+
+
+class RaccoltaDdtLookupMixin(models.AbstractModel):
+    """Invalida i dati offline alla modifica delle tabelle DDT"""
+    _name = 'raccolta.ddt.lookup.mixin'
+    _description = 'Invalidazione Dati Offline Tabelle DDT'
+
+    def _invalidate_raccolta_caches(self):
+        """Invalida snapshot offline e pacchetto dati di riferimento dei worker"""
+        self.env['raccolta.snapshot'].sudo()._invalidate_snapshots()
+        self.env['raccolta.config'].clear_caches()
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        records = super(RaccoltaDdtLookupMixin, self).create(vals_list)
+        self._invalidate_raccolta_caches()
+        return records
+
+    def write(self, vals):
+        result = super(RaccoltaDdtLookupMixin, self).write(vals)
+        self._invalidate_raccolta_caches()
+        return result
+
+    def unlink(self):
+        result = super(RaccoltaDdtLookupMixin, self).unlink()
+        self._invalidate_raccolta_caches()
+        return result
+
+
+class StockPickingTransportReason(models.Model):
+    _name = 'stock.picking.transport.reason'
+    _inherit = ['stock.picking.transport.reason', 'raccolta.ddt.lookup.mixin']
+
+
+class StockPickingGoodsAppearance(models.Model):
+    _name = 'stock.picking.goods.appearance'
+    _inherit = ['stock.picking.goods.appearance', 'raccolta.ddt.lookup.mixin']
+
+
+class StockPickingTransportCondition(models.Model):
+    _name = 'stock.picking.transport.condition'
+    _inherit = ['stock.picking.transport.condition', 'raccolta.ddt.lookup.mixin']
+
+
+class StockPickingTransportMethod(models.Model):
+    _name = 'stock.picking.transport.method'
+    _inherit = ['stock.picking.transport.method', 'raccolta.ddt.lookup.mixin']
+
+
+class StockDeliveryNoteType(models.Model):
+    _name = 'stock.delivery.note.type'
+    _inherit = ['stock.delivery.note.type', 'raccolta.ddt.lookup.mixin']
@@ -1,6 +1,6 @@
 # -*- coding: utf-8 -*-
 
-from odoo import models, fields, api, _
+from odoo import models, fields, api, tools, _
 from odoo.exceptions import UserError
 import logging
 
@@ -49,6 +49,31 @@ class StockPicking(models.Model):
         help='Data e ora di sincronizzazione'
     )
 
+    offline_local_id = fields.Char(
+        string='ID Locale Offline',
+        copy=False,
+        readonly=True,
+        help='Identificativo assegnato dal client offline, univoco per agente'
+    )
+
+    offline_user_id = fields.Many2one(
+        'res.users',
+        string='Agente Offline',
+        copy=False,
+        readonly=True,
+        help='Agente che ha sincronizzato il picking offline'
+    )
+
+    def init(self):
+        """Indice univoco (agente, ID locale) per la sincronizzazione idempotente"""
+        super(StockPicking, self).init()
+        if not tools.index_exists(self._cr, 'stock_picking_offline_local_id_uniq'):
+            self._cr.execute("""
+                CREATE UNIQUE INDEX stock_picking_offline_local_id_uniq
+                ON stock_picking (offline_user_id, offline_local_id)
+                WHERE offline_local_id IS NOT NULL
+            """)
+
     # === CAMPI DDT AUTOMATICO ===
     auto_create_ddt = fields.Boolean(
         string='Crea DDT Automatico',
@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+
+from odoo import models, api
+
+
+class UomUom(models.Model):
+	"""Estensione unità di misura per mantenere aggiornati i dati offline"""
+	_inherit = 'uom.uom'
+
+	# Campi che alimentano gli snapshot offline
+	_raccolta_snapshot_fields = {
+		'name', 'category_id', 'factor', 'factor_inv', 'rounding', 'uom_type', 'active',
+	}
+
+	def _invalidate_raccolta_caches(self):
+		"""Invalida snapshot offline e pacchetto dati di riferimento dei worker"""
+		self.env['raccolta.snapshot'].sudo()._invalidate_snapshots()
+		self.env['raccolta.config'].clear_caches()
+
+	@api.model_create_multi
+	def create(self, vals_list):
+		"""Invalida gli snapshot alla creazione di nuove unità di misura"""
+		uoms = super(UomUom, self).create(vals_list)
+		self._invalidate_raccolta_caches()
+		return uoms
+
+	def write(self, vals):
+		"""Invalida gli snapshot se cambiano campi usati offline"""
+		result = super(UomUom, self).write(vals)
+
+		if self._raccolta_snapshot_fields.intersection(vals):
+			if 'active' in vals and not vals['active']:
+				self.env['raccolta.tombstone']._record(self._name, self.ids, 'archive')
+			self._invalidate_raccolta_caches()
+
+		return result
+
+	def unlink(self):
+		"""Invalida gli snapshot e registra i tombstone alla cancellazione"""
+		self.env['raccolta.tombstone']._record(self._name, self.ids, 'unlink')
+		result = super(UomUom, self).unlink()
+		self._invalidate_raccolta_caches()
+		return result
@@ -62,6 +62,9 @@
                 // Carica configurazione
                 await this.loadConfiguration();
 
+                // Scarica solo i dataset con versione cambiata
+                await this.refreshChangedDatasets();
+
                 // Inizializza UI
                 this.initUI();
 
@@ -182,6 +185,149 @@
             }
         }
 
+        /**
+         * Confronta le versioni dei dataset con quelle locali e scarica solo quelli cambiati
+         *
+         * Con remote=true le versioni sono richieste al server invece di usare quelle della pagina
+         */
+        async refreshChangedDatasets({ remote = false } = {}) {
+            const storage = this.getModel('storage');
+
+            if (!storage || !this.isOnline) {
+                return;
+            }
+
+            try {
+                const localVersions = await storage.getDatasetVersions();
+                let serverVersions = (window.raccoltaApp && window.raccoltaApp.datasetVersions) || {};
+
+                if (remote) {
+                    const response = await this.requestDataset('/raccolta/check_data_freshness', {
+                        config_id: window.raccoltaApp && window.raccoltaApp.configId,
+                        versions: localVersions
+                    });
+                    serverVersions = response.versions || {};
+                }
+
+                const changed = Object.keys(serverVersions)
+                    .filter(dataset => serverVersions[dataset] !== localVersions[dataset]);
+
+                for (const dataset of changed) {
+                    if (!remote) {
+                        this.showLoading(`Aggiornamento ${dataset}...`);
+                    }
+                    try {
+                        if (!await this.loadDataset(storage, dataset)) {
+                            continue;
+                        }
+                    } catch (error) {
+                        // Versione non salvata: il dataset resta da scaricare
+                        console.warn(`Aggiornamento ${dataset} non riuscito:`, error);
+                        continue;
+                    }
+
+                    // Versione salvata dataset per dataset: un errore non invalida i precedenti
+                    localVersions[dataset] = serverVersions[dataset];
+                    await storage.saveDatasetVersions(localVersions);
+                }
+            } catch (error) {
+                console.warn('Aggiornamento dataset non completato:', error);
+            }
+        }
+
+        /**
+         * Chiamata a una route del loader; le risposte senza success sono errori
+         */
+        async requestDataset(route, params) {
+            const response = await window.RaccoltaApp.rpc(route, params);
+            if (!response || !response.success) {
+                throw new Error((response && response.error) || `Risposta non valida da ${route}`);
+            }
+            return response;
+        }
+
+        /**
+         * Scarica un dataset tramite le route del loader (false se non previsto)
+         *
+         * Solleva un errore se una risposta non va a buon fine, così la versione
+         * del dataset non viene aggiornata.
+         */
+        async loadDataset(storage, dataset) {
+            const configId = window.raccoltaApp && window.raccoltaApp.configId;
+
+            if (dataset === 'partners' || dataset === 'products') {
+                const route = dataset === 'partners' ? '/raccolta/load_partners' : '/raccolta/load_products';
+                const storeName = dataset === 'partners' ? storage.stores.customers : storage.stores.products;
+                const loadedIds = new Set();
+                let cursor = false;
+                do {
+                    const response = await this.requestDataset(route, { config_id: configId, cursor });
+                    for (const record of response[dataset] || []) {
+                        if (dataset === 'partners') {
+                            await storage.saveCustomer(record);
+                        } else {
+                            await storage.saveProduct(record);
+                        }
+                        loadedIds.add(record.id);
+                    }
+                    cursor = response.next_cursor;
+                } while (cursor);
+
+                // Ricaricamento completo: via i record non più restituiti (cancellati, archiviati o fuori filtro)
+                for (const record of await storage.getAll(storeName)) {
+                    if (!loadedIds.has(record.id)) {
+                        await storage.delete(storeName, record.id);
+                    }
+                }
+                return true;
+            }
+
+            if (dataset === 'route') {
+                // Clienti del giro: dettaglio completo al posto dell'indice minimo
+                const response = await this.requestDataset('/raccolta/load_route', { config_id: configId });
+                const route = response.route || {};
+                for (const partner of route.partners || []) {
+                    await storage.saveCustomer(partner);
+                }
+                await storage.saveDataset('route', {
+                    visits: route.visits || [],
+                    order_history: route.order_history || {}
+                });
+                return true;
+            }
+
+            if (dataset === 'stock') {
+                // Canale giacenze: solo i prodotti variati dal token precedente
+                const current = await storage.getDataset('stock') || { token: false, quantities: {} };
+                const response = await this.requestDataset('/raccolta/load_stock', {
+                    config_id: configId,
+                    since: current.token
+                });
+                const quantities = response.full ? {} : current.quantities;
+                for (const [productId, qty] of response.stock || []) {
+                    quantities[productId] = qty;
+                }
+                await storage.saveDataset('stock', { token: response.token, quantities });
+                return true;
+            }
+
+            const loaders = {
+                categories: ['/raccolta/load_categories', 'categories'],
+                taxes: ['/raccolta/load_taxes', 'taxes'],
+                uoms: ['/raccolta/load_uoms', 'uoms'],
+                ddt_config: ['/raccolta/load_ddt_config', 'ddt_config'],
+                pricelists: ['/raccolta/load_pricelists', 'pricelists'],
+                reorder_profiles: ['/raccolta/load_reorder_profiles', 'reorder_profiles'],
+            };
+            const [route, key] = loaders[dataset] || [];
+            if (!route) {
+                return false;
+            }
+            const response = await this.requestDataset(route, { config_id: configId });
+            await storage.saveDataset(dataset, response[key]);
+            return true;
+        }
+
         /**
          * Inizializza interfaccia utente
          */
@@ -262,10 +262,42 @@ class DocumentCreator {
 
     /**
      * Prepara righe ordine da prodotti
+     *
+     * La chiave locale della riga (line_local_id) resta sul prodotto del
+     * carrello, così le modifiche successive non cambiano le chiavi e il
+     * server aggiorna le righe invece di ricrearle. I prodotti senza chiave
+     * riprendono quella di una riga esistente con lo stesso prodotto.
      */
-    prepareOrderLines(products) {
-        return products.map((product, index) => ({
-            local_id: this.generateLocalId('line'),
+    prepareOrderLines(products, existingLines = []) {
+        const usedKeys = new Set();
+        const claimedKeys = new Set(products.map(product => product.line_local_id).filter(Boolean));
+        const freeKeys = new Map();
+        existingLines.forEach(line => {
+            if (line.local_id && !claimedKeys.has(line.local_id)) {
+                const keys = freeKeys.get(line.product_id) || [];
+                keys.push(line.local_id);
+                freeKeys.set(line.product_id, keys);
+            }
+        });
+
+        return products.map((product, index) => {
+            let localId = product.line_local_id;
+            if (!localId || usedKeys.has(localId)) {
+                localId = (freeKeys.get(product.id) || []).shift() || this.generateLocalId('line');
+            }
+            usedKeys.add(localId);
+            product.line_local_id = localId;
+
+            return this.prepareOrderLine(product, index, localId);
+        });
+    }
+
+    /**
+     * Prepara una riga ordine da un prodotto
+     */
+    prepareOrderLine(product, index, localId) {
+        return {
+            local_id: localId,
             sequence: index + 1,
             product_id: product.id,
             name: product.name,
@@ -278,7 +310,7 @@ class DocumentCreator {
             note: product.note || '',
             product_code: product.default_code || '',
             created_at: new Date().toISOString()
-        }));
+        };
     }
 
     /**
@@ -411,7 +443,7 @@ class DocumentCreator {
             order.amount_total = this.calculateTotal(products);
 
             if (updates.products) {
-                order.order_lines = this.prepareOrderLines(products);
+                order.order_lines = this.prepareOrderLines(products, order.order_lines || []);
             }
         }
 
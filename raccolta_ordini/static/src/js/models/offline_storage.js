@@ -460,6 +460,44 @@
             return products.length > 0 ? products[0] : null;
         }
 
+        /**
+         * Ottieni versioni dei dataset scaricati
+         */
+        async getDatasetVersions() {
+            const record = await this.get(this.stores.config, 'dataset_versions');
+            return (record && record.versions) || {};
+        }
+
+        /**
+         * Salva versioni dei dataset scaricati
+         */
+        async saveDatasetVersions(versions) {
+            return this.save(this.stores.config, {
+                key: 'dataset_versions',
+                versions,
+                updated_at: new Date().toISOString()
+            });
+        }
+
+        /**
+         * Salva dataset di riferimento (tasse, UoM, categorie, DDT, listini)
+         */
+        async saveDataset(name, records) {
+            return this.save(this.stores.config, {
+                key: `dataset_${name}`,
+                records,
+                updated_at: new Date().toISOString()
+            });
+        }
+
+        /**
+         * Ottieni dataset di riferimento salvato
+         */
+        async getDataset(name) {
+            const record = await this.get(this.stores.config, `dataset_${name}`);
+            return record ? record.records : null;
+        }
+
         /**
          * Ottieni configurazione
          */
@@ -13,6 +13,7 @@ class SyncManager {
         this.retryAttempts = new Map();
         this.maxRetries = 3;
         this.syncDelay = 5000; // 5 secondi tra sync automatiche
+        this.batchSize = null; // Limite blocco ordini indicato dal server
     }
 
     /**
@@ -92,6 +93,12 @@ class SyncManager {
             // 4. Sincronizza contatori
             const countersResult = await this.syncCounters();
 
+            // 5. Aggiorna i soli dataset cambiati sul server
+            const app = window.RaccoltaApp.instance;
+            if (app && app.refreshChangedDatasets) {
+                await app.refreshChangedDatasets({ remote: true });
+            }
+
             const totalSynced = ordersResult.synced + pickingsResult.synced + ddtsResult.synced;
             const totalErrors = ordersResult.errors + pickingsResult.errors + ddtsResult.errors;
 
@@ -128,12 +135,13 @@ class SyncManager {
     }
 
     /**
-     * Sincronizza ordini pending
+     * Sincronizza ordini pending a blocchi di sync_batch_size
      */
     async syncPendingOrders() {
         const pendingOrders = await this.storage.getPendingOrders();
         let synced = 0;
         let errors = 0;
+        let processed = 0;
 
         this.notifyProgress({
             type: 'progress',
@@ -142,11 +150,11 @@ class SyncManager {
             total: pendingOrders.length
         });
 
-        for (let i = 0; i < pendingOrders.length; i++) {
-            const order = pendingOrders[i];
+        for (const batch of this.buildOrderBatches(pendingOrders)) {
+            const results = await this.syncOrderBatch(batch);
 
-            try {
-                const result = await this.syncOrder(order);
+            for (const order of batch) {
+                const result = results[order.local_id];
 
                 if (result.success) {
                     synced++;
@@ -156,60 +164,101 @@ class SyncManager {
                     errors++;
                     await this.handleSyncError(order, result.error);
                 }
+            }
 
-                // Aggiorna progress
-                this.notifyProgress({
-                    type: 'progress',
-                    message: `Sincronizzazione ordini: ${i + 1}/${pendingOrders.length}`,
-                    current: i + 1,
-                    total: pendingOrders.length
-                });
+            // Aggiorna progress
+            processed += batch.length;
+            this.notifyProgress({
+                type: 'progress',
+                message: `Sincronizzazione ordini: ${processed}/${pendingOrders.length}`,
+                current: processed,
+                total: pendingOrders.length
+            });
+        }
 
-                // Piccola pausa per non sovraccaricare il server
-                await this.sleep(100);
+        return { synced, errors, total: pendingOrders.length };
+    }
 
-            } catch (error) {
-                console.error(`Errore sync ordine ${order.local_id}:`, error);
-                errors++;
-                await this.handleSyncError(order, error.message);
-            }
+    /**
+     * Dimensione massima del blocco ordini (sync_batch_size della configurazione)
+     */
+    getBatchSize() {
+        const app = window.RaccoltaApp.instance;
+        const config = app && app.currentConfig;
+        return this.batchSize || (config && config.sync_batch_size) || 50;
+    }
+
+    /**
+     * Divide gli ordini in blocchi per sessione, al massimo getBatchSize() ordini ciascuno
+     */
+    buildOrderBatches(orders) {
+        const batchSize = this.getBatchSize();
+        const bySession = new Map();
+
+        for (const order of orders) {
+            const sessionOrders = bySession.get(order.raccolta_session_id) || [];
+            sessionOrders.push(order);
+            bySession.set(order.raccolta_session_id, sessionOrders);
         }
 
-        return { synced, errors, total: pendingOrders.length };
+        const batches = [];
+        for (const sessionOrders of bySession.values()) {
+            for (let i = 0; i < sessionOrders.length; i += batchSize) {
+                batches.push(sessionOrders.slice(i, i + batchSize));
+            }
+        }
+        return batches;
     }
 
     /**
-     * Sincronizza singolo ordine
+     * Sincronizza un blocco di ordini della stessa sessione: {local_id: esito}
      */
-    async syncOrder(order) {
-        try {
-            // Prepara dati per il server
-            const orderData = this.prepareOrderForSync(order);
+    async syncOrderBatch(orders) {
+        const results = {};
 
-            // Invia al server
-            const response = await this.rpc('/raccolta/sync_order', {
-                order_data: orderData,
-                local_id: order.local_id
+        try {
+            const response = await this.rpc('/raccolta/sync/orders_batch', {
+                session_id: orders[0].raccolta_session_id,
+                orders: orders.map(order => this.prepareOrderForSync(order))
             });
 
-            if (response.success) {
-                console.log(`✅ Ordine ${order.name} sincronizzato - ID Odoo: ${response.odoo_id}`);
-                return {
-                    success: true,
-                    odoo_id: response.odoo_id,
-                    message: response.message
-                };
-            } else {
+            // Il server indica il limite corrente: usato per i blocchi successivi
+            if (response.max_batch_size) {
+                this.batchSize = response.max_batch_size;
+            }
+
+            if (!response.success) {
                 throw new Error(response.error || 'Errore sconosciuto durante sync');
             }
 
+            for (const order of orders) {
+                results[order.local_id] = response.results[order.local_id] || {
+                    success: false,
+                    error: 'Ordine non elaborato dal server'
+                };
+            }
+
+            console.log(`✅ Blocco ordini sincronizzato: ${response.synced}/${orders.length}`);
+
         } catch (error) {
-            console.error(`❌ Errore sync ordine ${order.local_id}:`, error);
-            return {
-                success: false,
-                error: error.message
-            };
+            console.error('❌ Errore sync blocco ordini:', error);
+            for (const order of orders) {
+                results[order.local_id] = {
+                    success: false,
+                    error: error.message
+                };
+            }
         }
+
+        return results;
+    }
+
+    /**
+     * Sincronizza singolo ordine
+     */
+    async syncOrder(order) {
+        const results = await this.syncOrderBatch([order]);
+        return results[order.local_id];
     }
 
     /**
@@ -531,9 +531,18 @@ class ClientScreen {
 
             // Ricarica da server se online
             if (navigator.onLine) {
-                const response = await window.RaccoltaApp.rpc('/raccolta/load_partners');
                 const storage = window.RaccoltaApp.getModel('storage');
-                await storage.savePartners(response.partners);
+                const partners = [];
+                let cursor = false;
+
+                // Caricamento a pagine fino all'ultimo cursore
+                do {
+                    const response = await window.RaccoltaApp.rpc('/raccolta/load_partners', { cursor });
+                    partners.push(...response.partners);
+                    cursor = response.next_cursor;
+                } while (cursor);
+
+                await storage.savePartners(partners);
             }
 
             // Ricarica lista locale
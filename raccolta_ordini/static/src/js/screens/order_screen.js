@@ -11,6 +11,7 @@ class OrderScreen {
         this.orderLines = [];
         this.mode = 'create'; // create, edit
         this.isDirty = false;
+        this.pricelistMatrix = null;
     }
 
     /**
@@ -20,6 +21,10 @@ class OrderScreen {
         this.container = container;
         this.mode = data.mode || 'create';
 
+        // Matrice prezzi per listino cliente
+        const storage = window.RaccoltaApp.getModel('storage');
+        this.pricelistMatrix = storage ? await storage.getDataset('pricelists') : null;
+
         if (data.orderId && this.mode === 'edit') {
             await this.loadExistingOrder(data.orderId);
         } else {
@@ -627,7 +632,9 @@ class OrderScreen {
                 name: product.name,
                 default_code: product.default_code,
                 quantity: 1,
-                price_unit: product.list_price || 0,
+                price_unit: window.RaccoltaUtils.Pricelist.getPrice(
+                    this.pricelistMatrix, this.selectedClient && this.selectedClient.id, product
+                ),
                 uom_name: product.uom_name || 'Pz',
                 note: ''
             });
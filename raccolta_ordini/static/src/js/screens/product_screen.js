@@ -167,19 +167,29 @@ class ProductScreen {
         `;
     }
 
+    /**
+     * URL immagine prodotto: endpoint per checksum (cache HTTP) o base64 legacy
+     */
+    getProductImageUrl(product) {
+        if (product.image_checksum) {
+            return `/raccolta/image/${product.image_checksum}`;
+        }
+        return `data:image/png;base64,${product.image_128 || product.image_medium}`;
+    }
+
     /**
      * Render singolo prodotto
      */
     renderProductItem(product, viewMode = 'grid') {
         const isSelected = this.selectedProduct?.id === product.id;
-        const hasImage = product.image_128 || product.image_medium;
+        const hasImage = product.image_checksum || product.image_128 || product.image_medium;
 
         if (viewMode === 'grid') {
             return `
                 <div class="product-card ${isSelected ? 'selected' : ''}" data-product-id="${product.id}">
                     <div class="product-image">
                         ${hasImage ?
-                            `<img src="data:image/png;base64,${product.image_128 || product.image_medium}" alt="${product.name}">` :
+                            `<img src="${this.getProductImageUrl(product)}" alt="${product.name}" loading="lazy">` :
                             '<div class="no-image">📦</div>'
                         }
                         ${product.default_code ? `<div class="product-code">${product.default_code}</div>` : ''}
@@ -218,7 +228,7 @@ class ProductScreen {
                 <div class="product-row ${isSelected ? 'selected' : ''}" data-product-id="${product.id}">
                     <div class="product-image-small">
                         ${hasImage ?
-                            `<img src="data:image/png;base64,${product.image_128 || product.image_medium}" alt="${product.name}">` :
+                            `<img src="${this.getProductImageUrl(product)}" alt="${product.name}" loading="lazy">` :
                             '<div class="no-image-small">📦</div>'
                         }
                     </div>
@@ -497,8 +507,8 @@ class ProductScreen {
 
                 <div class="details-content">
                     <div class="product-image-section">
-                        ${product.image_128 ?
-                            `<img src="data:image/png;base64,${product.image_128}" alt="${product.name}" class="product-image-large">` :
+                        ${product.image_checksum || product.image_128 ?
+                            `<img src="${this.getProductImageUrl(product)}" alt="${product.name}" class="product-image-large">` :
                             '<div class="no-image-large">📦</div>'
                         }
                     </div>
@@ -619,9 +629,18 @@ class ProductScreen {
 
             // Ricarica da server se online
             if (navigator.onLine) {
-                const response = await window.RaccoltaApp.rpc('/raccolta/load_products');
                 const storage = window.RaccoltaApp.getModel('storage');
-                await storage.saveProducts(response.products);
+                const products = [];
+                let cursor = false;
+
+                // Caricamento a pagine fino all'ultimo cursore
+                do {
+                    const response = await window.RaccoltaApp.rpc('/raccolta/load_products', { cursor });
+                    products.push(...response.products);
+                    cursor = response.next_cursor;
+                } while (cursor);
+
+                await storage.saveProducts(products);
             }
 
             // Ricarica lista locale
@@ -788,6 +788,84 @@ const URLUtils = {
     }
 };
 
+/**
+ * Decodifica payload offline in formato colonnare
+ */
+const PayloadUtils = {
+    /**
+     * Ricostruisce le righe di un dataset colonnare (dizionari per le stringhe ripetute)
+     */
+    columnsToRows(dataset) {
+        if (!dataset || dataset.format !== 'columnar') return dataset;
+
+        const names = Object.keys(dataset.columns);
+        const columns = names.map(name => {
+            const values = dataset.columns[name];
+            const dictionary = dataset.dictionaries[name];
+            return dictionary ? values.map(index => dictionary[index]) : values;
+        });
+
+        const rows = new Array(dataset.length);
+        for (let i = 0; i < dataset.length; i++) {
+            const row = {};
+            names.forEach((name, c) => { row[name] = columns[c][i]; });
+            rows[i] = row;
+        }
+        return rows;
+    },
+
+    /**
+     * Decodifica tutti i dataset colonnari di un payload (anche annidati un livello)
+     */
+    decodeColumnar(data) {
+        const decoded = {};
+        for (const [key, value] of Object.entries(data || {})) {
+            if (value && value.format === 'columnar') {
+                decoded[key] = this.columnsToRows(value);
+            } else if (value && typeof value === 'object' && !Array.isArray(value)) {
+                decoded[key] = {};
+                for (const [subKey, subValue] of Object.entries(value)) {
+                    decoded[key][subKey] = this.columnsToRows(subValue);
+                }
+            } else {
+                decoded[key] = value;
+            }
+        }
+        return decoded;
+    }
+};
+
+/**
+ * Prezzi da matrice listini offline
+ */
+const PricelistUtils = {
+    /**
+     * Prezzo del prodotto per il listino del cliente (fallback: prezzo di listino base)
+     */
+    getPrice(matrix, partnerId, product) {
+        if (!matrix || !matrix.pricelists || !product) {
+            return (product && product.list_price) || 0;
+        }
+
+        if (!matrix._index) {
+            // Indici calcolati una sola volta per matrice
+            matrix._index = {
+                products: new Map(matrix.product_ids.map((id, i) => [id, i])),
+                pricelists: new Map(matrix.pricelists.map(pricelist => [pricelist.id, pricelist]))
+            };
+        }
+
+        const pricelistId = (matrix.partner_pricelists || {})[partnerId] || matrix.default_pricelist_id;
+        const pricelist = matrix._index.pricelists.get(pricelistId);
+        const position = matrix._index.products.get(product.id);
+
+        if (!pricelist || position === undefined) {
+            return product.list_price || 0;
+        }
+        return pricelist.prices[position];
+    }
+};
+
 // Esporta tutto come oggetto globale
 const RaccoltaUtils = {
     Number: NumberUtils,
@@ -799,7 +877,9 @@ const RaccoltaUtils = {
     File: FileUtils,
     Error: ErrorUtils,
     Performance: PerformanceUtils,
-    URL: URLUtils
+    URL: URLUtils,
+    Payload: PayloadUtils,
+    Pricelist: PricelistUtils
 };
 
 // Export per uso globale
@@ -817,5 +897,7 @@ export {
     ErrorUtils,
     PerformanceUtils,
     URLUtils,
+    PayloadUtils,
+    PricelistUtils,
     RaccoltaUtils
 };
@@ -0,0 +1,11 @@
+# -*- coding: utf-8 -*-
+
+from . import test_offline_delta
+from . import test_order_sync
+from . import test_payload
+from . import test_reorder_profile
+from . import test_search
+from . import test_serializer
+from . import test_snapshot
+from . import test_stock_data
+from . import test_sync_conflicts
@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+
+from odoo.tests.common import TransactionCase, new_test_user
+
+
+class RaccoltaCommon(TransactionCase):
+	"""Agente, configurazione, sessione aperta e dati di catalogo per i test"""
+
+	@classmethod
+	def setUpClass(cls):
+		super().setUpClass()
+		cls.env = cls.env(context=dict(cls.env.context, tracking_disable=True))
+
+		cls.agent = new_test_user(
+			cls.env, login='raccolta_agent',
+			groups='base.group_user,sales_team.group_sale_salesman,stock.group_stock_user,'
+				   'raccolta_ordini.group_raccolta_agent',
+		)
+		cls.agent.write({'is_raccolta_agent': True, 'agent_code': 'TST01'})
+
+		cls.warehouse = cls.env['stock.warehouse'].search([('company_id', '=', cls.env.company.id)], limit=1)
+		cls.config = cls.env['raccolta.config'].create({
+			'name': 'Configurazione Test',
+			'warehouse_id': cls.warehouse.id,
+		})
+		cls.session = cls.env['raccolta.session'].create({
+			'config_id': cls.config.id,
+			'user_id': cls.agent.id,
+			'state': 'opened',
+		})
+
+		cls.partner = cls.env['res.partner'].create({'name': 'Cliente Test', 'customer_rank': 1})
+		cls.product = cls.env['product.product'].create({
+			'name': 'Prodotto Test',
+			'type': 'consu',
+			'list_price': 10.0,
+			'default_code': 'TST-001',
+			'barcode': '8001234567890',
+		})
+
+		cls.partner_tags = cls.env['res.partner.category'].create([
+			{'name': 'Raccolta Tag A'}, {'name': 'Raccolta Tag B'},
+		])
+		cls.sale_tax = cls.env['account.tax'].create({
+			'name': 'IVA Test 22%',
+			'amount': 22.0,
+			'type_tax_use': 'sale',
+			'company_id': cls.env.company.id,
+		})
+
+	@classmethod
+	def _order_data(cls, local_id, lines=None, partner=None):
+		"""Ordine offline come inviato dal client"""
+		return {
+			'local_id': local_id,
+			'name': f'Ordine {local_id}',
+			'partner_id': (partner or cls.partner).id,
+			'date_order': '2026-01-15T09:30:00Z',
+			'created_at': '2026-01-15T09:30:00Z',
+			'order_lines': lines if lines is not None else [{
+				'local_id': f'{local_id}-line-1',
+				'product_id': cls.product.id,
+				'product_uom_qty': 2.0,
+				'price_unit': 10.0,
+			}],
+		}
+
+	@classmethod
+	def _create_catalog(cls, count, prefix='Bulk'):
+		"""Clienti e prodotti sintetici per equivalenze e benchmark, a blocchi"""
+		partners = cls.env['res.partner']
+		products = cls.env['product.product']
+		for start in range(0, count, 5000):
+			size = min(5000, count - start)
+			partners |= partners.create([{
+				'name': f'{prefix} Cliente {start + index:06d}',
+				'customer_rank': 1,
+				'city': f'Città {index % 50}',
+				'vat': f'IT{start + index:011d}',
+				'category_id': [(6, 0, cls.partner_tags[index % len(cls.partner_tags)].ids)],
+			} for index in range(size)])
+			products |= products.create([{
+				'name': f'{prefix} Prodotto {start + index:06d}',
+				'type': 'consu',
+				'default_code': f'{prefix.upper()}-{start + index:06d}',
+				'barcode': f'{prefix.upper()}{start + index:010d}',
+				'list_price': 1.0 + (index % 100),
+				'taxes_id': [(6, 0, cls.sale_tax.ids)],
+			} for index in range(size)])
+		return partners, products
@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+
+from datetime import timedelta
+
+from odoo import fields
+from odoo.tests import tagged
+
+from .common import RaccoltaCommon
+
+
+@tagged('post_install', '-at_install')
+class TestOfflineDelta(RaccoltaCommon):
+
+	def _get_removed_ids(self, dataset, watermark):
+		"""ID rimossi nel delta del dataset rispetto al watermark"""
+		return self.config.get_offline_delta({dataset: watermark})[dataset]['removed_ids']
+
+	def test_reference_datasets_tombstones(self):
+		"""Categorie, imposte e unità di misura rimosse arrivano nel delta"""
+		category = self.env['product.category'].create({'name': 'Categoria Delta'})
+		uom = self.env['uom.uom'].create({
+			'name': 'Confezione Delta',
+			'category_id': self.env.ref('uom.product_uom_categ_unit').id,
+			'uom_type': 'bigger',
+			'factor_inv': 6.0,
+		})
+		other_tax = self.sale_tax.copy({'name': 'IVA Delta 10%', 'amount': 10.0})
+
+		watermarks = {
+			dataset: self.config._get_dataset_watermark(model_name)
+			for dataset, model_name in (
+				('categories', 'product.category'), ('taxes', 'account.tax'), ('uoms', 'uom.uom'),
+			)
+		}
+
+		category.unlink()
+		self.sale_tax.active = False
+		other_tax.type_tax_use = 'purchase'
+		uom.active = False
+
+		self.assertIn(category.id, self._get_removed_ids('categories', watermarks['categories']))
+		taxes_removed = self._get_removed_ids('taxes', watermarks['taxes'])
+		self.assertIn(self.sale_tax.id, taxes_removed)
+		self.assertIn(other_tax.id, taxes_removed)
+		self.assertIn(uom.id, self._get_removed_ids('uoms', watermarks['uoms']))
+
+	def test_product_template_change(self):
+		"""Una modifica del solo template (prezzo, categoria) rinvia la variante nel delta"""
+		now = fields.Datetime.now()
+		self.env.flush_all()
+		self.env.cr.execute(
+			"UPDATE product_product SET write_date = %s WHERE id = %s",
+			[now - timedelta(hours=1), self.product.id]
+		)
+		self.env.cr.execute(
+			"UPDATE product_template SET write_date = %s WHERE id = %s",
+			[now - timedelta(hours=1), self.product.product_tmpl_id.id]
+		)
+		self.env.invalidate_all()
+		watermark = fields.Datetime.to_string(now - timedelta(minutes=30))
+
+		category = self.env['product.category'].create({'name': 'Categoria Spostamento'})
+		self.product.product_tmpl_id.write({'list_price': 12.5, 'categ_id': category.id})
+
+		delta = self.config.get_offline_delta({'products': watermark})['products']
+		rows = {row['id']: row for row in delta['records']}
+		self.assertIn(self.product.id, rows)
+		self.assertEqual(rows[self.product.id]['list_price'], 12.5)
+		self.assertEqual(rows[self.product.id]['categ_id'], category.id)
+		self.assertGreaterEqual(delta['watermark'], fields.Datetime.to_string(self.product.product_tmpl_id.write_date))
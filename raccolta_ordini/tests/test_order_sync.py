@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+
+from odoo.tests import tagged
+
+from .common import RaccoltaCommon
+
+
+@tagged('post_install', '-at_install')
+class TestOrderSync(RaccoltaCommon):
+
+	def test_sync_single_order(self):
+		"""Un ordine offline viene creato in bozza con il listino del cliente"""
+		results = self.session.sync_session_data({'orders': [self._order_data('order-1')]})
+
+		self.assertEqual(results['orders_synced'], 1)
+		self.assertFalse(results['errors'])
+
+		order = self.env['sale.order'].browse(results['orders']['order-1']['odoo_id'])
+		self.assertEqual(order.partner_id, self.partner)
+		self.assertEqual(order.pricelist_id, self.partner.property_product_pricelist)
+		self.assertEqual(order.offline_local_id, 'order-1')
+		self.assertEqual(order.raccolta_session_id, self.session)
+		self.assertEqual(order.user_id, self.agent)
+		self.assertEqual(order.state, 'draft')
+		self.assertTrue(order.synced_to_odoo)
+		self.assertEqual(order.order_line.product_id, self.product)
+		self.assertEqual(order.order_line.product_uom_qty, 2.0)
+		self.assertEqual(order.order_line.offline_line_key, 'order-1-line-1')
+
+	def test_resync_is_already_synced(self):
+		"""Un nuovo invio dello stesso ordine non lo duplica né lo conta di nuovo"""
+		first = self.session.sync_session_data({'orders': [self._order_data('order-2')]})
+		second = self.session.sync_session_data({'orders': [self._order_data('order-2')]})
+
+		self.assertEqual(second['orders_synced'], 0)
+		self.assertEqual(second['orders_already_synced'], 1)
+		self.assertTrue(second['orders']['order-2']['already_synced'])
+		self.assertEqual(second['orders']['order-2']['odoo_id'], first['orders']['order-2']['odoo_id'])
+		self.assertEqual(self.env['sale.order'].search_count([('offline_local_id', '=', 'order-2')]), 1)
+
+	def test_resync_picking_without_order(self):
+		"""Un picking offline senza ordine inviato di nuovo non viene duplicato"""
+		picking_data = {
+			'local_id': 'picking-1',
+			'name': 'picking-1',
+			'partner_id': self.partner.id,
+			'move_lines': [{'product_id': self.product.id, 'product_uom_qty': 3.0}],
+		}
+		first = self.session.sync_session_data({'pickings': [picking_data]})
+		second = self.session.sync_session_data({'pickings': [picking_data]})
+
+		self.assertFalse(second['errors'])
+		self.assertEqual(second['pickings_synced'], 0)
+		self.assertTrue(second['pickings']['picking-1']['already_synced'])
+		self.assertEqual(second['pickings']['picking-1']['odoo_id'], first['pickings']['picking-1']['odoo_id'])
+		self.assertEqual(self.env['stock.picking'].search_count([('offline_local_id', '=', 'picking-1')]), 1)
+
+	def test_resync_quantity_keeps_manual_price(self):
+		"""Cambiare solo la quantità non sostituisce prezzo e sconto offline con quelli di listino"""
+		line_data = {
+			'local_id': 'order-3-line-1',
+			'product_id': self.product.id,
+			'product_uom_qty': 2.0,
+			'price_unit': 7.5,
+			'discount': 5.0,
+		}
+		first = self.session.sync_session_data({'orders': [self._order_data('order-3', lines=[line_data])]})
+		line = self.env['sale.order'].browse(first['orders']['order-3']['odoo_id']).order_line
+
+		self.session.sync_session_data({
+			'orders': [self._order_data('order-3', lines=[dict(line_data, product_uom_qty=5.0)])],
+		})
+
+		self.assertEqual(line.exists().product_uom_qty, 5.0)
+		self.assertEqual(line.price_unit, 7.5)
+		self.assertEqual(line.discount, 5.0)
+
+	def test_resync_reassigned_order(self):
+		"""Un ordine riassegnato a un altro venditore viene ritrovato dal nuovo invio"""
+		first = self.session.sync_session_data({'orders': [self._order_data('order-4')]})
+		order = self.env['sale.order'].browse(first['orders']['order-4']['odoo_id'])
+		order.user_id = self.env.ref('base.user_admin')
+
+		session = self.session.with_user(self.agent)
+		conflicts = session._get_sync_conflicts(orders=[self._order_data('order-4')])
+		second = session.sync_session_data({'orders': [self._order_data('order-4')]})
+
+		self.assertEqual(
+			[conflict['conflict_type'] for conflict in conflicts['orders']], ['duplicate_local_id']
+		)
+		self.assertTrue(second['orders']['order-4']['already_synced'])
+		self.assertEqual(second['orders']['order-4']['odoo_id'], order.id)
+		self.assertEqual(order.user_id, self.env.ref('base.user_admin'))
+		self.assertEqual(order.offline_user_id, self.agent)
@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+
+import gzip
+import json
+import logging
+import time
+
+from odoo.tests import tagged
+
+from ..controllers.data_loader import RaccoltaDataLoader
+from .common import RaccoltaCommon
+
+_logger = logging.getLogger(__name__)
+
+
+class RaccoltaPayloadCommon(RaccoltaCommon):
+
+	def _columns_to_rows(self, dataset):
+		"""Righe da un dataset colonnare, come PayloadUtils.columnsToRows lato client"""
+		columns = {
+			name: [dataset['dictionaries'][name][index] for index in values]
+			if name in dataset['dictionaries'] else values
+			for name, values in dataset['columns'].items()
+		}
+		return [{name: values[i] for name, values in columns.items()} for i in range(dataset['length'])]
+
+	def _measure(self, data):
+		"""Dimensione JSON (grezza e gzip) e tempo di parsing di un payload"""
+		payload = json.dumps(data, default=str).encode()
+		started = time.perf_counter()
+		for _i in range(5):
+			json.loads(payload)
+		parse_time = (time.perf_counter() - started) / 5
+		return len(payload), len(gzip.compress(payload)), parse_time
+
+
+@tagged('post_install', '-at_install')
+class TestPayload(RaccoltaPayloadCommon):
+
+	def test_columnar_roundtrip(self):
+		"""Il formato colonnare ricostruisce esattamente le righe originali"""
+		self._create_catalog(20, prefix='Col')
+		data = self.config.get_offline_data()
+		encoded = RaccoltaDataLoader()._encode_columnar(data)
+
+		for key in ('partners', 'products'):
+			self.assertEqual(encoded[key]['format'], 'columnar')
+			self.assertEqual(self._columns_to_rows(encoded[key]), data[key])
+
+
+@tagged('post_install', '-at_install', '-standard', 'raccolta_perf')
+class TestPayloadPerformance(RaccoltaPayloadCommon):
+	"""Misure del payload offline: odoo-bin ... --test-tags raccolta_perf"""
+
+	def test_payload_benchmark(self):
+		"""Dimensione e tempo di parsing del payload a righe e colonnare su 10k e 50k record"""
+		loader = RaccoltaDataLoader()
+		created = 0
+		for size in (10000, 50000):
+			self._create_catalog(size - created, prefix=f'Payload{size}')
+			created = size
+
+			data = self.config.get_offline_data()
+			encoded = loader._encode_columnar(data)
+			for label, payload in (('righe', data), ('colonnare', encoded)):
+				raw_size, gzip_size, parse_time = self._measure(payload)
+				_logger.info(
+					f"Payload {label} ({size} record): {raw_size / 1024:.0f} KiB, "
+					f"gzip {gzip_size / 1024:.0f} KiB, parsing {parse_time * 1000:.1f} ms"
+				)
+
+			self.assertEqual(self._columns_to_rows(encoded['products']), data['products'])
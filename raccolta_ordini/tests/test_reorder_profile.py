@@ -0,0 +1,30 @@
+# -*- coding: utf-8 -*-
+
+from unittest.mock import patch
+
+import psycopg2
+
+from odoo.tests import tagged
+
+from .common import RaccoltaCommon
+
+
+@tagged('post_install', '-at_install')
+class TestReorderProfile(RaccoltaCommon):
+
+	def test_failed_chunk_is_retried(self):
+		"""I clienti di un blocco saltato sono ricalcolati al giro successivo del cron"""
+		self.session.sync_session_data({'orders': [self._order_data('order-profile')]})
+		Profile = self.env['raccolta.reorder.profile']
+		params = self.env['ir.config_parameter'].sudo()
+
+		with patch.object(type(Profile), '_refresh_chunk', side_effect=psycopg2.IntegrityError):
+			Profile._cron_refresh_profiles()
+		self.assertIn(str(self.partner.id), params.get_param('raccolta_ordini.reorder_profile_retry').split(','))
+		self.assertFalse(Profile.search([('partner_id', '=', self.partner.id)]))
+
+		# Nessun ordine nuovo: il cliente viene ripreso dalla lista dei blocchi saltati
+		params.set_param('raccolta_ordini.reorder_profile_watermark', '2999-01-01 00:00:00')
+		Profile._cron_refresh_profiles()
+		self.assertFalse(params.get_param('raccolta_ordini.reorder_profile_retry'))
+		self.assertEqual(Profile.search([('partner_id', '=', self.partner.id)]).product_id, self.product)
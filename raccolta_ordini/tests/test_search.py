@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+
+import logging
+import time
+from unittest.mock import patch
+
+from odoo.tests import tagged
+
+from .common import RaccoltaCommon
+
+_logger = logging.getLogger(__name__)
+
+
+@tagged('post_install', '-at_install')
+class TestSearch(RaccoltaCommon):
+
+	def test_search_without_trigram(self):
+		"""Senza pg_trgm la ricerca ricade sull'ilike e trova comunque il prodotto"""
+		search = self.env['raccolta.search']
+		with patch.object(self.env.registry, 'has_trigram', False):
+			products = search._search_ranked('product.product', [], 'Prodótto  TEST')
+			partners = search._search_ranked('res.partner', [], 'cliente')
+		self.assertIn(self.product, products)
+		self.assertIn(self.partner, partners)
+
+	def test_search_with_trigram(self):
+		"""Con pg_trgm la ricerca trova il prodotto e rispetta il dominio"""
+		if not self.env.registry.has_trigram:
+			self.skipTest("pg_trgm non disponibile")
+		search = self.env['raccolta.search']
+		self.assertIn(self.product, search._search_ranked('product.product', [], 'prodotto test'))
+		self.assertFalse(search._search_ranked(
+			'product.product', [('id', '!=', self.product.id)], 'tst-001'
+		))
+
+
+@tagged('post_install', '-at_install', '-standard', 'raccolta_perf')
+class TestSearchPerformance(RaccoltaCommon):
+	"""Benchmark della ricerca: odoo-bin ... --test-tags raccolta_perf"""
+
+	def test_search_benchmark(self):
+		"""Tempi della ricerca su 100k prodotti: trigram, fallback ilike e name_search"""
+		self._create_catalog(100000, prefix='Search')
+		self.env.flush_all()
+		self.env.cr.execute("ANALYZE product_product")
+
+		search = self.env['raccolta.search']
+		terms = ['prodotto 04217', 'SEARCH-0999', 'search prodotto', 'inesistente']
+		runs = [('ilike name_search', lambda term: self.env['product.product'].name_search(term, limit=20))]
+		if self.env.registry.has_trigram:
+			runs.append(('trigram', lambda term: search._search_ranked('product.product', [], term)))
+
+		def fallback(term):
+			with patch.object(self.env.registry, 'has_trigram', False):
+				return search._search_ranked('product.product', [], term)
+		runs.append(('fallback', fallback))
+
+		for label, run in runs:
+			for term in terms:
+				self.env.invalidate_all()
+				started = time.perf_counter()
+				for _i in range(10):
+					run(term)
+				elapsed = (time.perf_counter() - started) / 10
+				_logger.info(f"Ricerca {label} '{term}': {elapsed * 1000:.1f} ms")
+
+		self.assertTrue(search._search_ranked('product.product', [], 'search prodotto 004217'))
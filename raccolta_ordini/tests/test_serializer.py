@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+
+import logging
+import time
+
+from odoo.tests import tagged
+
+from .common import RaccoltaCommon
+
+_logger = logging.getLogger(__name__)
+
+
+class RaccoltaSerializerCommon(RaccoltaCommon):
+
+	def _normalize_rows(self, rows):
+		"""Righe ordinate per id, con le liste di id ordinate (l'ordine non è significativo)"""
+		return sorted((
+			{key: sorted(value) if isinstance(value, list) else value for key, value in row.items()}
+			for row in rows
+		), key=lambda row: row['id'])
+
+	def _serialize_both(self, model_name, domain):
+		"""Output dei serializzatori ORM (raccolta.config) e SQL (raccolta.serializer), con i tempi"""
+		self.env.invalidate_all()
+		started = time.perf_counter()
+		if model_name == 'res.partner':
+			orm_rows = self.config._serialize_partners(self.env[model_name].search(domain))
+		else:
+			orm_rows = self.config._serialize_products(self.env[model_name].search(domain))
+		orm_time = time.perf_counter() - started
+
+		self.env.invalidate_all()
+		started = time.perf_counter()
+		if model_name == 'res.partner':
+			sql_rows = self.env['raccolta.serializer']._serialize_partners(domain)
+		else:
+			sql_rows = self.env['raccolta.serializer']._serialize_products(domain)
+		sql_time = time.perf_counter() - started
+
+		return orm_rows, sql_rows, orm_time, sql_time
+
+
+@tagged('post_install', '-at_install')
+class TestSerializer(RaccoltaSerializerCommon):
+
+	def test_partners_match_orm(self):
+		"""Il serializzatore SQL dei clienti produce gli stessi dati di quello ORM"""
+		partners, _products = self._create_catalog(30, prefix='Eq')
+		partners[:10].write({
+			'state_id': self.env.ref('base.state_it_mi').id,
+			'country_id': self.env.ref('base.it').id,
+			'phone': '+39 02 1234567',
+			'is_company': True,
+		})
+
+		orm_rows, sql_rows, _orm_time, _sql_time = self._serialize_both(
+			'res.partner', self.config._get_partners_domain()
+		)
+		self.assertEqual(self._normalize_rows(sql_rows), self._normalize_rows(orm_rows))
+
+	def test_products_match_orm(self):
+		"""Il serializzatore SQL dei prodotti produce gli stessi dati di quello ORM"""
+		self._create_catalog(30, prefix='Eq')
+
+		orm_rows, sql_rows, _orm_time, _sql_time = self._serialize_both(
+			'product.product', self.config._get_products_domain()
+		)
+		self.assertEqual(self._normalize_rows(sql_rows), self._normalize_rows(orm_rows))
+
+
+@tagged('post_install', '-at_install', '-standard', 'raccolta_perf')
+class TestSerializerPerformance(RaccoltaSerializerCommon):
+	"""Benchmark dei serializzatori: odoo-bin ... --test-tags raccolta_perf"""
+
+	def test_serializer_benchmark(self):
+		"""Tempi ORM e SQL su 10k, 50k e 100k clienti e prodotti, con output identici"""
+		created = 0
+		for size in (10000, 50000, 100000):
+			self._create_catalog(size - created, prefix=f'Perf{size}')
+			created = size
+			self.env.flush_all()
+
+			for model_name, domain in (
+				('res.partner', self.config._get_partners_domain()),
+				('product.product', self.config._get_products_domain()),
+			):
+				orm_rows, sql_rows, orm_time, sql_time = self._serialize_both(model_name, domain)
+				self.assertEqual(self._normalize_rows(sql_rows), self._normalize_rows(orm_rows))
+				_logger.info(
+					f"Serializzazione {model_name} {len(sql_rows)} record: "
+					f"ORM {orm_time:.2f}s, SQL {sql_time:.2f}s ({orm_time / max(sql_time, 1e-6):.1f}x)"
+				)
@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+
+from unittest.mock import patch
+
+from odoo.tests import tagged
+
+from .common import RaccoltaCommon
+from ..models.raccolta_snapshot import GENERATION_SEQUENCE
+
+
+@tagged('post_install', '-at_install')
+class TestSnapshot(RaccoltaCommon):
+
+	def _ready_snapshot(self):
+		snapshot = self.config._get_or_create_snapshot()
+		snapshot._build()
+		self.assertEqual(snapshot.state, 'ready')
+		return snapshot
+
+	def test_invalidation_applied_at_commit(self):
+		"""Le invalidazioni della transazione sono applicate una volta sola, al commit"""
+		snapshot = self._ready_snapshot()
+
+		self.partner.phone = '+39 02 7654321'
+		self.product.name = 'Prodotto Test Rinominato'
+		self.assertEqual(snapshot.state, 'ready')
+
+		self.env.cr.precommit.run()
+		snapshot.invalidate_recordset()
+		self.assertEqual(snapshot.state, 'stale')
+		self.assertNotIn('raccolta.snapshot.invalidate', self.env.cr.precommit.data)
+
+	def test_non_customer_does_not_invalidate(self):
+		"""Le modifiche a contatti che non sono clienti non invalidano gli snapshot"""
+		self._ready_snapshot()
+		contact = self.env['res.partner'].create({'name': 'Contatto Interno'})
+		self.env.cr.precommit.run()
+
+		contact.phone = '+39 02 1111111'
+		self.assertNotIn('raccolta.snapshot.invalidate', self.env.cr.precommit.data)
+
+	def test_build_interrupted_by_invalidation(self):
+		"""Una costruzione durante la quale arriva un'invalidazione resta da ricostruire"""
+		snapshot = self.config._get_or_create_snapshot()
+		payload = type(self.config)._get_snapshot_payload
+
+		def concurrent_invalidation(config):
+			self.env.cr.execute(f"SELECT nextval('{GENERATION_SEQUENCE}')")
+			return payload(config)
+
+		with patch.object(type(self.config), '_get_snapshot_payload', concurrent_invalidation):
+			snapshot._build()
+		self.assertEqual(snapshot.state, 'stale')
+
+		snapshot._build()
+		self.assertEqual(snapshot.state, 'ready')
+
+	def test_get_or_create_snapshot_once(self):
+		"""Lo snapshot di una chiave filtri viene creato una sola volta"""
+		snapshot = self.config._get_or_create_snapshot()
+		self.assertEqual(snapshot.filter_key, self.config.filter_key)
+		self.assertEqual(snapshot.state, 'stale')
+		self.assertEqual(self.config._get_or_create_snapshot(), snapshot)
+		self.assertEqual(
+			self.env['raccolta.snapshot'].search_count([('filter_key', '=', self.config.filter_key)]), 1
+		)
@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+
+from odoo.tests import tagged
+
+from .common import RaccoltaCommon
+
+
+@tagged('post_install', '-at_install')
+class TestStockData(RaccoltaCommon):
+
+	@classmethod
+	def setUpClass(cls):
+		super().setUpClass()
+		cls.storable = cls.env['product.product'].create({
+			'name': 'Prodotto Magazzino',
+			'type': 'product',
+		})
+		cls.other_storable = cls.env['product.product'].create({
+			'name': 'Altro Prodotto Magazzino',
+			'type': 'product',
+		})
+		cls.env['stock.quant']._update_available_quantity(cls.storable, cls.warehouse.lot_stock_id, 5.0)
+
+	def test_deleted_quant_forces_full_reload(self):
+		"""Dopo l'eliminazione dei quant a zero il delta lascia il posto all'insieme completo"""
+		token = self.config.get_stock_data()['token']
+
+		self.env.flush_all()
+		self.env.cr.execute("DELETE FROM stock_quant WHERE product_id = %s", [self.storable.id])
+		self.env.invalidate_all()
+
+		result = self.config.get_stock_data(token)
+		self.assertTrue(result['full'])
+		self.assertNotIn(self.storable.id, dict(result['stock']))
+
+	def test_new_quant_keeps_delta(self):
+		"""Un quant nuovo non costringe a ricaricare l'insieme completo"""
+		token = self.config.get_stock_data()['token']
+		self.env['stock.quant']._update_available_quantity(self.other_storable, self.warehouse.lot_stock_id, 3.0)
+
+		result = self.config.get_stock_data(token)
+		self.assertFalse(result['full'])
+		self.assertEqual(dict(result['stock']).get(self.other_storable.id), 3.0)
@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+
+from odoo.tests import tagged
+
+from .common import RaccoltaCommon
+
+
+@tagged('post_install', '-at_install')
+class TestSyncConflicts(RaccoltaCommon):
+
+	@classmethod
+	def setUpClass(cls):
+		super().setUpClass()
+		cls.orders = cls.env['sale.order'].create([{
+			'partner_id': cls.partner.id,
+			'user_id': cls.agent.id,
+			'offline_local_id': f'conflict-{index}',
+		} for index in range(50)])
+		cls.pickings = cls.env['stock.picking'].create([{
+			'picking_type_id': cls.warehouse.out_type_id.id,
+			'location_id': cls.warehouse.lot_stock_id.id,
+			'location_dest_id': cls.env.ref('stock.stock_location_customers').id,
+			'partner_id': cls.partner.id,
+		} for index in range(50)])
+
+	def _payload(self, size):
+		"""Documenti offline già sincronizzati: un conflitto per ID locale e uno per picking"""
+		orders = [{
+			'local_id': order.offline_local_id,
+			'name': order.name,
+		} for order in self.orders[:size]]
+		pickings = [{'name': picking.name} for picking in self.pickings[:size]]
+		return orders, pickings
+
+	def _check_conflicts(self, orders, pickings):
+		"""Conflitti del payload con la cache vuota, come in una nuova richiesta"""
+		return self.env['raccolta.session'].with_user(self.agent)._get_sync_conflicts(orders, pickings)
+
+	def _reset_cache(self):
+		self.env.flush_all()
+		self.env.invalidate_all()
+
+	def test_conflicts_detected(self):
+		"""ID locali già sincronizzati e nomi picking esistenti sono segnalati"""
+		conflicts = self._check_conflicts(*self._payload(5))
+
+		self.assertTrue(conflicts['has_conflicts'])
+		self.assertEqual(len(conflicts['orders']), 5)
+		self.assertEqual({c['conflict_type'] for c in conflicts['orders']}, {'duplicate_local_id'})
+		self.assertEqual({c['existing_id'] for c in conflicts['orders']}, set(self.orders[:5].ids))
+		self.assertEqual({c['existing_id'] for c in conflicts['pickings']}, set(self.pickings[:5].ids))
+
+	def test_query_count_constant(self):
+		"""Il numero di query non cresce con il numero di conflitti"""
+		payload = self._payload(1)
+		# Primo giro a vuoto: regole di accesso e cache del registry già caricate
+		self._check_conflicts(*payload)
+		self._reset_cache()
+		queries_before = self.cr.sql_log_count
+		self._check_conflicts(*payload)
+		single_count = self.cr.sql_log_count - queries_before
+
+		for size in (10, 50):
+			orders, pickings = self._payload(size)
+			self._reset_cache()
+			with self.assertQueryCount(single_count):
+				conflicts = self._check_conflicts(orders, pickings)
+			self.assertEqual(len(conflicts['orders']), size)
+			self.assertEqual(len(conflicts['pickings']), size)